@@ -1,17 +1,65 @@
-import pygame
 import random
 import math
 import sys
+import os
+import gc
+import json
+import argparse
 import time
+import heapq
+import struct
+import zlib
+import hashlib
+import itertools
+import select
+import threading
+import queue
+from collections import OrderedDict, deque
 from enum import Enum
 
-# Initialize pygame
-pygame.init()
+# Keep stdout clean for the JSON reports
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+import numpy as np
+
+# Terminal mode needs raw keyboard input, only available on POSIX terminals
+try:
+    import termios
+    import tty
+except ImportError:
+    termios = tty = None
+
+# TOML configs need tomllib (Python 3.11+); JSON always works
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
 
 # Screen dimensions
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("TuxAscii")
+
+# Startup is lazy: importing the module opens no window and loads no fonts.
+# The display comes up on the first draw, with only the subsystems the game
+# uses (display and font; there is no audio or joystick input)
+screen = None
+
+def open_display():
+    global screen
+    if screen is None:
+        pygame.display.init()
+        pygame.font.init()
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("TuxAscii")
+        # Glyphs rendered before there was a display still have their own format
+        glyph_atlas.convert()
+    return screen
+
+# Headless runs (benchmarks, CI, terminal play) use SDL's dummy drivers so no
+# window opens. Must be called before open_display()
+def use_dummy_drivers():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
 
 # Colors
 WHITE = (255, 255, 255)
@@ -31,33 +79,359 @@ class GameState(Enum):
     CONTROLS = 3
     GAME_OVER = 4
 
+# Font resolution: SysFont scans every installed font (fc-list on Linux) to
+# find a match, which dominates startup. The resolved path and whether bold
+# has to be synthesized are cached on disk and reused on the next start
+def font_cache_path():
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "tuxascii", "fonts.json")
+
+font_cache = None  # "name:style" -> [path or None for the default font, synthesize bold]
+
+def load_font_cache():
+    global font_cache
+    try:
+        with open(font_cache_path()) as f:
+            font_cache = json.load(f)
+    except (OSError, ValueError):
+        font_cache = {}
+    return font_cache
+
+def resolve_font(name, bold=False, use_cache=True):
+    cache = font_cache if font_cache is not None else load_font_cache()
+    key = "{}:{}".format(name, "bold" if bold else "regular")
+    entry = cache.get(key) if use_cache else None
+    if entry is None or (entry[0] is not None and not os.path.exists(entry[0])):
+        # Let SysFont do the matching but keep what it found instead of a font
+        found = []
+        pygame.font.SysFont(name, 1, bold, constructor=lambda path, size, set_bold, set_italic:
+                            found.append([path, set_bold]))
+        entry = found[0]
+        cache[key] = entry
+        try:
+            os.makedirs(os.path.dirname(font_cache_path()), exist_ok=True)
+            with open(font_cache_path(), "w") as f:
+                json.dump(cache, f)
+        except OSError:
+            pass
+    return entry
+
+# Fonts are created on first use, so only screens that are drawn pay for them
+class LazyFont:
+    def __init__(self, name, size, bold=False):
+        self.name = name
+        self.size = size
+        self.bold = bold
+        self.font = None
+
+    def load(self):
+        if self.font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            path, set_bold = resolve_font(self.name, self.bold)
+            self.font = pygame.font.Font(path, self.size)
+            if set_bold:
+                self.font.set_bold(True)
+        return self.font
+
+    def render(self, text, antialias, color, background=None):
+        return self.load().render(text, antialias, color, background)
+
 # Fonts
-title_font = pygame.font.SysFont('courier', 48, bold=True)
-menu_font = pygame.font.SysFont('courier', 24)
-game_font = pygame.font.SysFont('courier', 16)
-big_font = pygame.font.SysFont('courier', 36)
+title_font = LazyFont('courier', 48, bold=True)
+menu_font = LazyFont('courier', 24)
+game_font = LazyFont('courier', 16)
+big_font = LazyFont('courier', 36)
+FONTS = (title_font, menu_font, game_font, big_font)
 
-# Game clock
-clock = pygame.time.Clock()
 FPS = 60
 
+# Simulation runs on a fixed timestep independent of the render rate. Speeds
+# are tuned in pixels per 60 FPS frame, TICK_SCALE converts them per tick
+TICK_RATE = 120
+TICK_MS = 1000 / TICK_RATE
+TICK_SCALE = FPS / TICK_RATE
+
+def lerp(a, b, t):
+    return a + (b - a) * t
+
+# Game input: a bitmask over the keys gameplay reads, so input can come from
+# the keyboard or from a script without a display
+GAME_KEYS = (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN, pygame.K_SPACE, pygame.K_b)
+KEY_BITS = {key: 1 << i for i, key in enumerate(GAME_KEYS)}
+
+class KeyState:
+    def __init__(self, mask=0):
+        self.mask = mask
+
+    @classmethod
+    def from_pressed(cls, pressed):
+        mask = 0
+        for key, bit in KEY_BITS.items():
+            if pressed[key]:
+                mask |= bit
+        return cls(mask)
+
+    def __getitem__(self, key):
+        return bool(self.mask & KEY_BITS.get(key, 0))
+
+# ASCII art
+PLAYER_ART = (
+    " /\\ ",
+    "/><\\",
+    "\\__/"
+)
+BOSS_ART = (
+    " /^\\/^\\ ",
+    "<|00  |>",
+    " \\VV__/ "
+)
+ENEMY_ART = (
+    "/\\_/\\",
+    "o o ",
+    ">-<"
+)
+ART_LINE_HEIGHT = 15
+POWERUP_SYMBOLS = {
+    "double": "D",
+    "triple": "T",
+    "speed": "S",
+    "bomb": "B"
+}
+STAR_CHARS = ['*', '.', '+', '·']
+PARTICLE_CHARS = ("*", "+", "x", ".", "o")
+PARTICLE_COLORS = (WHITE, YELLOW, RED, CYAN)
+PARTICLE_FADE = 4  # brightness steps a particle fades through over its life
+PARTICLE_SHADES = [tuple(channel * (PARTICLE_FADE - level) // PARTICLE_FADE for channel in color)
+                   for color in PARTICLE_COLORS for level in range(PARTICLE_FADE)]
+BULLET_CHARS = ["*", "v", "+", "o"]
+BULLET_COLORS = [WHITE, YELLOW, RED, MAGENTA, CYAN]
+
+# Glyph atlas: every (text, font, color) is rasterized once and then served
+# from a bounded LRU cache instead of calling font.render every frame. Multi-
+# line art (text given as a tuple of lines) and powerup badges are composed
+# into a single sprite, so each costs one blit
+class GlyphAtlas:
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, font, color):
+        return self.lookup((text, font, color), self.render)
+
+    def badge(self, symbol, font, radius, color):
+        return self.lookup(("badge", symbol, font, radius, color), self.render_badge)
+
+    def render(self, key):
+        text, font, color = key
+        if not isinstance(text, tuple):
+            return font.render(text, True, color)
+        lines = [font.render(line, True, color) for line in text]
+        sprite = pygame.Surface((max(line.get_width() for line in lines),
+                                 (len(lines) - 1) * ART_LINE_HEIGHT + lines[-1].get_height()), pygame.SRCALPHA)
+        for i, line in enumerate(lines):
+            sprite.blit(line, (0, i * ART_LINE_HEIGHT))
+        return sprite
+
+    def render_badge(self, key):
+        _, symbol, font, radius, color = key
+        badge = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+        pygame.draw.circle(badge, color, (radius, radius), radius)
+        text = font.render(symbol, True, BLACK)
+        badge.blit(text, text.get_rect(center=(radius, radius)))
+        return badge
+
+    def lookup(self, key, build):
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = build(key)
+        # Match the display's pixel format once there is one, so blits are straight copies
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def convert(self):
+        # Bring every cached sprite to the display's pixel format
+        for key, surface in list(self.surfaces.items()):
+            self.surfaces[key] = surface.convert_alpha()
+
+    def prerender(self, entries):
+        for text, font, color in entries:
+            self.get(text, font, color)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.surfaces), "capacity": self.capacity}
+
+def game_glyphs():
+    # Everything the gameplay draw paths can ask for, including blink variants.
+    # Powerup badges are composed on their first appearance
+    yield PLAYER_ART, game_font, WHITE
+    yield PLAYER_ART, game_font, YELLOW
+    yield BOSS_ART, game_font, RED
+    yield ENEMY_ART, game_font, YELLOW
+    for char in BULLET_CHARS:
+        for color in BULLET_COLORS:
+            yield char, game_font, color
+    for char in STAR_CHARS:
+        yield char, game_font, WHITE
+    for char in PARTICLE_CHARS:
+        for shade in PARTICLE_SHADES:
+            yield char, game_font, shade
+
+# Glyphs are rendered on demand; the window warms the gameplay set with
+# game_glyphs() once the title screen is up
+glyph_atlas = GlyphAtlas()
+
+# Frame profiler: timing scopes around each update/draw phase, per-phase entity
+# counts, an on-screen overlay and Chrome trace-event export. While disabled a
+# scope is a shared no-op context manager, so instrumented code pays almost nothing
+class NullScope:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SCOPE = NullScope()
+
+class ProfileScope:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+class Profiler:
+    def __init__(self, history=240, trace_limit=1000000):
+        self.enabled = False
+        self.overlay = False
+        self.tracing = False
+        self.history = history
+        self.trace_limit = trace_limit
+        self.origin = time.perf_counter()
+        self.current = {}  # phase -> seconds spent in the frame being measured
+        self.phases = {}  # phase -> deque of per-frame milliseconds
+        self.counts = {}
+        self.frame_times = deque(maxlen=history)
+        self.last_frame = None
+        self.events = []
+        self.summary = []
+
+    def toggle(self):
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or self.tracing
+
+    def start_trace(self):
+        self.tracing = True
+        self.enabled = True
+
+    def scope(self, name):
+        if not self.enabled:
+            return NULL_SCOPE
+        return ProfileScope(self, name)
+
+    def record(self, name, start, end):
+        self.current[name] = self.current.get(name, 0.0) + end - start
+        if self.tracing and len(self.events) < self.trace_limit:
+            self.events.append({"name": name, "ph": "X", "pid": 0, "tid": 0,
+                                "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6})
+
+    def count(self, name, value):
+        if self.enabled:
+            self.counts[name] = value
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.last_frame is not None:
+            self.frame_times.append((now - self.last_frame) * 1000)
+        self.last_frame = now
+        for name in self.current.keys() | self.phases.keys():
+            if name not in self.phases:
+                self.phases[name] = deque(maxlen=self.history)
+            self.phases[name].append(self.current.get(name, 0.0) * 1000)
+        self.current.clear()
+        if self.tracing and self.counts and len(self.events) < self.trace_limit:
+            self.events.append({"name": "entities", "ph": "C", "pid": 0, "tid": 0,
+                                "ts": (now - self.origin) * 1e6, "args": dict(self.counts)})
+        # The overlay text only changes a few times a second
+        if len(self.frame_times) % 15 == 0:
+            self.summary = self.report()
+
+    def report(self):
+        phases = {name: sum(times) / len(times) for name, times in self.phases.items() if times}
+        frame = sum(self.frame_times) / len(self.frame_times) if self.frame_times else 0.0
+        return [("frame", frame)] + sorted(phases.items(), key=lambda item: -item[1])
+
+    def dump_trace(self, path):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+    def draw_overlay(self, surface):
+        lines = len(self.summary) + len(self.counts)
+        panel = pygame.Surface((260, 86 + lines * 16), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+        
+        # Rolling frame-time graph with a line at the 60 FPS budget
+        graph_top, graph_height = 10, 60
+        budget_y = graph_top + graph_height - graph_height * (1000 / FPS) / 33.3
+        pygame.draw.line(panel, GREEN, (10, budget_y), (250, budget_y))
+        times = list(self.frame_times)[-240:]
+        for i, ms in enumerate(times):
+            bar = min(graph_height, graph_height * ms / 33.3)
+            x = 10 + i
+            pygame.draw.line(panel, RED if ms > 1000 / FPS else WHITE, (x, graph_top + graph_height), (x, graph_top + graph_height - bar))
+        
+        # The readouts change every frame, so they are rendered directly: in
+        # the glyph atlas they would evict game glyphs and skew its stats
+        y = graph_top + graph_height + 8
+        for name, ms in self.summary:
+            panel.blit(game_font.render(f"{name:<14}{ms:6.2f} ms", True, WHITE), (10, y))
+            y += 16
+        for name, value in sorted(self.counts.items()):
+            panel.blit(game_font.render(f"{name:<14}{value:>9}", True, CYAN), (10, y))
+            y += 16
+        return surface.blit(panel, (WIDTH - 270, 10))
+
+profiler = Profiler()
+
 # Player class
 class Player:
-    def __init__(self):
+    def __init__(self, bullet_pool):
+        self.bullet_pool = bullet_pool
         self.reset()
         
-    def reset(self):
+    def reset(self, now=0):
         self.x = WIDTH // 2
         self.y = HEIGHT - 100
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.width = 30
         self.height = 30
-        self.speed = 5
-        self.bullets = []
-        self.shoot_delay = 200  # milliseconds
-        self.last_shot = pygame.time.get_ticks()
+        self.speed = tuning.player_speed
+        self.bullets = BulletView(self.bullet_pool, PLAYER_OWNER)
+        self.shoot_delay = tuning.player_shoot_delay  # milliseconds
+        self.last_shot = now
         self.score = 0
-        self.lives = 3
-        self.bombs = 3
+        self.lives = tuning.player_lives
+        self.bombs = tuning.player_bombs
         self.power_level = 1
         self.power_type = "normal"  # normal, double, speed, bomb
         self.power_timer = 0
@@ -65,28 +439,30 @@ class Player:
         self.invincible_timer = 0
         
     def move(self, keys):
+        self.prev_x = self.x
+        self.prev_y = self.y
+        step = self.speed * TICK_SCALE
         if keys[pygame.K_LEFT] and self.x > 0:
-            self.x -= self.speed
+            self.x -= step
         if keys[pygame.K_RIGHT] and self.x < WIDTH - self.width:
-            self.x += self.speed
+            self.x += step
         if keys[pygame.K_UP] and self.y > 0:
-            self.y -= self.speed
+            self.y -= step
         if keys[pygame.K_DOWN] and self.y < HEIGHT - self.height:
-            self.y += self.speed
+            self.y += step
             
-    def shoot(self):
-        now = pygame.time.get_ticks()
+    def shoot(self, now):
         if now - self.last_shot > self.shoot_delay:
             self.last_shot = now
             if self.power_type == "double":
-                self.bullets.append(Bullet(self.x + 5, self.y, -1))
-                self.bullets.append(Bullet(self.x + self.width - 5, self.y, -1))
+                self.bullets.spawn(self.x + 5, self.y, -1)
+                self.bullets.spawn(self.x + self.width - 5, self.y, -1)
             elif self.power_type == "triple":
-                self.bullets.append(Bullet(self.x + self.width // 2, self.y, -1))
-                self.bullets.append(Bullet(self.x + 5, self.y, -1, angle=-15))
-                self.bullets.append(Bullet(self.x + self.width - 5, self.y, -1, angle=15))
+                self.bullets.spawn(self.x + self.width // 2, self.y, -1)
+                self.bullets.spawn(self.x + 5, self.y, -1, angle=-15)
+                self.bullets.spawn(self.x + self.width - 5, self.y, -1, angle=15)
             else:  # normal
-                self.bullets.append(Bullet(self.x + self.width // 2, self.y, -1))
+                self.bullets.spawn(self.x + self.width // 2, self.y, -1)
     
     def use_bomb(self):
         if self.bombs > 0:
@@ -94,523 +470,4434 @@ class Player:
             return True
         return False
     
-    def apply_powerup(self, powerup_type):
+    def apply_powerup(self, powerup_type, now):
         self.power_type = powerup_type
-        self.power_timer = pygame.time.get_ticks()
+        self.power_timer = now
         
         if powerup_type == "speed":
-            self.speed = 8
+            self.speed = tuning.player_boost_speed
         elif powerup_type == "bomb":
             self.bombs += 1
         elif powerup_type in ["double", "triple"]:
-            self.shoot_delay = 150
+            self.shoot_delay = tuning.player_rapid_shoot_delay
     
-    def update_powerups(self):
-        now = pygame.time.get_ticks()
-        if self.power_type != "normal" and now - self.power_timer > 10000:  # 10 seconds
+    def update_powerups(self, now):
+        if self.power_type != "normal" and now - self.power_timer > tuning.player_power_ms:
             self.power_type = "normal"
-            self.speed = 5
-            self.shoot_delay = 200
+            self.speed = tuning.player_speed
+            self.shoot_delay = tuning.player_shoot_delay
         
-        if self.invincible and now - self.invincible_timer > 3000:  # 3 seconds
+        if self.invincible and now - self.invincible_timer > tuning.player_invincible_ms:
             self.invincible = False
     
-    def draw(self, surface):
+    def retune(self):
+        # A reloaded tuning applies at once to the active powerup's stats
+        self.speed = tuning.player_boost_speed if self.power_type == "speed" else tuning.player_speed
+        if self.power_type in ("double", "triple"):
+            self.shoot_delay = tuning.player_rapid_shoot_delay
+        else:
+            self.shoot_delay = tuning.player_shoot_delay
+    
+    def draw(self, renderer, alpha, now):
         # Draw updated player ASCII art
-        player_ascii = [
-            " /\\ ",
-            "/><\\",
-            "\\__/"
-        ]
-        
-        for i, line in enumerate(player_ascii):
-            text = game_font.render(line, True, WHITE if not self.invincible or pygame.time.get_ticks() % 400 < 200 else YELLOW)
-            surface.blit(text, (self.x, self.y + i * 15))
+        color = WHITE if not self.invincible or now % 400 < 200 else YELLOW
+        x = lerp(self.prev_x, self.x, alpha)
+        y = lerp(self.prev_y, self.y, alpha)
+        renderer.art(PLAYER_ART, x, y, color)
+
+# Bullet pool: every projectile lives in preallocated structure-of-arrays
+# storage so movement and culling are a handful of vectorized operations
+PLAYER_OWNER = 0
+BULLET_SIZE = 5
+
+class BulletPool:
+    def __init__(self, capacity=4096):
+        self.capacity = 0
+        self.x = np.zeros(0, dtype=np.float32)
+        self.y = np.zeros(0, dtype=np.float32)
+        self.px = np.zeros(0, dtype=np.float32)  # position at the previous tick
+        self.py = np.zeros(0, dtype=np.float32)
+        self.vx = np.zeros(0, dtype=np.float32)
+        self.vy = np.zeros(0, dtype=np.float32)
+        self.owner = np.zeros(0, dtype=np.int32)
+        self.glyph = np.zeros(0, dtype=np.uint8)
+        self.color = np.zeros(0, dtype=np.uint8)
+        self.alive = np.zeros(0, dtype=bool)
+        self.serial = np.zeros(0, dtype=np.int64)  # unique per spawn, survives compaction
+        self.next_serial = 0
+        # Free slots are a stack; free[:free_top] are available
+        self.free = np.zeros(0, dtype=np.int32)
+        self.free_top = 0
+        self.high = 0  # no live bullet at or above this slot
+        self.count = 0
+        self.next_owner = PLAYER_OWNER + 1
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        old = self.capacity
+        for name in ("x", "y", "px", "py", "vx", "vy", "owner", "glyph", "color", "alive", "serial"):
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+        # New slots go under the slots already free, lowest slot last, so the
+        # stack is the one a pool created at this capacity would have and
+        # slot assignment does not depend on how often the pool grew
+        added = capacity - old
+        free = np.zeros(capacity, dtype=np.int32)
+        free[:added] = np.arange(capacity - 1, old - 1, -1)
+        free[added:added + self.free_top] = self.free[:self.free_top]
+        self.free = free
+        self.free_top += added
+        self.capacity = capacity
+
+    def new_owner(self):
+        owner = self.next_owner
+        self.next_owner += 1
+        return owner
+
+    def spawn(self, owner, x, y, vx, vy, glyph=0, color=0):
+        # Returns the new slots as a copy: the free stack they come from is
+        # overwritten by the next release
+        n = max(np.size(x), np.size(vx))
+        if n == 0:
+            return np.zeros(0, dtype=self.free.dtype)
+        if n > self.free_top:
+            self.grow(max(self.capacity * 2, self.count + n))
+        slots = self.free[self.free_top - n:self.free_top].copy()
+        self.free_top -= n
+        self.x[slots] = x
+        self.y[slots] = y
+        self.px[slots] = x
+        self.py[slots] = y
+        self.vx[slots] = vx
+        self.vy[slots] = vy
+        self.owner[slots] = owner
+        self.glyph[slots] = glyph
+        self.color[slots] = color
+        self.alive[slots] = True
+        self.serial[slots] = np.arange(self.next_serial, self.next_serial + n)
+        self.next_serial += n
+        self.count += n
+        self.high = max(self.high, int(slots.max()) + 1)
+        return slots
+
+    def release(self, slots):
+        slots = slots[self.alive[slots]]
+        n = len(slots)
+        if n == 0:
+            return
+        self.alive[slots] = False
+        self.vx[slots] = 0
+        self.vy[slots] = 0
+        self.free[self.free_top:self.free_top + n] = slots
+        self.free_top += n
+        self.count -= n
+
+    def release_owner(self, owner):
+        h = self.high
+        self.release(np.flatnonzero(self.alive[:h] & (self.owner[:h] == owner)))
+
+    def release_owners(self, owners):
+        # release_owner for each owner in turn, in one pass over the pool.
+        # Slots go back grouped by owner in the order given, as they would one
+        # owner at a time, so the free stack ends up the same
+        h = self.high
+        owners = np.asarray(owners, dtype=self.owner.dtype)
+        slots = np.flatnonzero(self.alive[:h] & np.isin(self.owner[:h], owners))
+        if len(owners) > 1 and len(slots):
+            by_owner = np.argsort(owners, kind="stable")
+            rank = by_owner[np.searchsorted(owners, self.owner[slots], sorter=by_owner)]
+            slots = slots[np.argsort(rank, kind="stable")]
+        self.release(slots)
+
+    def clear(self):
+        self.alive[:] = False
+        self.free = np.arange(self.capacity - 1, -1, -1, dtype=np.int32)
+        self.free_top = self.capacity
+        self.high = 0
+        self.count = 0
+
+    def live(self):
+        return np.flatnonzero(self.alive[:self.high])
+
+    def find(self, serials):
+        # Current slots of the given spawns that are still alive
+        h = self.high
+        return np.flatnonzero(self.alive[:h] & np.isin(self.serial[:h], serials))
+
+    def owned_by(self, owner):
+        h = self.high
+        return np.flatnonzero(self.alive[:h] & (self.owner[:h] == owner))
 
-# Bullet class
-class Bullet:
-    def __init__(self, x, y, direction, angle=0, speed=10, char="*", color=WHITE):
-        self.x = x
-        self.y = y
-        self.direction = direction  # 1 for enemy bullets (down), -1 for player bullets (up)
-        self.angle = angle  # Degrees, 0 is straight
-        self.speed = speed
-        self.char = char
-        self.color = color
-        self.width = 5
-        self.height = 5
-        
     def update(self):
-        # Calculate movement based on angle
-        rad_angle = math.radians(self.angle)
-        self.x += math.sin(rad_angle) * self.speed
-        self.y += self.direction * math.cos(rad_angle) * self.speed
+        h = self.high
+        x = self.x[:h]
+        y = self.y[:h]
+        self.px[:h] = x
+        self.py[:h] = y
+        x += self.vx[:h]
+        y += self.vy[:h]
+        offscreen = self.alive[:h] & ((y < 0) | (y > HEIGHT) | (x < 0) | (x > WIDTH))
+        self.release(np.flatnonzero(offscreen))
+        # Compact once the live bullets only fill a small part of the used range
+        if self.high > 2 * self.count + 64:
+            self.compact()
+
+    def compact(self):
+        h = self.high
+        keep = self.alive[:h]
+        n = self.count
+        for name in ("x", "y", "px", "py", "vx", "vy", "owner", "glyph", "color", "serial"):
+            array = getattr(self, name)
+            array[:n] = array[:h][keep]
+        self.alive[:h] = False
+        self.alive[:n] = True
+        self.free_top = self.capacity - n
+        self.free[:self.free_top] = np.arange(self.capacity - 1, n - 1, -1)
+        self.high = n
+
+    def draw(self, renderer, alpha):
+        slots = self.live()
+        renderer.bullets(self.glyph[slots], self.color[slots],
+                         lerp(self.px[slots], self.x[slots], alpha), lerp(self.py[slots], self.y[slots], alpha))
+
+def bullet_velocity(direction, angle, speed):
+    # Velocity per tick is resolved once at spawn; angle is in degrees, 0 is straight
+    rad_angle = np.radians(angle)
+    step = speed * TICK_SCALE
+    return np.sin(rad_angle) * step, direction * np.cos(rad_angle) * step
+
+# Bullet view: the bullets of one owner inside the shared pool
+class BulletView:
+    __slots__ = ("pool", "owner")
+
+    def __init__(self, pool, owner):
+        self.pool = pool
+        self.owner = owner
+
+    def spawn(self, x, y, direction, angle=0, speed=10, glyph=0, color=0):
+        vx, vy = bullet_velocity(direction, angle, speed)
+        self.pool.spawn(self.owner, x, y, vx, vy, glyph, color)
+
+    def clear(self):
+        self.pool.release_owner(self.owner)
+
+    def __len__(self):
+        return len(self.pool.owned_by(self.owner))
+
+# Bullet patterns: declared in patterns.json and compiled once into per-tick
+# velocity tables, so firing is at most one rotation of a table plus a
+# single batched spawn into the pool, with no trig per bullet
+PATTERN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "patterns.json")
+PATTERN_KINDS = ("ring", "spread", "aimed", "spiral", "rotating")
+COLOR_NAMES = {
+    "white": WHITE,
+    "yellow": YELLOW,
+    "red": RED,
+    "green": GREEN,
+    "blue": BLUE,
+    "cyan": CYAN,
+    "magenta": MAGENTA
+}
+
+class BulletPattern:
+    def __init__(self, name, spec):
+        self.name = name
+        self.kind = spec.get("type", "spread")
+        if self.kind not in PATTERN_KINDS:
+            raise ValueError(f"pattern {name!r}: unknown type {self.kind!r}")
+        count = int(spec.get("count", 1))
+        if count < 1:
+            raise ValueError(f"pattern {name!r}: count must be at least 1, not {count}")
+        offset = spec.get("offset", 0)
+        # Angles are in degrees with 0 pointing straight down the screen
+        if self.kind in ("ring", "spiral", "rotating") and "arc" not in spec:
+            angles = offset + np.arange(count) * 360 / count
+        elif count > 1:
+            arc = spec.get("arc", 0)
+            angles = offset + np.linspace(-arc / 2, arc / 2, count)
+        else:
+            angles = np.array([offset])
+        speed = spec.get("speed", 10)
+        if speed <= 0:
+            raise ValueError(f"pattern {name!r}: speed must be positive, not {speed}")
+        step = speed * TICK_SCALE
+        rad_angles = np.radians(angles)
+        self.vx = (np.sin(rad_angles) * step).astype(np.float32)
+        self.vy = (np.cos(rad_angles) * step).astype(np.float32)
         
-    def draw(self, surface):
-        text = game_font.render(self.char, True, self.color)
-        surface.blit(text, (self.x, self.y))
+        glyph = spec.get("glyph", "*")
+        color = spec.get("color", "white")
+        if glyph not in BULLET_CHARS or color not in COLOR_NAMES:
+            raise ValueError(f"pattern {name!r}: unknown glyph {glyph!r} or color {color!r}")
+        self.glyph = BULLET_CHARS.index(glyph)
+        self.color = BULLET_COLORS.index(COLOR_NAMES[color])
         
-    def is_offscreen(self):
-        return self.y < 0 or self.y > HEIGHT or self.x < 0 or self.x > WIDTH
+        self.step = spec.get("step", 0)  # spiral: degrees turned per emission
+        self.spin = spec.get("spin", 0)  # rotating: degrees per second
+        self.repeat = int(spec.get("repeat", 1))  # emissions per shot
+        self.interval = spec.get("interval", 0)  # milliseconds between repeats
+        self.sub = spec.get("sub")  # every bullet bursts into this pattern...
+        self.delay = spec.get("delay", 0)  # ...after this many milliseconds
+        if self.repeat < 1:
+            raise ValueError(f"pattern {name!r}: repeat must be at least 1, not {self.repeat}")
+        # Repeats and sub bursts need a wait, or they would all fire in one tick
+        if self.interval < 0 or (self.repeat > 1 and self.interval <= 0):
+            raise ValueError(f"pattern {name!r}: interval must be positive, not {self.interval}")
+        if self.delay < 0 or (self.sub is not None and self.delay <= 0):
+            raise ValueError(f"pattern {name!r}: delay must be positive, not {self.delay}")
+
+    def velocities(self, angle):
+        # Table rotated by angle degrees: one sin/cos pair per emission
+        if not angle:
+            return self.vx, self.vy
+        rad_angle = math.radians(angle)
+        return rotate(self.vx, self.vy, math.sin(rad_angle), math.cos(rad_angle))
+
+def rotate(vx, vy, sin_angle, cos_angle):
+    return vx * cos_angle + vy * sin_angle, vy * cos_angle - vx * sin_angle
+
+class PatternLibrary:
+    def __init__(self, data):
+        self.patterns = {name: BulletPattern(name, spec) for name, spec in data["patterns"].items()}
+        for pattern in self.patterns.values():
+            if pattern.sub is not None:
+                if pattern.sub not in self.patterns:
+                    raise ValueError(f"pattern {pattern.name!r}: unknown sub pattern {pattern.sub!r}")
+                pattern.sub = self.patterns[pattern.sub]
+        self.enemies = {}
+        for enemy_type, names in data["enemies"].items():
+            missing = [name for name in names if name not in self.patterns]
+            if missing:
+                raise ValueError(f"enemy {enemy_type!r}: unknown patterns {missing}")
+            self.enemies[enemy_type] = [self.patterns[name] for name in names]
+
+    def __getitem__(self, name):
+        return self.patterns[name]
+
+    def for_enemy(self, enemy_type):
+        return self.enemies[enemy_type]
+
+pattern_libraries = {}
+
+def load_patterns(path=PATTERN_FILE):
+    # Compiled once per file and shared by every game
+    library = pattern_libraries.get(path)
+    if library is None:
+        with open(path) as f:
+            library = PatternLibrary(json.load(f))
+        pattern_libraries[path] = library
+    return library
+
+# Pattern emitter: fires compiled patterns into the bullet pool and runs the
+# delayed parts (repeated bursts and sub-emitters) from a timed heap
+class PatternEmitter:
+    def __init__(self, pool, library):
+        self.pool = pool
+        self.library = library
+        self.pending = []  # (due, seq, owner, action, args)
+        self.seq = 0
+
+    def schedule(self, due, owner, action, *args):
+        self.seq += 1
+        heapq.heappush(self.pending, (due, self.seq, owner, action, args))
+
+    def fire(self, pattern, source, now, target=None):
+        self.emit(pattern, source, now, target)
+        if pattern.repeat > 1:
+            self.schedule(now + pattern.interval, source.bullets.owner, self.burst, pattern, source, target, pattern.repeat - 1)
+
+    def emit(self, pattern, source, now, target):
+        x, y = source.muzzle()
+        if pattern.kind == "aimed" and target is not None:
+            # Rotate the table towards the target without any trig
+            dx = target[0] - x
+            dy = target[1] - y
+            distance = math.hypot(dx, dy)
+            vx, vy = rotate(pattern.vx, pattern.vy, dx / distance, dy / distance) if distance else (pattern.vx, pattern.vy)
+        elif pattern.kind == "spiral":
+            vx, vy = pattern.velocities(source.phase)
+            source.phase += pattern.step
+        elif pattern.kind == "rotating":
+            vx, vy = pattern.velocities(pattern.spin * now / 1000)
+        else:
+            vx, vy = pattern.vx, pattern.vy
+        owner = source.bullets.owner
+        slots = self.pool.spawn(owner, x, y, vx, vy, pattern.glyph, pattern.color)
+        if pattern.sub is not None:
+            self.schedule(now + pattern.delay, owner, self.split, owner, pattern.sub, self.pool.serial[slots].copy())
+
+    def burst(self, now, pattern, source, target, remaining):
+        self.emit(pattern, source, now, target)
+        if remaining > 1:
+            self.schedule(now + pattern.interval, source.bullets.owner, self.burst, pattern, source, target, remaining - 1)
+
+    def split(self, now, owner, pattern, serials):
+        # Each surviving parent bullet becomes an emitter for the sub pattern
+        pool = self.pool
+        parents = pool.find(serials)
+        if not len(parents):
+            return
+        xs = pool.x[parents].copy()
+        ys = pool.y[parents].copy()
+        pool.release(parents)
+        n = len(pattern.vx)
+        slots = pool.spawn(owner, np.repeat(xs, n), np.repeat(ys, n), np.tile(pattern.vx, len(xs)),
+                           np.tile(pattern.vy, len(xs)), pattern.glyph, pattern.color)
+        if pattern.sub is not None:
+            self.schedule(now + pattern.delay, owner, self.split, owner, pattern.sub, pool.serial[slots].copy())
+
+    def update(self, now):
+        while self.pending and self.pending[0][0] <= now:
+            _, _, _, action, args = heapq.heappop(self.pending)
+            action(now, *args)
+
+    def cancel(self, owner):
+        # Drop everything still scheduled for a despawned emitter
+        self.pending = [entry for entry in self.pending if entry[2] != owner]
+        heapq.heapify(self.pending)
+
+    def cancel_all(self, owners):
+        owners = set(owners)
+        self.pending = [entry for entry in self.pending if entry[2] not in owners]
+        heapq.heapify(self.pending)
+
+    def clear(self):
+        self.pending.clear()
+
+# Enemy motion: the position, path and shoot timer of every enemy in
+# structure-of-arrays storage. A tick moves each path kind with one vectorized
+# update and finds all enemies whose cooldown ran out in a single pass. Paths:
+#   straight, zigzag, circular  the classic scout moves, straight down
+#   sine                        x swings around origin_x with its own amplitude,
+#                               frequency (radians per ms) and phase
+#   bezier                      a cubic curve through four control points over
+#                               duration ms, then straight down
+#   formation                   a fixed offset from a formation anchor, which
+#                               flies down and sways like a sine path
+PATH_KINDS = ("straight", "zigzag", "circular", "sine", "bezier", "formation")
+PATH_CODES = {name: code for code, name in enumerate(PATH_KINDS)}
+
+class EnemyMotion:
+    FIELDS = (("x", np.float64), ("y", np.float64), ("prev_x", np.float64), ("prev_y", np.float64),
+              ("width", np.float64), ("height", np.float64), ("speed", np.float64), ("angle", np.float64),
+              ("path", np.uint8), ("start", np.float64), ("origin_x", np.float64), ("sine_amp", np.float64),
+              ("sine_freq", np.float64), ("sine_phase", np.float64), ("duration", np.float64),
+              ("formation", np.int32), ("offset_x", np.float64), ("offset_y", np.float64),
+              ("last_shot", np.float64), ("shoot_delay", np.float64), ("seq", np.int64), ("alive", bool),
+              ("health", np.int64), ("points", np.int64), ("boss", bool))
+    FORMATION_FIELDS = (("fx", np.float64), ("fy", np.float64), ("f_origin_x", np.float64),
+                        ("f_speed", np.float64), ("f_amp", np.float64), ("f_freq", np.float64),
+                        ("f_phase", np.float64), ("f_start", np.float64), ("f_members", np.int32))
+
+    def __init__(self, capacity=64, formations=8):
+        self.capacity = 0
+        for name, dtype in self.FIELDS:
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self.control = np.zeros((0, 4, 2))  # bezier control points
+        self.enemies = []  # slot -> Enemy
+        self.free = []  # stack of free slots, lowest on top
+        self.high = 0  # no live enemy at or above this slot
+        self.next_seq = 0
+        self.formation_capacity = 0
+        for name, dtype in self.FORMATION_FIELDS:
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self.free_formations = []
+        self.grow(capacity)
+        self.grow_formations(formations)
+        self.movers = [(PATH_CODES[name], getattr(self, "move_" + name)) for name in PATH_KINDS]
+
+    def grow(self, capacity):
+        old = self.capacity
+        for name, _ in self.FIELDS:
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+        control = np.zeros((capacity, 4, 2))
+        control[:old] = self.control
+        self.control = control
+        self.enemies += [None] * (capacity - old)
+        self.free = list(range(capacity - 1, old - 1, -1)) + self.free
+        self.capacity = capacity
+
+    def grow_formations(self, capacity):
+        old = self.formation_capacity
+        for name, _ in self.FORMATION_FIELDS:
+            array = getattr(self, name)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+        self.free_formations = list(range(capacity - 1, old - 1, -1)) + self.free_formations
+        self.formation_capacity = capacity
+
+    def spawn(self, enemy, x, y, width, height, speed, path, shoot_delay, now):
+        if not self.free:
+            self.grow(self.capacity * 2)
+        slot = self.free.pop()
+        self.x[slot] = self.prev_x[slot] = x
+        self.y[slot] = self.prev_y[slot] = y
+        self.width[slot] = width
+        self.height[slot] = height
+        self.speed[slot] = speed
+        self.angle[slot] = 0
+        self.path[slot] = PATH_CODES[path]
+        self.start[slot] = now
+        self.formation[slot] = -1
+        self.last_shot[slot] = now
+        self.shoot_delay[slot] = shoot_delay
+        self.seq[slot] = self.next_seq
+        self.next_seq += 1
+        self.alive[slot] = True
+        self.enemies[slot] = enemy
+        self.high = max(self.high, slot + 1)
+        return slot
+
+    def release(self, slot):
+        if not self.alive[slot]:
+            return
+        self.alive[slot] = False
+        self.enemies[slot] = None
+        formation = self.formation[slot]
+        if formation >= 0:
+            self.f_members[formation] -= 1
+            if self.f_members[formation] == 0:
+                self.free_formations.append(formation)
+        self.free.append(slot)
+        while self.high and not self.alive[self.high - 1]:
+            self.high -= 1
+
+    def release_many(self, slots):
+        # release() for each slot in turn, in one pass
+        slots = np.asarray(slots, dtype=np.int64)
+        slots = slots[self.alive[slots]]
+        if not len(slots):
+            return
+        self.alive[slots] = False
+        for slot in slots.tolist():
+            self.enemies[slot] = None
+        formations = self.formation[slots]
+        formations = formations[formations >= 0]
+        if len(formations):
+            np.subtract.at(self.f_members, formations, 1)
+            # Emptied formations are freed in the order their last member went
+            last = {formation: i for i, formation in enumerate(formations.tolist())}
+            self.free_formations += [formation for formation in sorted(last, key=last.get)
+                                     if self.f_members[formation] == 0]
+        self.free += slots.tolist()
+        alive = np.flatnonzero(self.alive[:self.high])
+        self.high = int(alive[-1]) + 1 if len(alive) else 0
+
+    def clear(self):
+        self.alive[:] = False
+        self.enemies = [None] * self.capacity
+        self.free = list(range(self.capacity - 1, -1, -1))
+        self.high = 0
+        self.f_members[:] = 0
+        self.free_formations = list(range(self.formation_capacity - 1, -1, -1))
+
+    def sine(self, slot, origin_x, amplitude, frequency, phase=0.0):
+        self.path[slot] = PATH_CODES["sine"]
+        self.origin_x[slot] = origin_x
+        self.sine_amp[slot] = amplitude
+        self.sine_freq[slot] = frequency
+        self.sine_phase[slot] = phase
+
+    def bezier(self, slot, points, duration, start):
+        # Waits at the first point until start (game time in ms)
+        self.path[slot] = PATH_CODES["bezier"]
+        self.control[slot] = points
+        self.duration[slot] = duration
+        self.start[slot] = start
+        self.x[slot] = self.prev_x[slot] = points[0][0]
+        self.y[slot] = self.prev_y[slot] = points[0][1]
+
+    def add_formation(self, x, y, speed, amplitude, frequency, phase, now):
+        if not self.free_formations:
+            self.grow_formations(self.formation_capacity * 2)
+        formation = self.free_formations.pop()
+        self.fx[formation] = self.f_origin_x[formation] = x
+        self.fy[formation] = y
+        self.f_speed[formation] = speed
+        self.f_amp[formation] = amplitude
+        self.f_freq[formation] = frequency
+        self.f_phase[formation] = phase
+        self.f_start[formation] = now
+        self.f_members[formation] = 0
+        return formation
+
+    def follow(self, slot, formation, offset_x, offset_y):
+        self.path[slot] = PATH_CODES["formation"]
+        self.formation[slot] = formation
+        self.offset_x[slot] = offset_x
+        self.offset_y[slot] = offset_y
+        self.f_members[formation] += 1
+        self.x[slot] = self.prev_x[slot] = self.fx[formation] + offset_x
+        self.y[slot] = self.prev_y[slot] = self.fy[formation] + offset_y
+
+    def update(self, now):
+        n = self.high
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+        live = self.alive[:n]
+        path = self.path[:n]
+        for code, move in self.movers:
+            slots = np.flatnonzero(live & (path == code))
+            if len(slots):
+                move(slots, now)
+
+    def move_straight(self, slots, now):
+        self.y[slots] += self.speed[slots] * TICK_SCALE
+
+    def move_zigzag(self, slots, now):
+        self.x[slots] += math.sin(now * 0.002) * 2 * TICK_SCALE
+        self.y[slots] += self.speed[slots] * TICK_SCALE
+
+    def move_circular(self, slots, now):
+        self.angle[slots] += 0.05 * TICK_SCALE
+        self.x[slots] += np.sin(self.angle[slots]) * 2 * TICK_SCALE
+        self.y[slots] += self.speed[slots] * TICK_SCALE
+
+    def move_sine(self, slots, now):
+        self.x[slots] = self.origin_x[slots] + self.sine_amp[slots] * np.sin(
+            self.sine_freq[slots] * (now - self.start[slots]) + self.sine_phase[slots])
+        self.y[slots] += self.speed[slots] * TICK_SCALE
+
+    def move_bezier(self, slots, now):
+        u = np.clip((now - self.start[slots]) / self.duration[slots], 0.0, 1.0)
+        done = u >= 1.0
+        self.y[slots[done]] += self.speed[slots[done]] * TICK_SCALE
+        on_path = slots[~done]
+        if len(on_path):
+            u = u[~done, None]
+            v = 1.0 - u
+            p = self.control[on_path]
+            point = v * v * v * p[:, 0] + 3 * v * v * u * p[:, 1] + 3 * v * u * u * p[:, 2] + u * u * u * p[:, 3]
+            self.x[on_path] = point[:, 0]
+            self.y[on_path] = point[:, 1]
+
+    def move_formation(self, slots, now):
+        # Anchors of every formation in use move first, then members take their offsets
+        active = np.flatnonzero(self.f_members > 0)
+        self.fy[active] += self.f_speed[active] * TICK_SCALE
+        self.fx[active] = self.f_origin_x[active] + self.f_amp[active] * np.sin(
+            self.f_freq[active] * (now - self.f_start[active]) + self.f_phase[active])
+        formation = self.formation[slots]
+        self.x[slots] = self.fx[formation] + self.offset_x[slots]
+        self.y[slots] = self.fy[formation] + self.offset_y[slots]
+
+    def in_spawn_order(self, mask):
+        slots = np.flatnonzero(mask)
+        if len(slots) > 1:
+            slots = slots[np.argsort(self.seq[slots], kind="stable")]
+        return slots
+
+    def order(self):
+        # Live slots in spawn order, the order of Game.enemies
+        return self.in_spawn_order(self.alive[:self.high])
+
+    def ready(self, now):
+        # Slots whose shoot cooldown ran out, in spawn order; their timers restart
+        n = self.high
+        slots = self.in_spawn_order(self.alive[:n] & (now - self.last_shot[:n] > self.shoot_delay[:n]))
+        self.last_shot[slots] = now
+        return slots
+
+    def offscreen(self):
+        n = self.high
+        return self.in_spawn_order(self.alive[:n] & (self.y[:n] > HEIGHT + 50))
+
+    def boxes(self, slots):
+        return (self.x[slots].astype(np.float32), self.y[slots].astype(np.float32),
+                self.width[slots].astype(np.float32), self.height[slots].astype(np.float32))
+
+def motion_field(name, cast=float):
+    # Enemy attribute stored in its EnemyMotion slot
+    def get(self):
+        return cast(getattr(self.motion, name)[self.slot])
+
+    def set(self, value):
+        getattr(self.motion, name)[self.slot] = value
+    return property(get, set)
 
 # Enemy class
+# Entities use __slots__ so thousands of them stay small, and are recycled
+# through an EntityPool: spawn() reinitializes a released instance in place.
+# Kinematics and the shoot timer live in the shared EnemyMotion arrays
 class Enemy:
-    def __init__(self, x, y, enemy_type="normal"):
-        self.x = x
-        self.y = y
+    __slots__ = ("motion", "slot", "width", "height", "rng", "emitter", "bullets", "patterns", "phase",
+                 "enemy_type")
+
+    MOVEMENT_PATTERNS = ("straight", "zigzag", "circular")
+
+    x = motion_field("x")
+    y = motion_field("y")
+    prev_x = motion_field("prev_x")
+    prev_y = motion_field("prev_y")
+    speed = motion_field("speed")
+    angle = motion_field("angle")
+    last_shot = motion_field("last_shot")
+    shoot_delay = motion_field("shoot_delay")
+    health = motion_field("health", int)
+
+    def __init__(self, x, y, motion, emitter, rng, now, enemy_type="normal"):
+        self.bullets = None
+        self.spawn(x, y, motion, emitter, rng, now, enemy_type)
+
+    def spawn(self, x, y, motion, emitter, rng, now, enemy_type="normal"):
         self.width = 30
         self.height = 30
-        self.speed = random.randint(1, 3)
-        self.bullets = []
-        self.shoot_delay = random.randint(1000, 3000)
-        self.last_shot = pygame.time.get_ticks()
-        self.health = 3 if enemy_type == "normal" else 10
+        self.rng = rng
+        speed = rng.randint(tuning.enemy_min_speed, tuning.enemy_max_speed)
+        self.emitter = emitter
+        # A recycled enemy keeps its view but takes a fresh owner id, so
+        # bullets left behind by its previous life stay independent
+        if self.bullets is None or self.bullets.pool is not emitter.pool:
+            self.bullets = BulletView(emitter.pool, emitter.pool.new_owner())
+        else:
+            self.bullets.owner = emitter.pool.new_owner()
+        self.patterns = emitter.library.for_enemy(enemy_type)
+        self.phase = 0.0  # spiral patterns turn this between shots
+        shoot_delay = rng.randint(tuning.enemy_min_shoot_delay, tuning.enemy_max_shoot_delay)
         self.enemy_type = enemy_type
-        self.movement_pattern = random.choice(["straight", "zigzag", "circular"])
-        self.angle = 0
-        
-    def update(self):
-        # Different movement patterns
-        if self.movement_pattern == "straight":
-            self.y += self.speed
-        elif self.movement_pattern == "zigzag":
-            self.x += math.sin(pygame.time.get_ticks() * 0.002) * 2
-            self.y += self.speed
-        elif self.movement_pattern == "circular":
-            self.angle += 0.05
-            self.x += math.sin(self.angle) * 2
-            self.y += self.speed
-            
-        # Shoot bullets
-        now = pygame.time.get_ticks()
-        if now - self.last_shot > self.shoot_delay:
-            self.last_shot = now
-            self.shoot()
-            
-    def shoot(self):
-        if self.enemy_type == "boss":
-            # Boss shoots multiple bullets in patterns
-            pattern = random.choice(["circle", "spread", "aimed"])
-            
-            if pattern == "circle":
-                for angle in range(0, 360, 30):
-                    self.bullets.append(Bullet(self.x + self.width // 2, self.y + self.height, 1, angle=angle, char="+", color=RED))
-            elif pattern == "spread":
-                for angle in range(-45, 46, 15):
-                    self.bullets.append(Bullet(self.x + self.width // 2, self.y + self.height, 1, angle=angle, char="*", color=MAGENTA))
-            else:  # aimed
-                for i in range(-2, 3):
-                    self.bullets.append(Bullet(self.x + self.width // 2, self.y + self.height, 1, angle=i*10, speed=5, char="o", color=CYAN))
+        self.motion = motion
+        self.slot = motion.spawn(self, x, y, self.width, self.height, speed,
+                                 rng.choice(self.MOVEMENT_PATTERNS), shoot_delay, now)
+        motion.boss[self.slot] = enemy_type == "boss"
+        if enemy_type == "normal":
+            self.health = tuning.enemy_health
+            motion.points[self.slot] = tuning.enemy_points
+        else:
+            self.health = tuning.enemy_boss_health
+            motion.points[self.slot] = tuning.enemy_boss_points
+
+    @property
+    def movement_pattern(self):
+        return PATH_KINDS[self.motion.path[self.slot]]
+
+    @movement_pattern.setter
+    def movement_pattern(self, name):
+        self.motion.path[self.slot] = PATH_CODES[name]
+
+    def shoot(self, now, target):
+        # Bosses pick one of several patterns, normal enemies have just one
+        if len(self.patterns) > 1:
+            pattern = self.rng.choice(self.patterns)
         else:
-            # Normal enemies shoot simple bullets
-            self.bullets.append(Bullet(self.x + self.width // 2, self.y + self.height, 1, char="v", color=YELLOW))
+            pattern = self.patterns[0]
+        self.emitter.fire(pattern, self, now, target)
     
-    def draw(self, surface):
+    def muzzle(self):
+        return self.x + self.width // 2, self.y + self.height
+    
+    def draw(self, renderer, alpha):
+        x = lerp(self.prev_x, self.x, alpha)
+        y = lerp(self.prev_y, self.y, alpha)
         if self.enemy_type == "boss":
-            boss = [
-                " /^\\/^\\ ",
-                "<|00  |>",
-                " \\VV__/ "
-            ]
-            for i, line in enumerate(boss):
-                text = game_font.render(line, True, RED)
-                surface.blit(text, (self.x - 10, self.y + i * 15))
+            renderer.art(BOSS_ART, x - 10, y, RED)
         else:
-            enemy = [
-                "/\\_/\\",
-                "o o ",
-                ">-<"
-            ]
-            for i, line in enumerate(enemy):
-                text = game_font.render(line, True, YELLOW)
-                surface.blit(text, (self.x, self.y + i * 15))
+            renderer.art(ENEMY_ART, x, y, YELLOW)
     
-    def is_offscreen(self):
-        return self.y > HEIGHT + 50
 
 # Powerup class
 class Powerup:
-    def __init__(self, x, y):
+    __slots__ = ("x", "y", "prev_y", "width", "height", "speed", "powerup_type")
+
+    TYPES = ("double", "triple", "speed", "bomb")
+    COLORS = {
+        "double": YELLOW,
+        "triple": CYAN,
+        "speed": GREEN,
+        "bomb": RED
+    }
+
+    def __init__(self, x, y, rng):
+        self.spawn(x, y, rng)
+
+    def spawn(self, x, y, rng):
         self.x = x
         self.y = y
+        self.prev_y = y
         self.width = 20
         self.height = 20
-        self.speed = 2
-        self.powerup_type = random.choice(["double", "triple", "speed", "bomb"])
-        self.colors = {
-            "double": YELLOW,
-            "triple": CYAN,
-            "speed": GREEN,
-            "bomb": RED
-        }
+        self.speed = tuning.powerup_speed
+        self.powerup_type = rng.choice(self.TYPES)
         
     def update(self):
-        self.y += self.speed
-        
-    def draw(self, surface):
-        symbols = {
-            "double": "D",
-            "triple": "T",
-            "speed": "S",
-            "bomb": "B"
-        }
+        self.prev_y = self.y
+        self.y += self.speed * TICK_SCALE
         
+    def draw(self, renderer, alpha):
         # Draw powerup
-        pygame.draw.circle(surface, self.colors[self.powerup_type], (self.x + self.width // 2, self.y + self.height // 2), 10)
-        text = game_font.render(symbols[self.powerup_type], True, BLACK)
-        text_rect = text.get_rect(center=(self.x + self.width // 2, self.y + self.height // 2))
-        surface.blit(text, text_rect)
+        center = (self.x + self.width // 2, lerp(self.prev_y, self.y, alpha) + self.height // 2)
+        renderer.badge(POWERUP_SYMBOLS[self.powerup_type], center, 10, self.COLORS[self.powerup_type])
     
     def is_offscreen(self):
         return self.y > HEIGHT
 
-# Star class for background
-class Star:
-    def __init__(self):
-        self.x = random.randint(0, WIDTH)
-        self.y = random.randint(0, HEIGHT)
-        self.speed = random.randint(1, 3)
-        self.char = random.choice(['*', '.', '+', '·'])
-        
-    def update(self):
-        self.y += self.speed
-        if self.y > HEIGHT:
-            self.y = 0
-            self.x = random.randint(0, WIDTH)
-            
-    def draw(self, surface):
-        text = game_font.render(self.char, True, WHITE)
-        surface.blit(text, (self.x, self.y))
+# Particles: explosions, bomb shockwaves and hit sparks. They live in a
+# fixed-capacity ring buffer of arrays where new particles overwrite the
+# oldest, so heavy effects never allocate storage during gameplay. They are
+# purely cosmetic and draw from their own generator, never the game's rng
+PARTICLE_CAPACITY = 1024
+PARTICLE_DRAG = 0.96  # velocity kept per tick
+SHOCKWAVE_COUNT = 48
+DEBRIS, SPARK, RING = 0, 3, 4  # first glyph of each kind in PARTICLE_CHARS; debris picks from three
+
+class ParticleSystem:
+    def __init__(self, capacity=PARTICLE_CAPACITY, seed=None):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.px = np.zeros(capacity, dtype=np.float32)  # position at the previous tick
+        self.py = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.int32)  # ticks lived
+        self.life = np.zeros(capacity, dtype=np.int32)  # ticks to live, 0 for a free slot
+        self.glyph = np.zeros(capacity, dtype=np.uint8)
+        self.color = np.zeros(capacity, dtype=np.uint8)
+        self.head = 0  # next slot written, holding the oldest particle
+        self.remaining = 0  # ticks until every particle is gone; nothing runs while 0
+        self.rng = np.random.default_rng(seed)
+        angles = np.linspace(0, 2 * math.pi, SHOCKWAVE_COUNT, endpoint=False)
+        self.ring_x = np.cos(angles).astype(np.float32)
+        self.ring_y = np.sin(angles).astype(np.float32)
+
+    def clear(self):
+        self.life[:] = 0
+        self.remaining = 0
+
+    def emit(self, x, y, vx, vy, life, glyph, color):
+        # vx, vy and life are arrays; the rest may be arrays or scalars
+        n = min(len(vx), self.capacity)
+        first = min(n, self.capacity - self.head)
+        for slots, part in ((slice(self.head, self.head + first), slice(0, first)),
+                            (slice(0, n - first), slice(first, n))):
+            for name, value in (("x", x), ("y", y), ("vx", vx), ("vy", vy), ("life", life),
+                                ("glyph", glyph), ("color", color)):
+                getattr(self, name)[slots] = value[part] if np.ndim(value) else value
+            self.px[slots] = self.x[slots]
+            self.py[slots] = self.y[slots]
+            self.age[slots] = 0
+        self.head = (self.head + n) % self.capacity
+        self.remaining = max(self.remaining, int(life.max()))
+
+    def explosion(self, x, y, color, count=16, speed=2.0):
+        # x and y may be arrays for one explosion each, in which case every
+        # explosion gets a share of the buffer
+        points = np.size(x)
+        if np.ndim(x):
+            count = max(1, min(count, self.capacity // points))
+            x = np.repeat(x, count)
+            y = np.repeat(y, count)
+        n = points * count
+        angle = self.rng.uniform(0, 2 * math.pi, n)
+        speed = self.rng.uniform(0.3, 1.0, n) * speed
+        self.emit(x, y, np.cos(angle) * speed, np.sin(angle) * speed, self.rng.integers(30, 60, n),
+                  self.rng.integers(DEBRIS, DEBRIS + 3, n), color)
+
+    def shockwave(self, x, y, color=3, speed=6.0):
+        self.emit(x, y, self.ring_x * speed, self.ring_y * speed, np.full(SHOCKWAVE_COUNT, 60), RING, color)
+
+    def sparks(self, x, y, color=0, count=8, speed=3.0):
+        angle = self.rng.uniform(0, 2 * math.pi, count)
+        self.emit(x, y, np.cos(angle) * speed, np.sin(angle) * speed, self.rng.integers(10, 20, count), SPARK, color)
 
-# Game class
-class Game:
-    def __init__(self):
-        self.state = GameState.TITLE
-        self.player = Player()
-        self.enemies = []
-        self.powerups = []
-        self.stars = [Star() for _ in range(100)]
-        self.enemy_spawn_timer = 0
-        self.boss_timer = 0
-        self.background_offset = 0
-        
-    def reset_game(self):
-        self.player.reset()
-        self.enemies = []
-        self.powerups = []
-        self.enemy_spawn_timer = pygame.time.get_ticks()
-        self.boss_timer = pygame.time.get_ticks()
-        
     def update(self):
-        # Update background stars
-        for star in self.stars:
-            star.update()
-            
-        if self.state == GameState.GAMEPLAY:
-            # Update player
-            keys = pygame.key.get_pressed()
-            self.player.move(keys)
-            self.player.update_powerups()
-            
-            if keys[pygame.K_SPACE]:
-                self.player.shoot()
-                
-            if keys[pygame.K_b]:
-                if self.player.use_bomb():
-                    # Clear all enemies and bullets
-                    for enemy in self.enemies:
-                        self.player.score += 100
-                    self.enemies = []
-                    for enemy in self.enemies:
-                        enemy.bullets = []
-            
-            # Spawn enemies
-            now = pygame.time.get_ticks()
-            if now - self.enemy_spawn_timer > 1500:  # Spawn enemy every 1.5 seconds
-                self.enemy_spawn_timer = now
-                self.enemies.append(Enemy(random.randint(50, WIDTH - 50), -30))
-                
-            # Spawn boss
-            if now - self.boss_timer > 30000:  # Boss every 30 seconds
-                self.boss_timer = now
-                self.enemies.append(Enemy(WIDTH // 2 - 50, -50, enemy_type="boss"))
-                
-            # Update bullets
-            for bullet in self.player.bullets[:]:
-                bullet.update()
-                if bullet.is_offscreen():
-                    self.player.bullets.remove(bullet)
-            
-            # Update enemies
-            for enemy in self.enemies[:]:
-                enemy.update()
-                
-                # Enemy bullet updates
-                for bullet in enemy.bullets[:]:
-                    bullet.update()
-                    if bullet.is_offscreen():
-                        enemy.bullets.remove(bullet)
-                    elif not self.player.invincible and self.check_collision(bullet.x, bullet.y, bullet.width, bullet.height,
-                                  self.player.x, self.player.y, self.player.width, self.player.height):
-                        enemy.bullets.remove(bullet)
-                        self.player.lives -= 1
-                        self.player.invincible = True
-                        self.player.invincible_timer = pygame.time.get_ticks()
-                        if self.player.lives <= 0:
-                            self.state = GameState.GAME_OVER
-                
-                # Check if enemy is hit by player's bullet
-                for bullet in self.player.bullets[:]:
-                    if self.check_collision(bullet.x, bullet.y, bullet.width, bullet.height,
-                                  enemy.x, enemy.y, enemy.width, enemy.height):
-                        self.player.bullets.remove(bullet)
-                        enemy.health -= 1
-                        if enemy.health <= 0:
-                            self.enemies.remove(enemy)
-                            self.player.score += 500 if enemy.enemy_type == "boss" else 100
-                            
-                            # Chance to spawn powerup
-                            if random.random() < 0.3 or enemy.enemy_type == "boss":
-                                self.powerups.append(Powerup(enemy.x, enemy.y))
-                            break
-                
-                if enemy.is_offscreen():
-                    self.enemies.remove(enemy)
-            
-            # Update powerups
-            for powerup in self.powerups[:]:
-                powerup.update()
-                if powerup.is_offscreen():
-                    self.powerups.remove(powerup)
-                elif self.check_collision(powerup.x, powerup.y, powerup.width, powerup.height,
-                              self.player.x, self.player.y, self.player.width, self.player.height):
-                    self.player.apply_powerup(powerup.powerup_type)
-                    self.powerups.remove(powerup)
-    
-    def check_collision(self, x1, y1, w1, h1, x2, y2, w2, h2):
-        return (x1 < x2 + w2 and x1 + w1 > x2 and
-                y1 < y2 + h2 and y1 + h1 > y2)
-    
-    def draw_title_screen(self):
-        # Draw stars
-        for star in self.stars:
-            star.draw(screen)
-        
-        # Draw title
-        title_text = title_font.render("TuxAscii", True, WHITE)
-        title_rect = title_text.get_rect(center=(WIDTH // 2, HEIGHT // 4))
-        screen.blit(title_text, title_rect)
-        
-        # Draw by line
-        by_text = menu_font.render("By ElysiumSoft 2025", True, WHITE)
-        by_rect = by_text.get_rect(center=(WIDTH // 2, HEIGHT // 4 + 50))
-        screen.blit(by_text, by_rect)
-        
-        # Draw menu options
-        options = [
-            "S [Start Game]",
-            "A [Lore]",
-            "D [Controls]"
-        ]
-        
-        for i, option in enumerate(options):
-            option_text = menu_font.render(option, True, WHITE)
-            option_rect = option_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + i * 40))
-            screen.blit(option_text, option_rect)
-    
-    def draw_lore_screen(self):
-        # Draw stars
-        for star in self.stars:
-            star.draw(screen)
-        
-        # Draw title
-        title_text = big_font.render("Lore", True, WHITE)
-        title_rect = title_text.get_rect(center=(WIDTH // 2, 50))
-        screen.blit(title_text, title_rect)
-        
-        # Draw lore text
-        lore_text = [
-            "In the year 2099, the cosmic emperor Propriebus has",
-            "declared war on all open-source lifeforms. His armies",
-            "of locked-down drones sweep through the galaxy,",
-            "assimilating all in their path.",
-            "",
-            "Only one hero remains to defend the freedom of code:",
-            "Tux, the last penguin warrior, armed with the power",
-            "of ASCII and an unbreakable spirit of openness.",
-            "",
-            "Pilot Tux through waves of enemies and reclaim the",
-            "digital universe one character at a time!"
-        ]
-        
-        for i, line in enumerate(lore_text):
-            line_text = menu_font.render(line, True, WHITE)
-            line_rect = line_text.get_rect(center=(WIDTH // 2, 150 + i * 30))
-            screen.blit(line_text, line_rect)
-        
-        # Draw back instruction
-        back_text = menu_font.render("Press Q to return to title screen", True, WHITE)
-        back_rect = back_text.get_rect(center=(WIDTH // 2, HEIGHT - 50))
-        screen.blit(back_text, back_rect)
-    
-    def draw_controls_screen(self):
-        # Draw stars
-        for star in self.stars:
-            star.draw(screen)
-        
-        # Draw title
-        title_text = big_font.render("Controls", True, WHITE)
-        title_rect = title_text.get_rect(center=(WIDTH // 2, 50))
-        screen.blit(title_text, title_rect)
-        
-        # Draw controls text
-        controls_text = [
-            "Arrow Keys - Move Tux",
-            "Space - Shoot",
-            "B - Use Bomb (clears all enemies)",
-            "Q - Quit to title screen",
-            "",
-            "Power-ups:",
-            "D - Double shot",
-            "T - Triple shot",
-            "S - Speed boost",
-            "B - Extra bomb"
-        ]
-        
-        for i, line in enumerate(controls_text):
-            line_text = menu_font.render(line, True, WHITE)
-            line_rect = line_text.get_rect(center=(WIDTH // 2, 150 + i * 30))
-            screen.blit(line_text, line_rect)
-        
-        # Draw back instruction
-        back_text = menu_font.render("Press Q to return to title screen", True, WHITE)
-        back_rect = back_text.get_rect(center=(WIDTH // 2, HEIGHT - 50))
-        screen.blit(back_text, back_rect)
-    
-    def draw_game_over_screen(self):
-        # Draw stars
-        for star in self.stars:
-            star.draw(screen)
-        
-        # Draw game over text
-        game_over_text = big_font.render("GAME OVER", True, RED)
-        game_over_rect = game_over_text.get_rect(center=(WIDTH // 2, HEIGHT // 3))
-        screen.blit(game_over_text, game_over_rect)
-        
-        # Draw score
-        score_text = menu_font.render(f"Final Score: {self.player.score}", True, WHITE)
-        score_rect = score_text.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-        screen.blit(score_text, score_rect)
-        
-        # Draw restart instructions
-        restart_text = menu_font.render("Press R to restart", True, WHITE)
-        restart_rect = restart_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 50))
-        screen.blit(restart_text, restart_rect)
-        
-        # Draw quit instructions
-        quit_text = menu_font.render("Press Q to return to title screen", True, WHITE)
-        quit_rect = quit_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 100))
-        screen.blit(quit_text, quit_rect)
-    
-    def draw_gameplay(self):
-        # Draw stars
-        for star in self.stars:
-            star.draw(screen)
-        
-        # Draw player
-        self.player.draw(screen)
-        
-        # Draw player bullets
-        for bullet in self.player.bullets:
-            bullet.draw(screen)
-        
-        # Draw enemies and their bullets
-        for enemy in self.enemies:
-            enemy.draw(screen)
-            for bullet in enemy.bullets:
-                bullet.draw(screen)
-        
-        # Draw powerups
-        for powerup in self.powerups:
-            powerup.draw(screen)
-        
-        # Draw HUD
-        score_text = game_font.render(f"Score: {self.player.score}", True, WHITE)
-        screen.blit(score_text, (10, 10))
-        
-        lives_text = game_font.render(f"Lives: {self.player.lives}", True, WHITE)
-        screen.blit(lives_text, (10, 30))
-        
-        bombs_text = game_font.render(f"Bombs: {self.player.bombs}", True, WHITE)
-        screen.blit(bombs_text, (10, 50))
-        
-        power_text = game_font.render(f"Power: {self.player.power_type.capitalize()}", True, self.get_power_color())
-        screen.blit(power_text, (10, 70))
-    
-    def get_power_color(self):
-        if self.player.power_type == "double":
-            return YELLOW
-        elif self.player.power_type == "triple":
-            return CYAN
-        elif self.player.power_type == "speed":
-            return GREEN
-        elif self.player.power_type == "bomb":
-            return RED
+        if not self.remaining:
+            return
+        self.remaining -= 1
+        self.px[:] = self.x
+        self.py[:] = self.y
+        self.x += self.vx
+        self.y += self.vy
+        self.vx *= PARTICLE_DRAG
+        self.vy *= PARTICLE_DRAG
+        self.age += 1
+
+    def draw(self, renderer, alpha):
+        if not self.remaining:
+            return
+        slots = np.flatnonzero(self.age < self.life)
+        cap = renderer.quality.cosmetic_cap
+        if cap is not None and len(slots) > cap:
+            # The youngest particles are the ones still bright
+            slots = slots[np.argsort(self.age[slots], kind="stable")[:cap]]
+        profiler.count("particles", len(slots))
+        shades = self.color[slots] * PARTICLE_FADE + self.age[slots] * PARTICLE_FADE // self.life[slots]
+        renderer.particles(self.glyph[slots], shades,
+                           lerp(self.px[slots], self.x[slots], alpha), lerp(self.py[slots], self.y[slots], alpha))
+
+# Starfield: parallax background baked into a few tall layer surfaces that
+# scroll with wrap-around blits, so any star density costs two blits per layer
+class Starfield:
+    def __init__(self, star_count=100, layer_count=3, seed=None):
+        if layer_count < 1:
+            raise ValueError(f"starfield needs at least one layer, not {layer_count}")
+        self.star_count = star_count
+        self.layer_count = layer_count
+        self.rng = random.Random(seed)
+        self.layer_height = HEIGHT * 2  # taller than the screen so the pattern repeats less often
+        # Layers scroll at 1 to 3 pixels per frame, far to near
+        if layer_count > 1:
+            self.speeds = [1 + 2 * i / (layer_count - 1) for i in range(layer_count)]
         else:
-            return WHITE
-    
-    def draw(self):
-        screen.fill(BLACK)
-        
-        if self.state == GameState.TITLE:
-            self.draw_title_screen()
-        elif self.state == GameState.LORE:
-            self.draw_lore_screen()
-        elif self.state == GameState.CONTROLS:
-            self.draw_controls_screen()
-        elif self.state == GameState.GAMEPLAY:
-            self.draw_gameplay()
-        elif self.state == GameState.GAME_OVER:
-            self.draw_game_over_screen()
-        
-        pygame.display.flip()
+            self.speeds = [2]
+        self.offsets = [0.0] * layer_count
+        self.prev_offsets = [0.0] * layer_count
+        self.stars = None  # (chars, xs, ys) per layer, generated on first use
+        self.layers = None  # baked on first draw
+
+    def star_layers(self):
+        if self.stars is None:
+            self.stars = []
+            per_layer = self.star_count * self.layer_height // HEIGHT // self.layer_count
+            for _ in range(self.layer_count):
+                chars, xs, ys = [], [], []
+                for _ in range(per_layer):
+                    chars.append(self.rng.choice(STAR_CHARS))
+                    xs.append(self.rng.randint(0, WIDTH))
+                    ys.append(self.rng.randint(0, self.layer_height))
+                self.stars.append((chars, np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64)))
+        return self.stars
+
+    def bake(self):
+        self.layers = []
+        for chars, xs, ys in self.star_layers():
+            layer = pygame.Surface((WIDTH, self.layer_height))
+            layer.fill(BLACK)
+            for char, x, y in zip(chars, xs.tolist(), ys.tolist()):
+                layer.blit(glyph_atlas.get(char, game_font, WHITE), (x, y))
+            layer.set_colorkey(BLACK, pygame.RLEACCEL)
+            self.layers.append(layer)
+
+    def scroll(self, alpha):
+        # Interpolated offset of every layer, in pixels within the layer height
+        return [int(lerp(prev, offset, alpha)) % self.layer_height
+                for prev, offset in zip(self.prev_offsets, self.offsets)]
+
+    def update(self):
+        for i, speed in enumerate(self.speeds):
+            self.prev_offsets[i] = self.offsets[i]
+            self.offsets[i] += speed * TICK_SCALE
+
+    def draw(self, surface, alpha, layers=None):
+        # layers limits drawing to that many of the nearest layers
+        if self.layers is None:
+            self.bake()
+        height = self.layer_height
+        start = 0 if layers is None else max(0, self.layer_count - layers)
+        for layer, y in zip(self.layers[start:], self.scroll(alpha)[start:]):
+            surface.blit(layer, (0, y))
+            surface.blit(layer, (0, y - height))
+
+# Vectorized AABB narrow phase; works elementwise on scalars or arrays
+def aabb_overlap(x1, y1, w1, h1, x2, y2, w2, h2):
+    return (x1 < x2 + w2) & (x1 + w1 > x2) & (y1 < y2 + h2) & (y1 + h1 > y2)
+
+def entity_boxes(entities):
+    if not entities:
+        empty = np.zeros(0, dtype=np.float32)
+        return empty, empty, empty, empty
+    boxes = np.array([(e.x, e.y, e.width, e.height) for e in entities], dtype=np.float32)
+    return boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+
+# Spatial hash: uniform grid broad phase, rebuilt every tick. Each layer keeps
+# its (cell key, id) entries sorted by key so a cell lookup is a binary search
+CELL_SIZE = 64
+CELL_STRIDE = 1 << 20
+EMPTY_KEYS = np.zeros(0, dtype=np.int64)
+
+class HashLayer:
+    def __init__(self, x, y, w, h, ids, keys, owners):
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.ids = ids
+        self.cell_keys = keys  # as cells() returned them, reused by pairs()
+        self.cell_owners = owners
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.owners = owners[order]  # index into x/y/w/h/ids for each entry
+
+class SpatialHash:
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.layers = {}
+
+    def clear(self):
+        self.layers.clear()
+
+    def cells(self, x, y, w, h):
+        # Expand each box into the keys of every cell it touches
+        cs = self.cell_size
+        cx0 = np.floor_divide(x, cs).astype(np.int64)
+        cy0 = np.floor_divide(y, cs).astype(np.int64)
+        nx = np.floor_divide(x + w, cs).astype(np.int64) - cx0 + 1
+        ny = np.floor_divide(y + h, cs).astype(np.int64) - cy0 + 1
+        counts = nx * ny
+        owners = np.repeat(np.arange(len(x)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cx = cx0[owners] + local % nx[owners]
+        cy = cy0[owners] + local // nx[owners]
+        return cy * CELL_STRIDE + cx, owners
+
+    def insert(self, layer, x, y, w, h, ids=None):
+        x = np.asarray(x, dtype=np.float32)
+        y = np.asarray(y, dtype=np.float32)
+        # np.full is much cheaper than broadcast_to for the common scalar size
+        w = np.full(x.shape, w, dtype=np.float32) if np.ndim(w) == 0 else np.asarray(w, dtype=np.float32)
+        h = np.full(x.shape, h, dtype=np.float32) if np.ndim(h) == 0 else np.asarray(h, dtype=np.float32)
+        if ids is None:
+            ids = np.arange(len(x))
+        if not len(x):
+            # Most ticks have empty layers (no powerups, no player bullets yet)
+            self.layers[layer] = HashLayer(x, y, w, h, np.asarray(ids), EMPTY_KEYS, EMPTY_KEYS)
+            return
+        keys, owners = self.cells(x, y, w, h)
+        self.layers[layer] = HashLayer(x, y, w, h, np.asarray(ids), keys, owners)
+
+    def candidates(self, layer, keys):
+        # (query entry, layer entry) for every layer entry sharing a queried cell
+        left = np.searchsorted(layer.keys, keys, side="left")
+        right = np.searchsorted(layer.keys, keys, side="right")
+        counts = right - left
+        queries = np.repeat(np.arange(len(keys)), counts)
+        entries = np.repeat(left - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return queries, layer.owners[entries]
+
+    def pairs(self, layer_a, layer_b):
+        # Overlapping (id_a, id_b) pairs between two layers
+        a = self.layers.get(layer_a)
+        b = self.layers.get(layer_b)
+        if a is None or b is None or not len(a.keys) or not len(b.keys):
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        keys, owners = a.cell_keys, a.cell_owners
+        queries, ib = self.candidates(b, keys)
+        ia = owners[queries]
+        ax, ay = a.x[ia], a.y[ia]
+        bx, by = b.x[ib], b.y[ib]
+        hit = aabb_overlap(ax, ay, a.w[ia], a.h[ia], bx, by, b.w[ib], b.h[ib])
+        # Boxes spanning several cells meet in more than one cell; only keep
+        # the pair in the cell holding the top-left corner of the overlap
+        cs = self.cell_size
+        corner = (np.floor_divide(np.maximum(ay, by), cs).astype(np.int64) * CELL_STRIDE +
+                  np.floor_divide(np.maximum(ax, bx), cs).astype(np.int64))
+        hit &= corner == keys[queries]
+        return a.ids[ia[hit]], b.ids[ib[hit]]
+
+    def query(self, layer_name, x, y, w, h):
+        # Ids in one layer overlapping a single box
+        layer = self.layers.get(layer_name)
+        if layer is None or not len(layer.keys):
+            return np.zeros(0, dtype=np.int64)
+        # A single box's cells are listed directly, with the float32 rounding
+        # the layers use
+        left, top = np.float32(x), np.float32(y)
+        right, bottom = left + np.float32(w), top + np.float32(h)
+        cs = self.cell_size
+        keys = np.array([cy * CELL_STRIDE + cx for cy in range(int(top // cs), int(bottom // cs) + 1)
+                         for cx in range(int(left // cs), int(right // cs) + 1)], dtype=np.int64)
+        _, found = self.candidates(layer, keys)
+        found = np.unique(found)
+        hit = aabb_overlap(layer.x[found], layer.y[found], layer.w[found], layer.h[found], x, y, w, h)
+        return layer.ids[found[hit]]
+
+    def near(self, x, y, w, h, radius, layers=None):
+        # Everything within radius of a box, per layer
+        names = self.layers if layers is None else layers
+        return {name: self.query(name, x - radius, y - radius, w + 2 * radius, h + 2 * radius) for name in names}
+
+# Spawn scheduler: timed spawn events on a heap, driven by wave definitions,
+# a difficulty curve over elapsed time and score, and an entity cap that backs
+# off while frames run over budget. It only decides what spawns when, so it
+# can be exercised without a Game or a display
+class Wave:
+    def __init__(self, name, enemy_type="normal", start=0, every=1000, count=1, formation="random",
+                 scale_count=False, ignore_cap=False):
+        self.name = name
+        self.enemy_type = enemy_type
+        self.start = start  # milliseconds after the run starts
+        self.every = every  # base interval, shortened as difficulty rises
+        self.count = count
+        self.formation = formation  # "random", "line", "swoop" (bezier), "snake" (sine) or "v" (formation)
+        self.scale_count = scale_count  # more enemies per wave as difficulty rises
+        self.ignore_cap = ignore_cap  # bosses always arrive
+
+WAVES = [
+    Wave("scouts", start=1500, every=1500),
+    Wave("squadron", start=45000, every=20000, count=4, formation="line", scale_count=True),
+    Wave("boss", enemy_type="boss", start=30000, every=30000, ignore_cap=True),
+    Wave("swoop", start=50000, every=15000, count=5, formation="swoop"),
+    Wave("snake", start=65000, every=20000, count=8, formation="snake", scale_count=True),
+    Wave("armada", start=80000, every=40000, count=15, formation="v", scale_count=True)
+]
+
+class DifficultyCurve:
+    def __init__(self, per_minute=0.25, per_score=1 / 20000, maximum=4.0):
+        self.per_minute = per_minute
+        self.per_score = per_score
+        self.maximum = maximum
+
+    def level(self, elapsed, score):
+        return min(self.maximum, 1.0 + elapsed / 60000 * self.per_minute + score * self.per_score)
+
+class SpawnScheduler:
+    def __init__(self, waves=WAVES, curve=None, base_cap=None, min_cap=None, budget_ms=1000 / FPS, retry=None):
+        self.waves = waves
+        self.curve = curve or DifficultyCurve()
+        self.base_cap = tuning.spawn_cap if base_cap is None else base_cap
+        self.min_cap = tuning.spawn_min_cap if min_cap is None else min_cap
+        self.budget_ms = budget_ms
+        # Milliseconds to wait when a wave is held back by the cap
+        self.retry = tuning.spawn_retry if retry is None else retry
+        self.cap = self.base_cap
+        self.frame_ms = 0.0  # smoothed frame cost reported by the render loop
+        self.events = []
+        self.seq = 0
+        self.started = 0.0
+
+    def reset(self, now):
+        self.events = []
+        self.seq = 0
+        self.started = now
+        self.cap = self.base_cap
+        for wave in self.waves:
+            self.push(now + wave.start, wave)
+
+    def push(self, due, wave):
+        self.seq += 1
+        heapq.heappush(self.events, (due, self.seq, wave))
+
+    def report_frame(self, ms):
+        # Shrink the cap while over budget, grow it back once there is headroom
+        self.frame_ms = ms if not self.frame_ms else self.frame_ms * 0.9 + ms * 0.1
+        if self.frame_ms > self.budget_ms:
+            self.cap = max(self.min_cap, int(self.cap * 0.9))
+        elif self.frame_ms < self.budget_ms * 0.6 and self.cap < self.base_cap:
+            self.cap += 1
+
+    def difficulty(self, now, score):
+        return self.curve.level(now - self.started, score)
+
+    def poll(self, now, score, live):
+        # Returns (wave, count) for every wave due by now; live is the number
+        # of enemies currently on screen
+        due = []
+        level = self.difficulty(now, score)
+        while self.events and self.events[0][0] <= now:
+            _, _, wave = heapq.heappop(self.events)
+            if not wave.ignore_cap and live >= self.cap:
+                self.push(now + self.retry, wave)
+                continue
+            count = round(wave.count * level) if wave.scale_count else wave.count
+            if not wave.ignore_cap:
+                count = min(count, self.cap - live)
+            live += count
+            due.append((wave, count))
+            self.push(now + wave.every / level, wave)
+        return due
+
+# Tuning: the gameplay numbers, loaded from a JSON or TOML file, checked
+# against TUNING_SCHEMA and compiled into one flat read-only Tuning object.
+# Hot code reads tuning.player_speed and the like, a single slot lookup. A
+# ConfigWatcher reloads the file between ticks by rebinding the module-level
+# tuning, so nothing holds on to a stale copy. Each entry is
+# (type, default, minimum, maximum); the defaults are the shipped game
+TUNING_SCHEMA = {
+    "player": {
+        "speed": (float, 5, 0.5, 40),  # pixels per 60 FPS frame
+        "boost_speed": (float, 8, 0.5, 40),  # with the speed powerup
+        "shoot_delay": (int, 200, 10, 10000),  # milliseconds between shots
+        "rapid_shoot_delay": (int, 150, 10, 10000),  # with double or triple shot
+        "lives": (int, 3, 1, 99),
+        "bombs": (int, 3, 0, 99),
+        "power_ms": (int, 10000, 0, 600000),  # how long a powerup lasts
+        "invincible_ms": (int, 3000, 0, 600000)  # after losing a life
+    },
+    "enemy": {
+        "min_speed": (int, 1, 0, 40),
+        "max_speed": (int, 3, 0, 40),
+        "min_shoot_delay": (int, 1000, 50, 600000),
+        "max_shoot_delay": (int, 3000, 50, 600000),
+        "health": (int, 3, 1, 10000),
+        "boss_health": (int, 10, 1, 10000),
+        "points": (int, 100, 0, 1000000),  # score for a kill
+        "boss_points": (int, 500, 0, 1000000),
+        "bomb_points": (int, 100, 0, 1000000)  # per enemy cleared by a bomb
+    },
+    "powerup": {
+        "speed": (float, 2, 0.1, 40),
+        "chance": (float, 0.3, 0.0, 1.0)  # drop chance per regular kill, bosses always drop
+    },
+    "spawn": {
+        "rate": (float, 1.0, 0.01, 100.0),  # multiplies how often regular waves come
+        "cap": (int, 60, 1, 10000),  # enemies on screen before waves are held back
+        "min_cap": (int, 8, 1, 10000),  # the cap never backs off below this
+        "retry": (int, 250, 1, 600000)  # milliseconds before a held back wave tries again
+    },
+    # Milliseconds after the run starts, base interval and enemies per wave
+    "waves": {wave.name: {"start": (int, wave.start, 0, 3600000),
+                          "every": (int, wave.every, 1, 3600000),
+                          "count": (int, wave.count, 0, 1000)} for wave in WAVES}
+}
+
+def tuning_fields(schema, prefix=""):
+    # Flattens the schema to (attribute, section path, spec) triples
+    fields = []
+    for key, spec in schema.items():
+        path = prefix + key
+        if isinstance(spec, dict):
+            fields.extend(tuning_fields(spec, path + "."))
+        else:
+            fields.append((path.replace(".", "_"), path, spec))
+    return fields
+
+TUNING_FIELDS = tuning_fields(TUNING_SCHEMA)
+# Pairs that feed rng.randint or would otherwise make no sense reversed
+TUNING_ORDER = (("enemy.min_speed", "enemy.max_speed"), ("enemy.min_shoot_delay", "enemy.max_shoot_delay"),
+                ("spawn.min_cap", "spawn.cap"))
+
+class Tuning:
+    __slots__ = tuple(name for name, _, _ in TUNING_FIELDS) + ("source",)
+
+    def __init__(self, data=None, source="defaults"):
+        # data is the parsed config: sections of values, any of which may be
+        # left out to keep the default. Raises ValueError on anything else
+        values = {}
+        self.check_keys(data or {}, TUNING_SCHEMA, "", source)
+        for name, path, (kind, default, minimum, maximum) in TUNING_FIELDS:
+            value = data or {}
+            for key in path.split("."):
+                value = value.get(key, default) if isinstance(value, dict) else default
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{source}: {path} must be a number, not {value!r}")
+            if not minimum <= value <= maximum:
+                raise ValueError(f"{source}: {path} = {value!r} is outside {minimum}..{maximum}")
+            if kind is int and value != int(value):
+                raise ValueError(f"{source}: {path} must be a whole number, not {value!r}")
+            values[name] = kind(value)
+        for low, high in TUNING_ORDER:
+            if values[low.replace(".", "_")] > values[high.replace(".", "_")]:
+                raise ValueError(f"{source}: {low} is above {high}")
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "source", source)
+
+    def check_keys(self, data, schema, prefix, source):
+        # Misspelled settings would otherwise be silently ignored
+        if not isinstance(data, dict):
+            raise ValueError(f"{source}: {prefix.rstrip('.') or 'config'} must be a table of values")
+        unknown = sorted(set(data) - set(schema))
+        if unknown:
+            raise ValueError(f"{source}: unknown settings {[prefix + key for key in unknown]}")
+        for key, spec in schema.items():
+            if isinstance(spec, dict) and key in data:
+                self.check_keys(data[key], spec, prefix + key + ".", source)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("tuning is read-only, edit the config file and reload it instead")
+
+    def as_dict(self):
+        # The nested form a config file takes, for --dump-config
+        data = {}
+        for name, path, _ in TUNING_FIELDS:
+            *sections, key = path.split(".")
+            table = data
+            for section in sections:
+                table = table.setdefault(section, {})
+            table[key] = getattr(self, name)
+        return data
+
+def load_tuning(path):
+    # .toml files are read with tomllib, anything else as JSON
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise ValueError(f"{path}: TOML configs need Python 3.11 or newer, use JSON instead")
+        with open(path, "rb") as f:
+            try:
+                data = tomllib.load(f)
+            except tomllib.TOMLDecodeError as error:
+                raise ValueError(f"{path}: {error}")
+    else:
+        with open(path) as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"{path}: {error}")
+    return Tuning(data, path)
+
+tuning = Tuning()
+
+def use_tuning(new):
+    global tuning
+    tuning = new
+
+# Config watcher: polls the config file's modification time and recompiles it
+# when it changes. A file that fails to load or validate is reported and the
+# running tuning is kept, so a half-saved edit never crashes the game
+class ConfigWatcher:
+    def __init__(self, path, interval=0.5):
+        self.path = path
+        self.interval = interval  # seconds between checks
+        self.checked = 0.0
+        self.mtime = self.stat()
+        self.errors = 0
+
+    def stat(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self, now=None):
+        # True when a new tuning was swapped in
+        now = time.perf_counter() if now is None else now
+        if now - self.checked < self.interval:
+            return False
+        self.checked = now
+        mtime = self.stat()
+        if mtime is None or mtime == self.mtime:
+            return False
+        self.mtime = mtime
+        try:
+            new = load_tuning(self.path)
+        except (OSError, ValueError) as error:
+            self.errors += 1
+            print(f"config not reloaded: {error}", file=sys.stderr)
+            return False
+        use_tuning(new)
+        return True
+
+# Balance: the gameplay numbers a sweep can vary, defaulting to the loaded tuning
+class Balance:
+    FIELDS = ("spawn_rate", "enemy_health", "boss_health", "powerup_chance", "boss_start", "boss_every")
+
+    def __init__(self, spawn_rate=None, enemy_health=None, boss_health=None, powerup_chance=None,
+                 boss_start=None, boss_every=None):
+        self.spawn_rate = tuning.spawn_rate if spawn_rate is None else spawn_rate
+        self.enemy_health = tuning.enemy_health if enemy_health is None else enemy_health
+        self.boss_health = tuning.enemy_boss_health if boss_health is None else boss_health
+        self.powerup_chance = tuning.powerup_chance if powerup_chance is None else powerup_chance
+        self.boss_start = tuning.waves_boss_start if boss_start is None else boss_start
+        self.boss_every = tuning.waves_boss_every if boss_every is None else boss_every
+
+    def waves(self):
+        # Wave timing and sizes come from the tuning, the rest from WAVES
+        waves = []
+        for wave in WAVES:
+            if wave.enemy_type == "boss":
+                start, every = self.boss_start, self.boss_every
+            else:
+                start = getattr(tuning, f"waves_{wave.name}_start")
+                every = getattr(tuning, f"waves_{wave.name}_every") / self.spawn_rate
+            count = getattr(tuning, f"waves_{wave.name}_count")
+            waves.append(Wave(wave.name, wave.enemy_type, start, every, count, wave.formation,
+                              wave.scale_count, wave.ignore_cap))
+        return waves
+
+    def values(self):
+        return [getattr(self, name) for name in self.FIELDS]
+
+# Entity pool: released entities are kept on a free list and handed back out
+# by acquire(), which calls their spawn() instead of allocating a new object
+class EntityPool:
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args):
+        if self.free:
+            entity = self.free.pop()
+            entity.spawn(*args)
+            self.reused += 1
+            return entity
+        self.created += 1
+        return self.cls(*args)
+
+    def release(self, entity):
+        self.free.append(entity)
+
+    def release_all(self, entities):
+        self.free.extend(entities)
+
+    def stats(self):
+        return {"created": self.created, "reused": self.reused, "free": len(self.free)}
+
+# HUD widget: one line of text that is only re-rendered when its value changes
+class HudText:
+    def __init__(self, label, pos, font):
+        self.label = label
+        self.pos = pos
+        self.font = font
+        self.value = None
+        self.color = None
+        self.surface = None
+        self.rect = pygame.Rect(pos, (0, 0))
+        
+    def invalidate(self):
+        self.surface = None
+        
+    def set(self, value, color=WHITE):
+        # Returns the area the old text covered if it changed, else None
+        if self.surface is not None and value == self.value and color == self.color:
+            return None
+        old = self.rect
+        self.value = value
+        self.color = color
+        self.surface = self.font.render(self.label.format(value), True, color)
+        self.rect = self.surface.get_rect(topleft=self.pos)
+        return old
+        
+    def draw(self, surface):
+        surface.blit(self.surface, self.rect)
+
+# Past this many dirty rects a full flip is cheaper than a rect update
+DIRTY_RECT_LIMIT = 400
+
+HUD_LABELS = ("Score: {}", "Lives: {}", "Bombs: {}", "Power: {}")
+HUD_CRITICAL = (False, True, True, True)  # the score may lag behind under load, the rest never does
+
+# Quality tiers, shed in order while frames run over budget. Each tier keeps
+# the cuts of the ones before it
+class QualityTier:
+    def __init__(self, name, star_layers=None, merge_bullets=False, cosmetic_cap=None, hud_every=1):
+        self.name = name
+        self.star_layers = star_layers  # nearest starfield layers drawn, None for all
+        self.merge_bullets = merge_bullets  # bullet dirty areas merged per cell
+        self.cosmetic_cap = cosmetic_cap  # most purely visual effects drawn, None for no cap
+        self.hud_every = hud_every  # non-critical HUD widgets re-render every n frames
+
+QUALITY_TIERS = (
+    QualityTier("full"),
+    QualityTier("stars", star_layers=2),
+    QualityTier("bullets", star_layers=2, merge_bullets=True),
+    QualityTier("effects", star_layers=1, merge_bullets=True, cosmetic_cap=64),
+    QualityTier("hud", star_layers=1, merge_bullets=True, cosmetic_cap=64, hud_every=15)
+)
+QUALITY_NAMES = {tier.name: tier for tier in QUALITY_TIERS}
+
+# Renderers: Game and the entities draw through a renderer instead of a
+# surface, so the display backend can be swapped. Both backends implement
+#   menu(key, version, build, starfield, alpha)  a menu screen; build() returns
+#                                                (text, font, color, center) lines
+#   begin_gameplay(starfield, alpha)             clear to the background
+#   hud(values)                                  (value, color) per HUD_LABELS
+#   art(lines, x, y, color)                      a multi-line ASCII sprite
+#   badge(symbol, center, radius, color)         a powerup
+#   bullets(glyphs, colors, xs, ys)              arrays of BULLET_CHARS/COLORS
+#   particles(glyphs, shades, xs, ys)            arrays of PARTICLE_CHARS/SHADES
+#   flush()                                      end of a draw layer
+#   present()                                    show the frame
+# in world pixel coordinates (WIDTH x HEIGHT), and honour the QualityTier in
+# their quality attribute.
+
+# Pygame renderer: the default window backend, rasterizing through the glyph
+# atlas. Dirty-rect mode freezes the starfield into a static background and
+# only pushes the regions that changed to the display
+class PygameRenderer:
+    def __init__(self, surface=None, dirty_rects=False):
+        self.surface = surface  # the window, opened on the first frame when None
+        self.dirty_rects = dirty_rects
+        self.hud_widgets = [HudText(label, (10, 10 + i * 20), game_font) for i, label in enumerate(HUD_LABELS)]
+        self.menus = {}  # key -> (version, baked menu text overlay)
+        self.background = None
+        self.shown = None  # overlay or "gameplay" currently on the display (dirty mode)
+        self.dirty = []  # sprite areas of the last frame (dirty mode)
+        self.rects = None  # sprite areas drawn this frame (dirty mode)
+        self.updates = None  # areas to push this frame, None for a full flip
+        self.static = False  # a dirty-mode menu that is already on the display
+        self.quality = QUALITY_TIERS[0]
+        self.frame = 0
+        self.batch = []  # (sprite, position) queued for the current layer
+
+    def menu_overlay(self, key, version, build):
+        # Menu text is baked once per screen into a colour-keyed overlay and
+        # rebuilt when its version (the game over score) changes
+        cached = self.menus.get(key)
+        if cached is None or cached[0] != version:
+            overlay = pygame.Surface((WIDTH, HEIGHT))
+            overlay.fill(BLACK)
+            for text, font, color, center in build():
+                glyph = glyph_atlas.get(text, font, color)
+                overlay.blit(glyph, glyph.get_rect(center=center))
+            overlay.set_colorkey(BLACK, pygame.RLEACCEL)
+            cached = (version, overlay)
+            self.menus[key] = cached
+        return cached[1]
+
+    def get_background(self, starfield):
+        if self.background is None:
+            self.background = pygame.Surface((WIDTH, HEIGHT))
+            self.background.fill(BLACK)
+            starfield.draw(self.background, 0.0)
+        return self.background
+
+    def menu(self, key, version, build, starfield, alpha):
+        if self.surface is None:
+            self.surface = open_display()
+        overlay = self.menu_overlay(key, version, build)
+        self.rects = None
+        self.updates = None
+        self.static = False
+        if not self.dirty_rects:
+            self.surface.fill(BLACK)
+            starfield.draw(self.surface, alpha)
+            self.surface.blit(overlay, (0, 0))
+        elif overlay is self.shown:
+            # Menus are static: only redraw when the screen itself changes
+            self.static = True
+        else:
+            self.surface.blit(self.get_background(starfield), (0, 0))
+            self.surface.blit(overlay, (0, 0))
+            self.shown = overlay
+
+    def begin_gameplay(self, starfield, alpha):
+        if self.surface is None:
+            self.surface = open_display()
+        surface = self.surface
+        self.static = False
+        self.frame += 1
+        if not self.dirty_rects:
+            surface.fill(BLACK)
+            starfield.draw(surface, alpha, self.quality.star_layers)
+            self.rects = None
+            self.updates = None
+            return
+        background = self.get_background(starfield)
+        if self.shown != "gameplay":
+            surface.blit(background, (0, 0))
+            for widget in self.hud_widgets:
+                widget.invalidate()
+            self.dirty = [surface.get_rect()]
+            self.shown = "gameplay"
+        # Erase last frame's sprites; this frame's get collected as they are drawn
+        for rect in self.dirty:
+            surface.blit(background, rect, rect)
+        self.updates = list(self.dirty)
+        self.rects = []
+
+    def hud(self, values):
+        # Widgets only re-render when their value changes. In dirty mode they
+        # are drawn over a clean copy of the background, since antialiased
+        # text blitted onto itself would get bolder every frame
+        surface = self.surface
+        background = self.background if self.dirty_rects else None
+        stale = self.frame % self.quality.hud_every != 0
+        for widget, (value, color), critical in zip(self.hud_widgets, values, HUD_CRITICAL):
+            if stale and not critical and widget.surface is not None:
+                continue
+            old = widget.set(value, color)
+            if old is not None and background is not None:
+                surface.blit(background, old, old)
+                self.updates.append(old)
+                self.updates.append(widget.rect)
+        for widget in self.hud_widgets:
+            if background is not None:
+                surface.blit(background, widget.rect, widget.rect)
+            widget.draw(surface)
+
+    # Sprites are queued and submitted per draw layer in one blits call
+    def art(self, lines, x, y, color):
+        self.batch.append((glyph_atlas.get(lines, game_font, color), (x, y)))
+
+    def badge(self, symbol, center, radius, color):
+        self.batch.append((glyph_atlas.badge(symbol, game_font, radius, color),
+                           (center[0] - radius, center[1] - radius)))
+
+    def bullets(self, glyphs, colors, xs, ys):
+        get = glyph_atlas.get
+        self.batch += [(get(BULLET_CHARS[glyph], game_font, BULLET_COLORS[color]), (x, y))
+                       for glyph, color, x, y in zip(glyphs.tolist(), colors.tolist(), xs.tolist(), ys.tolist())]
+        if self.quality.merge_bullets and self.rects is not None:
+            self.flush(False)
+            if len(xs):
+                # One update area per occupied cell instead of one per bullet
+                cx = (np.clip(xs, 0, WIDTH) // CELL_SIZE).astype(np.int64)
+                cy = (np.clip(ys, 0, HEIGHT) // CELL_SIZE).astype(np.int64)
+                for cell in np.unique(cx * CELL_STRIDE + cy).tolist():
+                    cx, cy = divmod(cell, CELL_STRIDE)
+                    self.rects.append(pygame.Rect(cx * CELL_SIZE, cy * CELL_SIZE, CELL_SIZE + 16, CELL_SIZE + 16))
+
+    def particles(self, glyphs, shades, xs, ys):
+        get = glyph_atlas.get
+        self.batch += [(get(PARTICLE_CHARS[glyph], game_font, PARTICLE_SHADES[shade]), (x, y))
+                       for glyph, shade, x, y in zip(glyphs.tolist(), shades.tolist(), xs.tolist(), ys.tolist())]
+
+    def flush(self, track=True):
+        if not self.batch:
+            return
+        if self.rects is None or not track:
+            self.surface.blits(self.batch, doreturn=False)
+        else:
+            self.rects += self.surface.blits(self.batch)
+        self.batch = []
+
+    def present(self):
+        if self.static:
+            return
+        if profiler.overlay and not (self.dirty_rects and self.rects is None):
+            rect = profiler.draw_overlay(self.surface)
+            if self.rects is not None:
+                self.rects.append(rect)
+        if self.rects is not None:
+            self.updates += self.rects
+            self.dirty = self.rects
+        if self.updates is None or len(self.updates) > DIRTY_RECT_LIMIT:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.updates)
+
+# Terminal renderer: the world is mapped onto a character grid (by default one
+# 10x15 px cell per game_font glyph) and each frame is diffed against the last
+# one, so only the cells that changed are written, as ANSI escape sequences
+TERMINAL_SIZE = (80, 40)
+TERMINAL_STAR_COLOR = (110, 110, 110)
+
+class TerminalRenderer:
+    def __init__(self, stream=None, size=TERMINAL_SIZE):
+        self.stream = stream or sys.stdout
+        self.cols, self.rows = size
+        self.cell_w = WIDTH / self.cols
+        self.cell_h = HEIGHT / self.rows
+        self.chars = np.full((self.rows, self.cols), ord(" "), dtype=np.uint32)
+        self.colors = np.zeros((self.rows, self.cols), dtype=np.uint8)
+        # Nothing is on the terminal yet, so the first frame differs everywhere
+        # unless start() cleared the screen
+        self.shown_chars = np.zeros_like(self.chars)
+        self.shown_colors = np.zeros_like(self.colors)
+        self.palette = {}  # rgb -> colour index
+        self.codes = []  # colour index -> SGR escape sequence
+        self.bullet_chars = np.array([ord(char) for char in BULLET_CHARS], dtype=np.uint32)
+        self.bullet_colors = np.array([self.color(color) for color in BULLET_COLORS], dtype=np.uint8)
+        self.particle_chars = np.array([ord(char) for char in PARTICLE_CHARS], dtype=np.uint32)
+        self.particle_colors = np.array([self.color(shade) for shade in PARTICLE_SHADES], dtype=np.uint8)
+        self.menus = {}  # key -> (version, lines)
+        self.bytes_written = 0
+        self.quality = QUALITY_TIERS[0]
+
+    def start(self):
+        # Alternate screen, cursor hidden
+        self.stream.write("\x1b[?1049h\x1b[?25l\x1b[2J")
+        self.stream.flush()
+        self.shown_chars.fill(ord(" "))
+
+    def close(self):
+        self.stream.write("\x1b[0m\x1b[?25h\x1b[?1049l")
+        self.stream.flush()
+
+    def color(self, rgb):
+        index = self.palette.get(rgb)
+        if index is None:
+            index = self.palette[rgb] = len(self.codes)
+            self.codes.append("\x1b[38;2;{};{};{}m".format(*rgb))
+        return index
+
+    def cell(self, x, y):
+        return math.floor(x / self.cell_w), math.floor(y / self.cell_h)
+
+    def put(self, text, col, row, color):
+        # One line of text; spaces are transparent like in the glyph surfaces
+        if not 0 <= row < self.rows:
+            return
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        start = max(0, -col)
+        end = min(len(codes), self.cols - col)
+        if start >= end:
+            return
+        codes = codes[start:end]
+        solid = np.flatnonzero(codes != ord(" "))
+        self.chars[row, col + start + solid] = codes[solid]
+        self.colors[row, col + start + solid] = color
+
+    def stars(self, starfield, alpha):
+        color = self.color(TERMINAL_STAR_COLOR)
+        layers = self.quality.star_layers
+        start = 0 if layers is None else max(0, starfield.layer_count - layers)
+        for (chars, xs, ys), offset in zip(starfield.star_layers()[start:], starfield.scroll(alpha)[start:]):
+            sy = (ys + offset) % starfield.layer_height
+            visible = np.flatnonzero(sy < HEIGHT)
+            rows = (sy[visible] / self.cell_h).astype(np.int64)
+            cols = np.minimum((xs[visible] / self.cell_w).astype(np.int64), self.cols - 1)
+            self.chars[rows, cols] = [ord(chars[i]) for i in visible.tolist()]
+            self.colors[rows, cols] = color
+
+    def menu(self, key, version, build, starfield, alpha):
+        cached = self.menus.get(key)
+        if cached is None or cached[0] != version:
+            cached = (version, build())
+            self.menus[key] = cached
+        self.begin_gameplay(starfield, alpha)
+        for text, _, color, (x, y) in cached[1]:
+            col, row = self.cell(x, y)
+            self.put(text, col - len(text) // 2, row, self.color(color))
+
+    def begin_gameplay(self, starfield, alpha):
+        self.chars.fill(ord(" "))
+        self.colors.fill(0)
+        self.stars(starfield, alpha)
+
+    def hud(self, values):
+        for i, (label, (value, color)) in enumerate(zip(HUD_LABELS, values)):
+            col, row = self.cell(10, 10 + i * 20)
+            self.put(label.format(value), col, row, self.color(color))
+
+    def art(self, lines, x, y, color):
+        color = self.color(color)
+        for i, line in enumerate(lines):
+            col, row = self.cell(x, y + i * ART_LINE_HEIGHT)
+            self.put(line, col, row, color)
+
+    def badge(self, symbol, center, radius, color):
+        col, row = self.cell(*center)
+        self.put("(" + symbol + ")", col - 1, row, self.color(color))
+
+    def cells(self, chars, colors, xs, ys):
+        # One character per point, for bullets and particles
+        cols = np.floor(xs / self.cell_w).astype(np.int64)
+        rows = np.floor(ys / self.cell_h).astype(np.int64)
+        inside = np.flatnonzero((cols >= 0) & (cols < self.cols) & (rows >= 0) & (rows < self.rows))
+        rows = rows[inside]
+        cols = cols[inside]
+        self.chars[rows, cols] = chars[inside]
+        self.colors[rows, cols] = colors[inside]
+
+    def bullets(self, glyphs, colors, xs, ys):
+        self.cells(self.bullet_chars[glyphs], self.bullet_colors[colors], xs, ys)
+
+    def particles(self, glyphs, shades, xs, ys):
+        self.cells(self.particle_chars[glyphs], self.particle_colors[shades], xs, ys)
+
+    def flush(self):
+        pass
+
+    def present(self):
+        if profiler.overlay:
+            color = self.color(CYAN)
+            for i, (name, ms) in enumerate(profiler.summary):
+                self.put(f"{name:<14}{ms:6.2f} ms", self.cols - 24, i, color)
+        # A blank shows no colour, so a blank cell only changes with its character
+        blank = ord(" ")
+        changed = np.flatnonzero(((self.chars != self.shown_chars) |
+                                  ((self.colors != self.shown_colors) & (self.chars != blank))).ravel())
+        if len(changed):
+            chars = self.chars.ravel()[changed].tolist()
+            colors = self.colors.ravel()[changed].tolist()
+            out = []
+            last = -2
+            last_color = None
+            # Runs of adjacent cells on one row share a single cursor move
+            for i, char, color in zip(changed.tolist(), chars, colors):
+                if i != last + 1 or i % self.cols == 0:
+                    out.append("\x1b[{};{}H".format(i // self.cols + 1, i % self.cols + 1))
+                if color != last_color and char != blank:
+                    out.append(self.codes[color])
+                    last_color = color
+                out.append(chr(char))
+                last = i
+            data = "".join(out)
+            self.stream.write(data)
+            self.stream.flush()
+            size = len(data.encode())
+            self.bytes_written += size
+            profiler.count("terminal_bytes", size)
+            self.shown_chars[...] = self.chars
+            self.shown_colors[...] = self.colors
+
+# Terminal keyboard: stdin in cbreak mode, read without blocking. Terminals only
+# report key presses (plus autorepeat), so a key counts as held for a while
+# after each press: long enough after the first to bridge the autorepeat
+# delay, briefly once it is repeating
+TERMINAL_KEYS = {
+    "\x1b[A": pygame.K_UP,
+    "\x1b[B": pygame.K_DOWN,
+    "\x1b[C": pygame.K_RIGHT,
+    "\x1b[D": pygame.K_LEFT,
+    "\x1bOR": pygame.K_F3,
+    "\x1b[13~": pygame.K_F3,
+    " ": pygame.K_SPACE
+}
+
+class TerminalInput:
+    def __init__(self, stream=None, first_hold=0.5, repeat_hold=0.12):
+        self.stream = stream or sys.stdin
+        self.first_hold = first_hold
+        self.repeat_hold = repeat_hold
+        self.held = {}  # key -> time.perf_counter() deadline
+        self.saved = None
+
+    def start(self):
+        fd = self.stream.fileno()
+        self.saved = termios.tcgetattr(fd)
+        tty.setcbreak(fd)
+
+    def close(self):
+        if self.saved is not None:
+            termios.tcsetattr(self.stream.fileno(), termios.TCSADRAIN, self.saved)
+            self.saved = None
+
+    def read(self):
+        fd = self.stream.fileno()
+        data = b""
+        while select.select([fd], [], [], 0)[0]:
+            chunk = os.read(fd, 1024)
+            if not chunk:
+                break
+            data += chunk
+        return data.decode("utf-8", "ignore")
+
+    def poll(self):
+        # Returns the keys pressed since the last poll, as pygame key codes
+        text = self.read()
+        pressed = []
+        i = 0
+        while i < len(text):
+            for sequence, key in TERMINAL_KEYS.items():
+                if text.startswith(sequence, i):
+                    i += len(sequence)
+                    break
+            else:
+                char = text[i]
+                i += 1
+                if not char.isalpha():
+                    continue
+                key = ord(char.lower())  # pygame letter keys are their ASCII codes
+            pressed.append(key)
+        now = time.perf_counter()
+        for key in pressed:
+            repeating = self.held.get(key, 0) > now
+            self.held[key] = now + (self.repeat_hold if repeating else self.first_hold)
+            # Pressing one direction lets go of the opposite one
+            opposite = {pygame.K_LEFT: pygame.K_RIGHT, pygame.K_RIGHT: pygame.K_LEFT,
+                        pygame.K_UP: pygame.K_DOWN, pygame.K_DOWN: pygame.K_UP}.get(key)
+            self.held.pop(opposite, None)
+        return pressed
+
+    def key_state(self):
+        now = time.perf_counter()
+        mask = 0
+        for key, deadline in self.held.items():
+            if deadline > now and key in KEY_BITS:
+                mask |= KEY_BITS[key]
+        return KeyState(mask)
+
+# Game class
+class Game:
+    def __init__(self, seed=None, star_count=100, star_layers=3, dirty_rects=False, balance=None, renderer=None):
+        self.state = GameState.TITLE
+        self.balance = balance or Balance()
+        # All gameplay randomness comes from this generator so a seed replays a run
+        self.rng = random.Random(seed)
+        self.tick = 0
+        self.time = 0.0  # simulation time in milliseconds
+        self.bullet_pool = BulletPool()
+        self.spatial_hash = SpatialHash()
+        self.emitter = PatternEmitter(self.bullet_pool, load_patterns())
+        self.player = Player(self.bullet_pool)
+        self.partners = []  # co-op players controlled over the network; the team score stays on player
+        self.motion = EnemyMotion()
+        self.enemy_pool = EntityPool(Enemy)
+        self.powerup_pool = EntityPool(Powerup)
+        self.enemies = []
+        self.powerups = []
+        self.particles = ParticleSystem(seed=seed)
+        self.deaths = []  # cause of every life lost this run
+        self.starfield = Starfield(star_count, star_layers, seed)
+        self.renderer = renderer or PygameRenderer(dirty_rects=dirty_rects)
+        self.spawner = SpawnScheduler(self.balance.waves())
+        self.background_offset = 0
+        self.recorder = None  # ReplayRecorder capturing gameplay ticks, if any
+        self.scores = None  # ScoreStore keeping finished runs, if any
+        self.stats = RunStats()
+        self.run_active = False
+        
+    def reset_game(self, seed=None):
+        # A recorded run starts from a fresh seed so it can be replayed alone
+        if self.recorder is not None:
+            if seed is None:
+                seed = self.rng.getrandbits(63)
+            self.recorder.begin(self, seed)
+        if seed is not None:
+            self.rng.seed(seed)
+        self.bullet_pool.clear()
+        self.emitter.clear()
+        self.player.reset(self.time)
+        for i, partner in enumerate(self.partners):
+            self.place_partner(partner, i)
+        self.enemy_pool.release_all(self.enemies)
+        self.motion.clear()
+        self.powerup_pool.release_all(self.powerups)
+        self.particles.clear()
+        self.enemies = []
+        self.powerups = []
+        self.deaths = []
+        self.spawner.reset(self.time)
+        self.stats.reset(self.time)
+        self.run_active = True
+
+    def retune(self):
+        # After a config reload: player stats, health, drops and the spawn cap
+        # change at once, wave timing from the next run
+        self.balance = Balance()
+        spawner = self.spawner
+        spawner.waves = self.balance.waves()
+        spawner.base_cap = tuning.spawn_cap
+        spawner.min_cap = tuning.spawn_min_cap
+        spawner.retry = tuning.spawn_retry
+        spawner.cap = min(max(spawner.cap, spawner.min_cap), spawner.base_cap)
+        for player in [self.player] + self.partners:
+            player.retune()
+
+    def add_partner(self):
+        partner = Player(self.bullet_pool)
+        self.partners.append(partner)
+        self.place_partner(partner, len(self.partners) - 1)
+        return partner
+    
+    def place_partner(self, partner, i):
+        # Partners start spread out on both sides of player one
+        partner.reset(self.time)
+        partner.x = WIDTH // 2 + (i // 2 + 1) * 60 * (1 if i % 2 == 0 else -1)
+        partner.prev_x = partner.x
+    
+    def remove_partner(self, partner):
+        self.partners.remove(partner)
+    
+    def players(self):
+        # Everyone still in the run, player one first
+        return [player for player in [self.player] + self.partners if player.lives > 0]
+    
+    def control(self, player, keys, now):
+        player.move(keys)
+        player.update_powerups(now)
+        
+        if keys[pygame.K_SPACE]:
+            player.shoot(now)
+            
+        if keys[pygame.K_b]:
+            if player.use_bomb():
+                self.clear_screen()
+                self.particles.shockwave(player.x + player.width / 2, player.y + player.height / 2)
+    
+    def update(self, keys, partner_keys=()):
+        # Advance the simulation by one fixed tick. partner_keys holds a
+        # KeyState per co-op partner
+        if self.recorder is not None and self.state == GameState.GAMEPLAY:
+            self.recorder.record(self, keys)
+        self.tick += 1
+        self.time = self.tick * TICK_MS
+        now = self.time
+        
+        # Update background stars
+        with profiler.scope("stars"):
+            self.starfield.update()
+            
+        if self.state == GameState.GAMEPLAY:
+            # Update player
+            with profiler.scope("player"):
+                if self.player.lives > 0:
+                    self.control(self.player, keys, now)
+                for partner, partner_keys in itertools.zip_longest(self.partners, partner_keys[:len(self.partners)]):
+                    if partner.lives > 0:
+                        self.control(partner, partner_keys or KeyState(0), now)
+            
+            with profiler.scope("spawn"):
+                for wave, count in self.spawner.poll(now, self.player.score, len(self.enemies)):
+                    self.spawn_wave(wave, count, now)
+                profiler.count("spawn_cap", self.spawner.cap)
+            
+            # Update bullets
+            with profiler.scope("bullets"):
+                self.emitter.update(now)
+                self.bullet_pool.update()
+            
+            # Update enemies: every path kind moves in one batch, then all
+            # enemies whose cooldown ran out fire in spawn order
+            with profiler.scope("enemies"):
+                # With everyone out the run ends later this tick; until then
+                # enemies keep aiming at player one
+                players = self.players()
+                aim = players[0] if players else self.player
+                target = (aim.x + aim.width // 2, aim.y + aim.height // 2)
+                motion = self.motion
+                motion.update(now)
+                for slot in motion.ready(now).tolist():
+                    motion.enemies[slot].shoot(now, target)
+                offscreen = motion.offscreen()
+                if len(offscreen):
+                    gone = [motion.enemies[slot] for slot in offscreen.tolist()]
+                    self.despawn_enemies(gone)
+                    gone = set(gone)
+                    self.enemies = [enemy for enemy in self.enemies if enemy not in gone]
+            
+            # Update powerups
+            with profiler.scope("powerups"):
+                for powerup in self.powerups[:]:
+                    powerup.update()
+                    if powerup.is_offscreen():
+                        self.powerups.remove(powerup)
+                        self.powerup_pool.release(powerup)
+            
+            with profiler.scope("collision"):
+                self.build_spatial_hash()
+                self.resolve_collisions()
+            
+            with profiler.scope("particles"):
+                self.particles.update()
+            
+            profiler.count("enemies", len(self.enemies))
+            profiler.count("bullets", self.bullet_pool.count)
+            profiler.count("powerups", len(self.powerups))
+            self.stats.peak(len(self.enemies), self.bullet_pool.count)
+    
+    def spawn_wave(self, wave, count, now):
+        if wave.enemy_type == "boss":
+            for _ in range(count):
+                self.spawn_enemy(WIDTH // 2 - 50, -50, now, "boss")
+        elif wave.formation == "line":
+            # Evenly spaced across the screen
+            gap = (WIDTH - 100) / max(1, count - 1) if count > 1 else 0
+            for i in range(count):
+                x = 50 + i * gap if count > 1 else WIDTH // 2
+                self.spawn_enemy(x, -30, now)
+        elif wave.formation == "swoop":
+            # One after another along the same curve, in from a side and out the bottom
+            side = self.rng.choice((-1, 1))
+            x0 = -40 if side > 0 else WIDTH + 10
+            points = ((x0, 80), (WIDTH // 2 + side * 300, 40), (WIDTH // 2 - side * 300, 450),
+                      (WIDTH // 2 + side * 100, HEIGHT + 60))
+            for i in range(count):
+                enemy = self.spawn_enemy(x0, 80, now)
+                self.motion.bezier(enemy.slot, points, 3000, now + i * 300)
+                enemy.last_shot = now + i * 300
+        elif wave.formation == "snake":
+            # A column whose members swing out of phase with each other
+            x = self.rng.randint(150, WIDTH - 180)
+            for i in range(count):
+                enemy = self.spawn_enemy(x, -30 - i * 35, now)
+                self.motion.sine(enemy.slot, x, 120, 0.003, -i * 0.5)
+        elif wave.formation == "v":
+            self.spawn_formation(self.rng.randint(200, WIDTH - 230), -40, count, now)
+        else:
+            for _ in range(count):
+                self.spawn_enemy(self.rng.randint(50, WIDTH - 50), -30, now)
+    
+    def spawn_formation(self, x, y, count, now, speed=1, spacing=40):
+        # A V of count enemies flying behind a leader at (x, y)
+        formation = self.motion.add_formation(x, y, speed, 60, 0.001, self.rng.uniform(0, math.tau), now)
+        for i in range(count):
+            row, side = (i + 1) // 2, 1 if i % 2 else -1
+            enemy = self.spawn_enemy(x, y, now)
+            self.motion.follow(enemy.slot, formation, side * row * spacing, -row * spacing * 0.75)
+        return formation
+    
+    def spawn_enemy(self, x, y, now, enemy_type="normal"):
+        enemy = self.enemy_pool.acquire(x, y, self.motion, self.emitter, self.rng, now, enemy_type)
+        enemy.health = int(self.balance.boss_health if enemy_type == "boss" else self.balance.enemy_health)
+        self.enemies.append(enemy)
+        return enemy
+    
+    def bullet_source(self, slot):
+        # Type of the enemy that fired a bullet; a despawned enemy takes its bullets along
+        owner = self.bullet_pool.owner[slot]
+        for enemy in self.enemies:
+            if enemy.bullets.owner == owner:
+                return enemy.enemy_type
+        return "normal"
+    
+    def despawn_enemy(self, enemy):
+        # An enemy's bullets and scheduled bursts go with it
+        enemy.bullets.clear()
+        self.emitter.cancel(enemy.bullets.owner)
+        self.motion.release(enemy.slot)
+        self.enemy_pool.release(enemy)
+    
+    def despawn_enemies(self, enemies):
+        # despawn_enemy for a whole batch: one pass each over the bullet pool,
+        # the scheduled bursts and the motion slots, with the same result as
+        # despawning them one by one in this order
+        if not enemies:
+            return
+        owners = [enemy.bullets.owner for enemy in enemies]
+        self.bullet_pool.release_owners(owners)
+        self.emitter.cancel_all(owners)
+        self.motion.release_many([enemy.slot for enemy in enemies])
+        self.enemy_pool.release_all(enemies)
+    
+    # Mass effects work on whole batches of entities at once
+    def kill_enemies(self, killed):
+        # Score, drops and effects for enemies destroyed together, in order
+        if not killed:
+            return
+        gone = set(killed)
+        self.enemies = [enemy for enemy in self.enemies if enemy not in gone]
+        slots = np.array([enemy.slot for enemy in killed], dtype=np.int64)
+        self.player.score += int(self.motion.points[slots].sum())
+        bosses = [enemy.enemy_type == "boss" for enemy in killed]
+        self.stats.kills += len(killed)
+        self.stats.bosses += sum(bosses)
+        
+        # Chance to spawn powerup
+        for enemy, boss in zip(killed, bosses):
+            if self.rng.random() < self.balance.powerup_chance or boss:
+                self.powerups.append(self.powerup_pool.acquire(enemy.x, enemy.y, self.rng))
+        self.explode(killed)
+        self.despawn_enemies(killed)
+    
+    def clear_screen(self, points=None):
+        # The bomb: every enemy goes, and with them all of their bullets
+        points = tuning.enemy_bomb_points if points is None else points
+        enemies = self.enemies
+        self.stats.kills += len(enemies)
+        self.player.score += points * len(enemies)
+        self.explode(enemies)
+        self.enemies = []
+        self.despawn_enemies(enemies)
+    
+    def damage_area(self, x, y, radius, damage):
+        # Every enemy whose centre is within radius of (x, y) takes damage;
+        # the ones it finishes are killed as if shot. Returns how many were hit
+        motion = self.motion
+        slots = motion.order()
+        distance = np.hypot(motion.x[slots] + motion.width[slots] / 2 - x,
+                            motion.y[slots] + motion.height[slots] / 2 - y)
+        hit = slots[distance <= radius]
+        motion.health[hit] -= damage
+        self.kill_enemies([motion.enemies[slot] for slot in hit[motion.health[hit] <= 0].tolist()])
+        return len(hit)
+    
+    def convert_bullets(self, points=10):
+        # Every enemy bullet on screen turns into score. Returns how many
+        pool = self.bullet_pool
+        h = pool.high
+        slots = np.flatnonzero(pool.alive[:h] & (pool.owner[:h] != PLAYER_OWNER))
+        pool.release(slots)
+        self.player.score += points * len(slots)
+        return len(slots)
+    
+    def build_spatial_hash(self):
+        grid = self.spatial_hash
+        grid.clear()
+        pool = self.bullet_pool
+        slots = pool.live()
+        player_owned = pool.owner[slots] == PLAYER_OWNER
+        for layer, ids in (("player_bullets", slots[player_owned]), ("enemy_bullets", slots[~player_owned])):
+            grid.insert(layer, pool.x[ids], pool.y[ids], BULLET_SIZE, BULLET_SIZE, ids)
+        grid.insert("enemies", *self.motion.boxes(self.motion.order()))
+        grid.insert("powerups", *entity_boxes(self.powerups))
+    
+    def resolve_collisions(self):
+        grid = self.spatial_hash
+        pool = self.bullet_pool
+        player = self.player
+        
+        # Enemy bullets hitting the players; the run is over once nobody is left
+        players = self.players() if self.partners else [player]
+        for target in players:
+            if target.invincible:
+                continue
+            hits = grid.query("enemy_bullets", target.x, target.y, target.width, target.height)
+            hits = hits[pool.alive[hits]]
+            if len(hits):
+                self.deaths.append(self.bullet_source(hits[0]))
+                pool.release(hits[:1])
+                target.lives -= 1
+                self.particles.sparks(target.x + target.width / 2, target.y + target.height / 2)
+                target.invincible = True
+                target.invincible_timer = self.time
+        if all(target.lives <= 0 for target in players):
+            self.state = GameState.GAME_OVER
+        
+        # Player bullets hitting enemies, grouped by enemy in spawn order
+        enemy_ids, slots = grid.pairs("enemies", "player_bullets")
+        if len(enemy_ids):
+            order = np.lexsort((slots, enemy_ids))
+            enemy_ids = enemy_ids[order]
+            slots = slots[order]
+            starts = np.flatnonzero(np.r_[True, enemy_ids[1:] != enemy_ids[:-1]])
+            ends = np.r_[starts[1:], len(enemy_ids)]
+            killed = []
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                enemy = self.enemies[enemy_ids[start]]
+                # A bullet touching two enemies only hits the first
+                hits = slots[start:end]
+                hits = hits[pool.alive[hits]][:enemy.health]
+                pool.release(hits)
+                enemy.health -= len(hits)
+                if enemy.health <= 0:
+                    killed.append(enemy)
+            self.kill_enemies(killed)
+        
+        # Powerups collected by the players
+        taken = set()
+        for target in players:
+            collected = grid.query("powerups", target.x, target.y, target.width, target.height)
+            for i in np.sort(collected).tolist():
+                if i not in taken:
+                    taken.add(i)
+                    target.apply_powerup(self.powerups[i].powerup_type, self.time)
+                    self.stats.powerups += 1
+        if taken:
+            for i in sorted(taken):
+                self.powerup_pool.release(self.powerups[i])
+            self.powerups[:] = [powerup for i, powerup in enumerate(self.powerups) if i not in taken]
+    
+    def explode(self, enemies):
+        # Bosses go up in a bigger, red blast
+        for boss in (False, True):
+            group = [enemy for enemy in enemies if (enemy.enemy_type == "boss") == boss]
+            if group:
+                x = np.array([enemy.x + enemy.width / 2 for enemy in group], dtype=np.float32)
+                y = np.array([enemy.y + enemy.height / 2 for enemy in group], dtype=np.float32)
+                if boss:
+                    self.particles.explosion(x, y, 2, count=48, speed=3.0)
+                else:
+                    self.particles.explosion(x, y, 1)
+    
+    def finish_run(self):
+        # Called whenever gameplay is not running; the run is stored once
+        if self.run_active and self.scores is not None:
+            self.scores.submit(self.stats.record(self))
+        self.run_active = False
+    
+    def menu_lines(self):
+        builders = {
+            GameState.TITLE: self.title_screen,
+            GameState.LORE: self.lore_screen,
+            GameState.CONTROLS: self.controls_screen,
+            GameState.GAME_OVER: self.game_over_screen
+        }
+        return builders[self.state]()
+    
+    # Menu screens are lists of (text, font, color, center) lines
+    def title_screen(self):
+        # Title and by line
+        lines = [
+            ("TuxAscii", title_font, WHITE, (WIDTH // 2, HEIGHT // 4)),
+            ("By ElysiumSoft 2025", menu_font, WHITE, (WIDTH // 2, HEIGHT // 4 + 50))
+        ]
+        
+        # Menu options
+        options = [
+            "S [Start Game]",
+            "A [Lore]",
+            "D [Controls]"
+        ]
+        
+        for i, option in enumerate(options):
+            lines.append((option, menu_font, WHITE, (WIDTH // 2, HEIGHT // 2 + i * 40)))
+        
+        # Best runs so far
+        best = self.scores.top[:5] if self.scores is not None else ()
+        if len(best):
+            lines.append(("High Scores", menu_font, YELLOW, (WIDTH // 2, HEIGHT - 160)))
+            for i, run in enumerate(best):
+                minutes, seconds = divmod(int(run["duration_s"]), 60)
+                entry = "{}. {:>8}  {:2d}:{:02d}  {}".format(i + 1, int(run["score"]), minutes, seconds,
+                                                          time.strftime("%Y-%m-%d", time.localtime(run["time"])))
+                lines.append((entry, game_font, WHITE, (WIDTH // 2, HEIGHT - 130 + i * 20)))
+        return lines
+    
+    def lore_screen(self):
+        # Title
+        lines = [("Lore", big_font, WHITE, (WIDTH // 2, 50))]
+        
+        # Lore text
+        lore_text = [
+            "In the year 2099, the cosmic emperor Propriebus has",
+            "declared war on all open-source lifeforms. His armies",
+            "of locked-down drones sweep through the galaxy,",
+            "assimilating all in their path.",
+            "",
+            "Only one hero remains to defend the freedom of code:",
+            "Tux, the last penguin warrior, armed with the power",
+            "of ASCII and an unbreakable spirit of openness.",
+            "",
+            "Pilot Tux through waves of enemies and reclaim the",
+            "digital universe one character at a time!"
+        ]
+        
+        for i, line in enumerate(lore_text):
+            lines.append((line, menu_font, WHITE, (WIDTH // 2, 150 + i * 30)))
+        
+        # Back instruction
+        lines.append(("Press Q to return to title screen", menu_font, WHITE, (WIDTH // 2, HEIGHT - 50)))
+        return lines
+    
+    def controls_screen(self):
+        # Title
+        lines = [("Controls", big_font, WHITE, (WIDTH // 2, 50))]
+        
+        # Controls text
+        controls_text = [
+            "Arrow Keys - Move Tux",
+            "Space - Shoot",
+            "B - Use Bomb (clears all enemies)",
+            "Q - Quit to title screen",
+            "F3 - Toggle profiler overlay",
+            "",
+            "Power-ups:",
+            "D - Double shot",
+            "T - Triple shot",
+            "S - Speed boost",
+            "B - Extra bomb"
+        ]
+        
+        for i, line in enumerate(controls_text):
+            lines.append((line, menu_font, WHITE, (WIDTH // 2, 150 + i * 30)))
+        
+        # Back instruction
+        lines.append(("Press Q to return to title screen", menu_font, WHITE, (WIDTH // 2, HEIGHT - 50)))
+        return lines
+    
+    def game_over_screen(self):
+        return [
+            ("GAME OVER", big_font, RED, (WIDTH // 2, HEIGHT // 3)),
+            (f"Final Score: {self.player.score}", menu_font, WHITE, (WIDTH // 2, HEIGHT // 2)),
+            ("Press R to restart", menu_font, WHITE, (WIDTH // 2, HEIGHT // 2 + 50)),
+            ("Press Q to return to title screen", menu_font, WHITE, (WIDTH // 2, HEIGHT // 2 + 100))
+        ]
+    
+    def draw_gameplay(self, alpha):
+        renderer = self.renderer
+        with profiler.scope("draw_entities"):
+            # Draw players
+            for player in (self.players() if self.partners else [self.player]):
+                player.draw(renderer, alpha, self.time)
+            
+            # Draw enemies
+            for enemy in self.enemies:
+                enemy.draw(renderer, alpha)
+            
+            # Draw powerups
+            for powerup in self.powerups:
+                powerup.draw(renderer, alpha)
+            renderer.flush()
+        
+        # Effects go under the bullets, which must stay readable
+        with profiler.scope("draw_particles"):
+            self.particles.draw(renderer, alpha)
+            renderer.flush()
+        
+        # Draw every bullet in the pool
+        with profiler.scope("draw_bullets"):
+            self.bullet_pool.draw(renderer, alpha)
+            renderer.flush()
+    
+    def hud_values(self):
+        player = self.player
+        return [
+            (player.score, WHITE),
+            (player.lives, WHITE),
+            (player.bombs, WHITE),
+            (player.power_type.capitalize(), self.get_power_color())
+        ]
+    
+    def state_hash(self):
+        # 64-bit digest of everything the simulation carries between ticks.
+        # Owner ids and slot serials are left out, they depend on earlier runs,
+        # and so are the clock and game state, which keep moving after a run ends
+        player = self.player
+        pool = self.bullet_pool
+        slots = pool.live()
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(repr((
+            self.rng.getstate(),
+            player.x, player.y, player.last_shot, player.score, player.lives, player.bombs,
+            player.power_level, player.power_type, player.power_timer,
+            player.invincible, player.invincible_timer,
+            [(e.health, e.phase, e.enemy_type) for e in self.enemies],
+            [(p.x, p.y, p.powerup_type) for p in self.powerups],
+            [(due, wave.name) for due, _, wave in sorted(self.spawner.events)]
+        )).encode())
+        motion = self.motion
+        order = motion.order()
+        for array in (motion.x, motion.y, motion.speed, motion.angle, motion.path, motion.last_shot,
+                      motion.shoot_delay):
+            digest.update(array[order].tobytes())
+        for array in (pool.x, pool.y, pool.vx, pool.vy, pool.glyph, pool.color):
+            digest.update(array[slots].tobytes())
+        digest.update((pool.owner[slots] == PLAYER_OWNER).tobytes())
+        return int.from_bytes(digest.digest(), "little")
+    
+    def get_power_color(self):
+        if self.player.power_type == "double":
+            return YELLOW
+        elif self.player.power_type == "triple":
+            return CYAN
+        elif self.player.power_type == "speed":
+            return GREEN
+        elif self.player.power_type == "bomb":
+            return RED
+        else:
+            return WHITE
+    
+    def draw(self, alpha=1.0):
+        # alpha is how far rendering sits between the last two ticks. The HUD
+        # goes down before the sprites so that in dirty-rect mode sprites
+        # passing over it are not erased
+        renderer = self.renderer
+        if self.state == GameState.GAMEPLAY:
+            with profiler.scope("draw_background"):
+                renderer.begin_gameplay(self.starfield, alpha)
+            with profiler.scope("draw_hud"):
+                renderer.hud(self.hud_values())
+            self.draw_gameplay(alpha)
+        else:
+            if self.state == GameState.GAME_OVER:
+                version = self.player.score
+            elif self.state == GameState.TITLE and self.scores is not None:
+                version = self.scores.version
+            else:
+                version = None
+            renderer.menu(self.state, version, self.menu_lines, self.starfield, alpha)
+        
+        if profiler.overlay:
+            profiler.count("glyph_misses", glyph_atlas.misses)
+        with profiler.scope("flip"):
+            renderer.present()
+
+# Fixed-timestep driver: real (or injected) time is accumulated and drained in
+# whole ticks, the remainder becomes the render interpolation factor
+class FixedStepLoop:
+    def __init__(self, game, clock=time.perf_counter, tick_rate=TICK_RATE, max_ticks=8):
+        self.game = game
+        self.clock = clock
+        self.dt = 1.0 / tick_rate
+        self.max_ticks = max_ticks  # cap per frame so a stall cannot spiral
+        self.accumulator = 0.0
+        self.last = None
+        
+    def advance(self, keys):
+        # keys is a KeyState, or a controller(game) asked once per tick
+        now = self.clock()
+        if self.last is None:
+            self.last = now
+        self.accumulator += now - self.last
+        self.last = now
+        
+        ticks = 0
+        while self.accumulator >= self.dt and ticks < self.max_ticks:
+            self.game.update(keys(self.game) if callable(keys) else keys)
+            self.accumulator -= self.dt
+            ticks += 1
+        if ticks == self.max_ticks:
+            self.accumulator = min(self.accumulator, self.dt)
+        return self.accumulator / self.dt
+        
+    def run(self, ticks, controller):
+        # Headless: simulate as fast as possible, controller(game) returns keys
+        for _ in range(ticks):
+            self.game.update(controller(self.game))
+
+# Frame pacing: rolling update and draw costs decide the quality tier. Frames
+# over budget for a while shed one tier, a long stretch with headroom restores
+# one, so the tier does not flap around the budget
+class FramePacer:
+    def __init__(self, fps=FPS, window=30, shed_after=20, restore_after=180, headroom=0.6):
+        self.budget_ms = 1000 / fps
+        self.update_ms = deque(maxlen=window)
+        self.draw_ms = deque(maxlen=window)
+        self.shed_after = shed_after  # frames over budget before shedding a tier
+        self.restore_after = restore_after  # frames under headroom before restoring one
+        self.headroom = headroom
+        self.tier = 0
+        self.over = 0
+        self.under = 0
+        self.frames = 0
+        self.tier_frames = [0] * len(QUALITY_TIERS)
+        self.started = time.perf_counter()
+
+    @property
+    def quality(self):
+        return QUALITY_TIERS[self.tier]
+
+    def cost(self):
+        if not self.update_ms:
+            return 0.0
+        return (sum(self.update_ms) + sum(self.draw_ms)) / len(self.update_ms)
+
+    def report(self, update_ms, draw_ms):
+        self.update_ms.append(update_ms)
+        self.draw_ms.append(draw_ms)
+        self.frames += 1
+        self.tier_frames[self.tier] += 1
+        cost = self.cost()
+        if cost > self.budget_ms:
+            self.over += 1
+            self.under = 0
+            if self.over >= self.shed_after and self.tier < len(QUALITY_TIERS) - 1:
+                self.tier += 1
+                self.over = 0
+                self.update_ms.clear()
+                self.draw_ms.clear()
+        elif cost < self.budget_ms * self.headroom:
+            self.under += 1
+            self.over = 0
+            if self.under >= self.restore_after and self.tier > 0:
+                self.tier -= 1
+                self.under = 0
+        else:
+            self.over = self.under = 0
+        profiler.count("quality_tier", self.tier)
+        return self.quality
+
+    def stats(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            "frames": self.frames,
+            "seconds": seconds,
+            "fps": self.frames / seconds if seconds else 0.0,
+            "cost_ms": self.cost(),
+            "quality": self.quality.name,
+            "tier_frames": {tier.name: frames for tier, frames in zip(QUALITY_TIERS, self.tier_frames)}
+        }
+
+# Replays: a run is stored as its seed, start tick and one key mask byte per
+# tick, plus the spawn cap changes made by the frame-budget feedback (the only
+# input that comes from wall time). State hashes taken once per simulated
+# second let the verifier name the first second that diverges
+REPLAY_MAGIC = b"TUXR"
+REPLAY_VERSION = 5
+REPLAY_HEADER = struct.Struct("<4sBqIHI")  # magic, version, seed, start tick, checkpoint interval, ticks
+REPLAY_FINAL = struct.Struct("<qQ")  # score, state hash after the last tick
+REPLAY_CAP = np.dtype([("tick", "<u4"), ("cap", "<u2")])
+
+class Replay:
+    def __init__(self, seed, start_tick, interval=TICK_RATE):
+        self.seed = seed
+        self.start_tick = start_tick
+        self.interval = interval
+        self.masks = bytearray()
+        self.caps = []  # (tick index, new cap)
+        self.checkpoints = []  # state hash before every interval-th tick
+        self.score = 0
+        self.final_hash = 0
+
+    def save(self, path):
+        # Key masks repeat for long stretches, so the body compresses well
+        body = b"".join((
+            bytes(self.masks),
+            struct.pack("<I", len(self.caps)),
+            np.array(self.caps, dtype=REPLAY_CAP).tobytes(),
+            struct.pack("<I", len(self.checkpoints)),
+            np.array(self.checkpoints, dtype="<u8").tobytes(),
+            REPLAY_FINAL.pack(self.score, self.final_hash)
+        ))
+        header = REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.start_tick,
+                                    self.interval, len(self.masks))
+        with open(path, "wb") as f:
+            f.write(header + zlib.compress(body, 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, start_tick, interval, ticks = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError("{}: not a version {} TuxAscii replay".format(path, REPLAY_VERSION))
+        body = zlib.decompress(data[REPLAY_HEADER.size:])
+        replay = cls(seed, start_tick, interval)
+        replay.masks = bytearray(body[:ticks])
+        offset = ticks
+        (count,) = struct.unpack_from("<I", body, offset)
+        offset += 4
+        caps = np.frombuffer(body, REPLAY_CAP, count, offset)
+        replay.caps = [(int(tick), int(cap)) for tick, cap in caps]
+        offset += caps.nbytes
+        (count,) = struct.unpack_from("<I", body, offset)
+        offset += 4
+        checkpoints = np.frombuffer(body, "<u8", count, offset)
+        replay.checkpoints = [int(h) for h in checkpoints]
+        offset += checkpoints.nbytes
+        replay.score, replay.final_hash = REPLAY_FINAL.unpack_from(body, offset)
+        return replay
+
+# Records every gameplay tick of a Game; each run is saved when it ends, the
+# first to path and later ones to path-2, path-3, ...
+class ReplayRecorder:
+    def __init__(self, path):
+        self.path = path
+        self.runs = 0
+        self.replay = None
+        self.cap = None
+
+    def begin(self, game, seed):
+        self.end(game)
+        self.replay = Replay(seed, game.tick)
+        self.cap = None
+
+    def record(self, game, keys):
+        replay = self.replay
+        if replay is None:
+            return
+        i = len(replay.masks)
+        if game.spawner.cap != self.cap:
+            self.cap = game.spawner.cap
+            replay.caps.append((i, self.cap))
+        if i % replay.interval == 0:
+            replay.checkpoints.append(game.state_hash())
+        replay.masks.append(keys.mask)
+
+    def end(self, game):
+        replay = self.replay
+        if replay is None:
+            return None
+        self.replay = None
+        replay.score = game.player.score
+        replay.final_hash = game.state_hash()
+        self.runs += 1
+        path = self.path
+        if self.runs > 1:
+            root, ext = os.path.splitext(path)
+            path = "{}-{}{}".format(root, self.runs, ext)
+        replay.save(path)
+        return path
+
+# Feeds a replay back into a Game. Used as a controller(game), it applies the
+# recorded spawn caps and checks the recorded state hashes before every tick
+class ReplayPlayer:
+    def __init__(self, replay):
+        self.replay = replay
+        self.caps = dict(replay.caps)
+        self.cap = None
+        self.index = 0
+        self.diverged = None  # tick index of the first failed checkpoint
+
+    def start(self, game):
+        game.tick = self.replay.start_tick
+        game.time = game.tick * TICK_MS
+        game.state = GameState.GAMEPLAY
+        game.reset_game(self.replay.seed)
+
+    def done(self):
+        return self.index >= len(self.replay.masks)
+
+    def __call__(self, game):
+        replay = self.replay
+        i = self.index
+        if i >= len(replay.masks):
+            # The recording stopped here, a run quit mid-game goes back to the title
+            if game.state == GameState.GAMEPLAY:
+                game.state = GameState.TITLE
+            return KeyState()
+        # Reapplied every tick so nothing outside the replay can move the cap
+        self.cap = self.caps.get(i, self.cap)
+        if self.cap is not None:
+            game.spawner.cap = self.cap
+        if i % replay.interval == 0 and self.diverged is None:
+            if game.state_hash() != replay.checkpoints[i // replay.interval]:
+                self.diverged = i
+        self.index += 1
+        return KeyState(replay.masks[i])
+
+def verify_replay(path, star_count=100, star_layers=3):
+    # Re-simulate without rendering, as fast as the CPU allows
+    replay = Replay.load(path)
+    game = Game(replay.seed, star_count, star_layers)
+    player = ReplayPlayer(replay)
+    player.start(game)
+    start = time.perf_counter()
+    FixedStepLoop(game).run(len(replay.masks), player)
+    elapsed = time.perf_counter() - start
+    final_hash = game.state_hash()
+    ok = player.diverged is None and game.player.score == replay.score and final_hash == replay.final_hash
+    return {
+        "replay": path,
+        "ticks": len(replay.masks),
+        "seconds": elapsed,
+        "ticks_per_second": len(replay.masks) / elapsed if elapsed else 0.0,
+        "score": {"recorded": replay.score, "replayed": game.player.score},
+        "state_hash": {"recorded": "{:016x}".format(replay.final_hash), "replayed": "{:016x}".format(final_hash)},
+        "first_divergence_tick": player.diverged,
+        "ok": ok
+    }
+
+# Run history: every finished run is appended to a log of fixed-size records,
+# and the best ones are kept in a small index file, so the title screen never
+# reads the whole log. Both files are written by a background thread; the game
+# thread only queues records. The index names the number of runs it covers
+# and is rebuilt from the log when that does not match
+RUN_DTYPE = np.dtype([("time", "<f8"), ("score", "<i8"), ("duration_s", "<f4"), ("ticks", "<u4"),
+                      ("kills", "<u4"), ("bosses", "<u2"), ("powerups", "<u2"), ("deaths", "u1"),
+                      ("game_over", "u1"), ("peak_enemies", "<u2"), ("peak_bullets", "<u4"),
+                      ("frame_p50", "<f4"), ("frame_p99", "<f4"), ("frame_max", "<f4")])
+RUN_LOG_HEADER = struct.Struct("<4sB")  # magic, version
+SCORE_INDEX_HEADER = struct.Struct("<4sBI")  # magic, version, runs in the log when written
+RUN_LOG_MAGIC = b"TUXL"
+SCORE_INDEX_MAGIC = b"TUXI"
+RUN_LOG_VERSION = 1
+FRAME_BIN_MS = 0.25  # frame time histogram resolution
+FRAME_BINS = 400  # the last bin takes everything from 100 ms up
+
+def data_dir():
+    root = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(root, "tuxascii")
+
+class RunStats:
+    def __init__(self):
+        self.frames = np.zeros(FRAME_BINS, dtype=np.int64)
+        self.reset(0.0)
+
+    def reset(self, now):
+        self.started = now
+        self.kills = 0
+        self.bosses = 0
+        self.powerups = 0
+        self.peak_enemies = 0
+        self.peak_bullets = 0
+        self.frames.fill(0)
+        self.frame_max = 0.0
+
+    def peak(self, enemies, bullets):
+        self.peak_enemies = max(self.peak_enemies, enemies)
+        self.peak_bullets = max(self.peak_bullets, bullets)
+
+    def frame(self, ms):
+        self.frames[min(int(ms / FRAME_BIN_MS), FRAME_BINS - 1)] += 1
+        self.frame_max = max(self.frame_max, ms)
+
+    def frame_percentile(self, q):
+        # Upper edge of the bin holding the q-th frame
+        total = self.frames.sum()
+        if not total:
+            return 0.0
+        return (int(np.searchsorted(np.cumsum(self.frames), q * total)) + 1) * FRAME_BIN_MS
+
+    def record(self, game):
+        duration = (game.time - self.started) / 1000
+        return np.array((time.time(), game.player.score, duration, round(duration * TICK_RATE), self.kills,
+                         self.bosses, self.powerups, len(game.deaths), game.state == GameState.GAME_OVER,
+                         self.peak_enemies, self.peak_bullets, self.frame_percentile(0.5),
+                         self.frame_percentile(0.99), self.frame_max), dtype=RUN_DTYPE)
+
+class ScoreStore:
+    def __init__(self, path=None, top=100):
+        self.path = path or data_dir()
+        self.log_path = os.path.join(self.path, "runs.log")
+        self.index_path = os.path.join(self.path, "scores.idx")
+        self.top_n = top
+        self.top = np.zeros(0, dtype=RUN_DTYPE)  # best runs, best first; replaced, never changed in place
+        self.runs = 0
+        self.version = 0  # bumped whenever top changes
+        self.error = None  # last I/O error; the game goes on without history
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.work, name="scores", daemon=True)
+        self.thread.start()
+
+    def submit(self, record):
+        self.queue.put(record)
+
+    def close(self):
+        # Waits for queued runs to be written
+        self.queue.put(None)
+        self.thread.join()
+
+    def work(self):
+        try:
+            self.load()
+        except (OSError, ValueError) as error:
+            self.error = error
+        while True:
+            record = self.queue.get()
+            if record is None:
+                return
+            try:
+                self.append(record)
+            except OSError as error:
+                self.error = error
+
+    def publish(self, top):
+        self.top = top
+        self.version += 1
+
+    def best(self, runs):
+        order = np.argsort(-runs["score"], kind="stable")[:self.top_n]
+        return runs[order]
+
+    def log_runs(self):
+        try:
+            size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return 0
+        return max(0, size - RUN_LOG_HEADER.size) // RUN_DTYPE.itemsize
+
+    def load(self):
+        runs = self.log_runs()
+        top = self.read_index(runs)
+        if top is None:
+            top = self.rebuild(runs)
+        self.runs = runs
+        self.publish(top)
+
+    def read_index(self, runs):
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if len(data) < SCORE_INDEX_HEADER.size:
+            return None
+        magic, version, indexed = SCORE_INDEX_HEADER.unpack_from(data)
+        body = data[SCORE_INDEX_HEADER.size:]
+        if (magic != SCORE_INDEX_MAGIC or version != RUN_LOG_VERSION or indexed != runs or
+                len(body) % RUN_DTYPE.itemsize):
+            return None
+        return np.frombuffer(body, dtype=RUN_DTYPE).copy()
+
+    def rebuild(self, runs):
+        top = np.zeros(0, dtype=RUN_DTYPE)
+        if runs:
+            with open(self.log_path, "rb") as f:
+                magic, version = RUN_LOG_HEADER.unpack(f.read(RUN_LOG_HEADER.size))
+                if magic != RUN_LOG_MAGIC or version != RUN_LOG_VERSION:
+                    raise ValueError("{}: not a version {} TuxAscii run log".format(self.log_path, RUN_LOG_VERSION))
+                top = self.best(np.fromfile(f, dtype=RUN_DTYPE, count=runs))
+        self.write_index(top, runs)
+        return top
+
+    def write_index(self, top, runs):
+        # Written aside and renamed over the old index, so it is never half written
+        os.makedirs(self.path, exist_ok=True)
+        temp = self.index_path + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(SCORE_INDEX_HEADER.pack(SCORE_INDEX_MAGIC, RUN_LOG_VERSION, runs))
+            f.write(top.tobytes())
+        os.replace(temp, self.index_path)
+
+    def append(self, record):
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.log_path, "ab") as f:
+            size = f.tell()
+            if size == 0:
+                f.write(RUN_LOG_HEADER.pack(RUN_LOG_MAGIC, RUN_LOG_VERSION))
+            else:
+                # A record cut short by a crash is dropped so appends stay aligned
+                partial = (size - RUN_LOG_HEADER.size) % RUN_DTYPE.itemsize
+                if partial:
+                    f.truncate(size - partial)
+            f.write(record.tobytes())
+            self.runs = (f.tell() - RUN_LOG_HEADER.size) // RUN_DTYPE.itemsize
+        top = self.best(np.concatenate([self.top, record[None]]))
+        self.write_index(top, self.runs)
+        self.publish(top)
+
+# Scripted input for headless runs: wander in a random direction that changes
+# every half second while holding fire
+def scripted_controller(seed):
+    rng = random.Random(seed)
+    state = {"mask": 0}
+    
+    def controller(game):
+        if game.tick % 60 == 0:
+            state["mask"] = rng.getrandbits(4) | KEY_BITS[pygame.K_SPACE]
+        return KeyState(state["mask"])
+    return controller
+
+# Controller policies for batch runs: policy(seed) returns a controller(game)
+def idle_policy(seed):
+    keys = KeyState(KEY_BITS[pygame.K_SPACE])
+    return lambda game: keys
+
+def dodge_policy(seed):
+    # Hold fire and sidestep away from enemy bullets close above the player,
+    # otherwise drift back towards the middle of the screen
+    rng = random.Random(seed)
+    fire = KEY_BITS[pygame.K_SPACE]
+    left, right = KEY_BITS[pygame.K_LEFT], KEY_BITS[pygame.K_RIGHT]
+    
+    def controller(game):
+        player = game.player
+        center = player.x + player.width / 2
+        near = game.spatial_hash.query("enemy_bullets", player.x - 40, player.y - 80,
+                                       player.width + 80, player.height + 80)
+        if len(near):
+            ids = near[game.bullet_pool.alive[near]]
+            threat = float(game.bullet_pool.x[ids].mean()) if len(ids) else center
+            return KeyState(fire | (left if threat >= center else right))
+        if abs(center - WIDTH / 2) > 80 and rng.random() < 0.5:
+            return KeyState(fire | (left if center > WIDTH / 2 else right))
+        return KeyState(fire)
+    return controller
+
+POLICIES = {
+    "idle": idle_policy,
+    "wander": scripted_controller,
+    "dodge": dodge_policy
+}
+
+# Benchmark scenarios: setup(game) prepares the run, tick(game) runs before
+# every update to keep the pressure on
+class Scenario:
+    def __init__(self, name, ticks, setup=None, tick=None, controller=scripted_controller):
+        self.name = name
+        self.ticks = ticks
+        self.setup = setup
+        self.tick = tick
+        self.controller = controller
+
+def setup_boss_circle(game):
+    for i in range(4):
+        boss = game.enemy_pool.acquire(100 + i * 180, 40, game.motion, game.emitter, game.rng, game.time, "boss")
+        boss.speed = 0
+        boss.movement_pattern = "straight"
+        boss.health = 10 ** 9
+        boss.shoot_delay = 100
+        boss.patterns = [game.emitter.library["circle"]]
+        game.enemies.append(boss)
+
+def tick_swarm(game):
+    while len(game.enemies) < 500:
+        game.enemies.append(game.enemy_pool.acquire(game.rng.randint(0, WIDTH - 30), game.rng.randint(-30, HEIGHT // 2),
+                                                    game.motion, game.emitter, game.rng, game.time))
+
+def tick_formations(game):
+    # Wide formations of 40, refilled as they leave
+    while len(game.enemies) <= 360:
+        game.spawn_formation(game.rng.randint(100, WIDTH - 130), -40 - game.rng.randint(0, HEIGHT // 2), 40, game.time,
+                             spacing=18)
+
+def setup_bomb_storm(game):
+    setup_boss_circle(game)
+    for boss in game.enemies:
+        boss.shoot_delay = 25
+        boss.patterns = [game.emitter.library["spiral"]]
+
+def tick_bomb_storm(game):
+    # The bosses come back after every bomb
+    if not game.enemies:
+        setup_bomb_storm(game)
+    game.player.bombs = 1
+
+def bomb_controller(seed):
+    # Keep firing and bomb every five seconds, into a full bullet storm
+    fire = KEY_BITS[pygame.K_SPACE]
+    bomb = KEY_BITS[pygame.K_b]
+    return lambda game: KeyState(fire | bomb if game.tick % (TICK_RATE * 5) == 0 else fire)
+
+def setup_triple_fire(game):
+    game.player.apply_powerup("triple", game.time)
+
+def tick_triple_fire(game):
+    game.player.power_timer = game.time
+
+BENCH_SCENARIOS = {
+    "boss_circle": Scenario("boss_circle", 3600, setup=setup_boss_circle),
+    "swarm_500": Scenario("swarm_500", 3600, tick=tick_swarm),
+    "formations": Scenario("formations", 3600, tick=tick_formations),
+    "triple_fire": Scenario("triple_fire", 3600, setup=setup_triple_fire, tick=tick_triple_fire),
+    "bomb_storm": Scenario("bomb_storm", 3600, setup=setup_bomb_storm, tick=tick_bomb_storm,
+                           controller=bomb_controller),
+    "endless": Scenario("endless", 36000)
+}
+
+def percentiles(samples):
+    if not samples:
+        return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+    ms = np.array(samples) * 1000
+    return {"p50": float(np.percentile(ms, 50)), "p99": float(np.percentile(ms, 99)), "max": float(ms.max())}
+
+def run_scenario(scenario, ticks=None, seed=0, draw_every=2, star_count=100, star_layers=3, quality="full"):
+    ticks = ticks or scenario.ticks
+    game = Game(seed, star_count, star_layers)
+    game.renderer.quality = QUALITY_NAMES[quality]
+    if draw_every:
+        # Open the display first so the glyphs are converted to its format,
+        # as they are in the game, and draws time the same blits
+        open_display()
+        glyph_atlas.prerender(game_glyphs())
+    game.state = GameState.GAMEPLAY
+    game.reset_game()
+    if scenario.setup:
+        scenario.setup(game)
+    controller = scenario.controller(seed)
+    update_times = []
+    draw_times = []
+    peak_enemies = 0
+    peak_bullets = 0
+    
+    gc_before = [stats["collections"] for stats in gc.get_stats()]
+    blocks_before = sys.getallocatedblocks()
+    start = time.perf_counter()
+    for i in range(ticks):
+        # Benchmarks never end on a game over
+        game.player.lives = max(game.player.lives, 3)
+        if scenario.tick:
+            scenario.tick(game)
+        keys = controller(game)
+        
+        t0 = time.perf_counter()
+        game.update(keys)
+        t1 = time.perf_counter()
+        update_times.append(t1 - t0)
+        if draw_every and i % draw_every == 0:
+            game.draw()
+            draw_times.append(time.perf_counter() - t1)
+        profiler.end_frame()
+        
+        peak_enemies = max(peak_enemies, len(game.enemies))
+        peak_bullets = max(peak_bullets, game.bullet_pool.count)
+    elapsed = time.perf_counter() - start
+    gc_after = [stats["collections"] for stats in gc.get_stats()]
+    
+    return {
+        "scenario": scenario.name,
+        "quality": quality,
+        "ticks": ticks,
+        "seconds": elapsed,
+        "ticks_per_second": ticks / elapsed,
+        "update_ms": percentiles(update_times),
+        "draw_ms": percentiles(draw_times),
+        "peak": {"enemies": peak_enemies, "bullets": peak_bullets},
+        "allocations": {
+            "gc_collections": [after - before for before, after in zip(gc_before, gc_after)],
+            "allocated_blocks_delta": sys.getallocatedblocks() - blocks_before
+        },
+        "glyph_atlas": glyph_atlas.stats(),
+        "pools": {"enemies": game.enemy_pool.stats(), "powerups": game.powerup_pool.stats()},
+        "phases_ms": dict(profiler.report()) if profiler.enabled else {}
+    }
+
+def run_benchmarks(names, ticks=None, seed=0, draw_every=2, star_count=100, star_layers=3, quality="full"):
+    return [run_scenario(BENCH_SCENARIOS[name], ticks, seed, draw_every, star_count, star_layers, quality)
+            for name in names]
+
+# Memory footprint per live entity, measured with tracemalloc over a batch of
+# fresh instances. Bullets have no objects, only one row in the pool arrays
+def measure_entity_memory(count=2000, seed=0):
+    import tracemalloc
+    rng = random.Random(seed)
+    pool = BulletPool()
+    emitter = PatternEmitter(pool, load_patterns())
+    motion = EnemyMotion()
+    report = {}
+    for name, make in (("enemy", lambda: Enemy(0, 0, motion, emitter, rng, 0)),
+                       ("powerup", lambda: Powerup(0, 0, rng))):
+        gc.collect()
+        tracemalloc.start()
+        entities = [make() for _ in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        report[name] = {"count": len(entities), "bytes_each": size / count}
+    report["bullet"] = {"bytes_each": sum(getattr(pool, name).itemsize for name in
+                                          ("x", "y", "px", "py", "vx", "vy", "owner",
+                                           "glyph", "color", "alive", "serial"))}
+    return report
+
+# Startup cost by phase, in ms. The import runs in fresh interpreters (it must
+# not open a window or load fonts); the later phases run once in this process,
+# the first font resolution with the on-disk cache bypassed
+def measure_startup(runs=5):
+    import subprocess
+    code = ("import runpy, time; start = time.perf_counter(); runpy.run_path({!r}, run_name='startup'); "
+            "print(time.perf_counter() - start)".format(os.path.abspath(__file__)))
+    imports = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        imports.append(float(result.stdout.split()[-1]) * 1000)
+    phases = [("import", float(np.median(imports)))]
+    
+    def timed(name, action):
+        start = time.perf_counter()
+        action()
+        phases.append((name, (time.perf_counter() - start) * 1000))
+    
+    def resolve_all(use_cache):
+        global font_cache
+        font_cache = None
+        for font in FONTS:
+            resolve_font(font.name, font.bold, use_cache)
+    
+    timed("display", open_display)
+    timed("fonts_cold", lambda: resolve_all(False))
+    timed("fonts_cached", lambda: resolve_all(True))
+    timed("title_frame", lambda: Game().draw())
+    timed("glyph_warmup", lambda: glyph_atlas.prerender(game_glyphs()))
+    report = dict(phases)
+    report["to_title"] = sum(report[name] for name in ("import", "display", "fonts_cached", "title_frame"))
+    return report
+
+# Batch simulation: many independent headless games spread over a process pool
+# for balance sweeps and controller evaluation. Results stream into a columnar
+# directory: one raw little-endian file per column, appended as games finish,
+# and a schema.json describing them
+DEATH_CAUSES = ("normal", "boss")
+BATCH_COLUMNS = ([("job", "<i4"), ("seed", "<i8"), ("policy", "u1")] +
+                 [(name, "<f8") for name in Balance.FIELDS] +
+                 [("score", "<i8"), ("ticks", "<i4"), ("survival_s", "<f8"), ("game_over", "u1")] +
+                 [("deaths_" + cause, "<i2") for cause in DEATH_CAUSES])
+
+class BatchJob:
+    def __init__(self, job, seed, balance, policy="wander", policy_id=0, max_ticks=TICK_RATE * 300):
+        self.job = job
+        self.seed = seed
+        self.balance = balance
+        self.policy = policy  # a POLICIES name or a picklable policy(seed)
+        self.policy_id = policy_id
+        self.max_ticks = max_ticks
+
+def simulate_job(job):
+    game = Game(job.seed, balance=job.balance)
+    policy = POLICIES[job.policy] if isinstance(job.policy, str) else job.policy
+    controller = policy(job.seed)
+    game.state = GameState.GAMEPLAY
+    game.reset_game()
+    start_tick = game.tick
+    for _ in range(job.max_ticks):
+        game.update(controller(game))
+        if game.state != GameState.GAMEPLAY:
+            break
+    ticks = game.tick - start_tick
+    row = [job.job, job.seed, job.policy_id] + job.balance.values()
+    row += [game.player.score, ticks, ticks / TICK_RATE, game.state == GameState.GAME_OVER]
+    row += [game.deaths.count(cause) for cause in DEATH_CAUSES]
+    return row
+
+class BatchWriter:
+    def __init__(self, path, policies):
+        self.path = path
+        self.policies = policies
+        self.rows = 0
+        os.makedirs(path, exist_ok=True)
+        self.files = [open(os.path.join(path, name + ".bin"), "wb") for name, _ in BATCH_COLUMNS]
+        # Written up front too, so a batch cut short can still be loaded
+        self.write_schema()
+
+    def write(self, rows):
+        if not rows:
+            return
+        for i, (f, (_, dtype)) in enumerate(zip(self.files, BATCH_COLUMNS)):
+            np.array([row[i] for row in rows], dtype=dtype).tofile(f)
+            f.flush()
+        self.rows += len(rows)
+
+    def write_schema(self):
+        schema = {"rows": self.rows, "columns": BATCH_COLUMNS, "policies": self.policies,
+                  "death_causes": DEATH_CAUSES}
+        with open(os.path.join(self.path, "schema.json"), "w") as f:
+            json.dump(schema, f, indent=2)
+
+    def close(self):
+        for f in self.files:
+            f.close()
+        self.write_schema()
+
+def load_batch(path):
+    # Columns as NumPy arrays, keyed by name. A batch cut short mid-write
+    # leaves columns of different lengths, so only the rows every column
+    # holds in full are read
+    with open(os.path.join(path, "schema.json")) as f:
+        schema = json.load(f)
+    files = [(name, os.path.join(path, name + ".bin"), np.dtype(dtype)) for name, dtype in schema["columns"]]
+    rows = min(os.path.getsize(file) // dtype.itemsize for _, file, dtype in files)
+    return {name: np.fromfile(file, dtype=dtype, count=rows) for name, file, dtype in files}
+
+def sweep_jobs(games, sweep=None, policies=("wander",), seed=0, max_ticks=TICK_RATE * 300):
+    # Every combination of the swept Balance values and policies, games seeds each
+    sweep = sweep or {}
+    names = list(sweep)
+    jobs = []
+    for values in itertools.product(*(sweep[name] for name in names)):
+        balance = Balance(**dict(zip(names, values)))
+        for policy_id, policy in enumerate(policies):
+            for i in range(games):
+                jobs.append(BatchJob(len(jobs), seed + i, balance, policy, policy_id, max_ticks))
+    return jobs
+
+def batch_worker_init(config=None):
+    # SDL turns SIGTERM and SIGINT into quit events, so workers would survive
+    # Pool.terminate(); let the parent handle Ctrl+C and SIGTERM kill workers
+    import signal
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Workers may not be forked, so they load the parent's config themselves
+    if config is not None:
+        use_tuning(load_tuning(config))
+
+def run_batch(jobs, path, workers=None, flush_every=64, config=None):
+    import multiprocessing
+    # Games finish out of order; the job column ties each row to its job
+    workers = workers or os.cpu_count() or 1
+    policies = []
+    for job in jobs:
+        name = job.policy if isinstance(job.policy, str) else job.policy.__name__
+        if job.policy_id >= len(policies):
+            policies.extend([None] * (job.policy_id + 1 - len(policies)))
+        policies[job.policy_id] = name
+    writer = BatchWriter(path, policies)
+    pending = []
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, batch_worker_init, (config,)) as pool:
+        for row in pool.imap_unordered(simulate_job, jobs, chunksize=max(1, len(jobs) // (workers * 8))):
+            pending.append(row)
+            if len(pending) >= flush_every:
+                writer.write(pending)
+                pending = []
+        pool.close()
+        pool.join()
+    writer.write(pending)
+    writer.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "output": path,
+        "games": writer.rows,
+        "workers": workers,
+        "seconds": elapsed,
+        "games_per_second": writer.rows / elapsed if elapsed else 0.0
+    }
+
+# Vectorized environment for agent training: reset()/step(actions) over several
+# in-process games, gym style. An action is a key mask (0-63 over GAME_KEYS).
+# Observations, rewards and flags live in buffers allocated once and rewritten
+# every step, so copy them if they must outlive the next step. Episodes that
+# end are reset automatically and the returned observation starts the new one
+ENTITY_FEATURES = ("present", "x", "y", "vx", "vy", "kind")
+ENTITY_KINDS = {"player": 1, "normal": 2, "boss": 3, "enemy_bullet": 4, "player_bullet": 5, "powerup": 6}
+GRID_CHARS = " @WBv*P"  # grid cell codes 0-6 drawn as text
+
+class VecEnv:
+    def __init__(self, num_envs=8, observation="entities", ticks_per_step=2, max_steps=None, seed=0,
+                 balance=None, max_enemies=32, max_bullets=128, max_powerups=8, grid_shape=(30, 40),
+                 score_scale=0.01, death_penalty=1.0):
+        if observation not in ("entities", "grid"):
+            raise ValueError("observation must be 'entities' or 'grid'")
+        self.num_envs = num_envs
+        self.observation = observation
+        self.ticks_per_step = ticks_per_step  # simulation ticks per action (action repeat)
+        self.max_steps = max_steps  # truncate episodes after this many steps
+        self.seed = seed
+        self.max_enemies = max_enemies
+        self.max_bullets = max_bullets
+        self.max_powerups = max_powerups
+        self.score_scale = score_scale
+        self.death_penalty = death_penalty
+        self.action_count = 1 << len(GAME_KEYS)
+        self.games = [Game(seed + i, balance=balance) for i in range(num_envs)]
+        self.keys = [KeyState() for _ in range(num_envs)]
+        self.episodes = 0
+        
+        if observation == "entities":
+            rows = 1 + max_enemies + max_bullets + max_powerups
+            self.obs = np.zeros((num_envs, rows, len(ENTITY_FEATURES)), dtype=np.float32)
+        else:
+            self.obs = np.zeros((num_envs,) + tuple(grid_shape), dtype=np.uint8)
+            self.cell_w = WIDTH / grid_shape[1]
+            self.cell_h = HEIGHT / grid_shape[0]
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.terminated = np.zeros(num_envs, dtype=bool)
+        self.truncated = np.zeros(num_envs, dtype=bool)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.scores = np.zeros(num_envs, dtype=np.int64)
+        self.lives = np.zeros(num_envs, dtype=np.int64)
+        self.infos = {"score": self.scores, "lives": self.lives, "steps": self.steps}
+        # Scratch for step(), so stepping allocates no arrays
+        self.new_scores = np.zeros(num_envs, dtype=np.int64)
+        self.new_lives = np.zeros(num_envs, dtype=np.int64)
+        self.deltas = np.zeros(num_envs, dtype=np.int64)
+        self.reward_terms = np.zeros((2, num_envs))
+        
+    def reset(self, seed=None):
+        if seed is not None:
+            self.seed = seed
+            self.episodes = 0
+        for i in range(self.num_envs):
+            self.reset_env(i)
+        return self.obs
+        
+    def reset_env(self, i):
+        # Every episode gets its own seed, so a rollout is reproducible
+        game = self.games[i]
+        game.state = GameState.GAMEPLAY
+        game.reset_game(self.seed + self.episodes * self.num_envs + i)
+        self.steps[i] = 0
+        self.scores[i] = game.player.score
+        self.lives[i] = game.player.lives
+        self.observe(i)
+        
+    def step(self, actions):
+        # The games advance one by one; rewards and flags are then worked out
+        # for all envs at once, in place in the returned buffers
+        terminated = self.terminated
+        for i, game in enumerate(self.games):
+            keys = self.keys[i]
+            keys.mask = int(actions[i])
+            for _ in range(self.ticks_per_step):
+                game.update(keys)
+                if game.state != GameState.GAMEPLAY:
+                    break
+            self.new_scores[i] = game.player.score
+            self.new_lives[i] = game.player.lives
+            terminated[i] = game.state != GameState.GAMEPLAY
+        
+        score_gain, lives_lost = self.reward_terms
+        np.subtract(self.new_scores, self.scores, out=self.deltas)
+        np.multiply(self.deltas, self.score_scale, out=score_gain)
+        np.subtract(self.lives, self.new_lives, out=self.deltas)
+        np.multiply(self.deltas, self.death_penalty, out=lives_lost)
+        np.subtract(score_gain, lives_lost, out=self.rewards, casting="same_kind")
+        self.scores[...] = self.new_scores
+        self.lives[...] = self.new_lives
+        self.steps += 1
+        truncated = self.truncated
+        if self.max_steps is None:
+            truncated.fill(False)
+        else:
+            # Only episodes that did not end on their own are truncated (a > b is a and not b)
+            np.greater_equal(self.steps, self.max_steps, out=truncated)
+            np.greater(truncated, terminated, out=truncated)
+        
+        for i in range(self.num_envs):
+            if terminated[i] or truncated[i]:
+                self.episodes += 1
+                self.reset_env(i)
+            else:
+                self.observe(i)
+        return self.obs, self.rewards, terminated, truncated, self.infos
+        
+    def observe(self, i):
+        if self.observation == "entities":
+            self.observe_entities(i)
+        else:
+            self.observe_grid(i)
+            
+    def observe_entities(self, i):
+        # Rows: player, enemies, the enemy bullets closest to the player, powerups.
+        # Positions are normalized to the screen, velocities are per tick.
+        # Enemies and bullets are copied column by column from their
+        # structure-of-arrays storage straight into the observation
+        obs = self.obs[i]
+        obs.fill(0)
+        game = self.games[i]
+        player = game.player
+        px = player.x + player.width / 2
+        py = player.y + player.height / 2
+        obs[0] = (1, px / WIDTH, py / HEIGHT, player.x - player.prev_x, player.y - player.prev_y,
+                  ENTITY_KINDS["player"])
+        
+        motion = game.motion
+        slots = motion.order()[:self.max_enemies]
+        n = len(slots)
+        if n:
+            block = obs[1:1 + n]
+            block[:, 0] = 1
+            x = motion.x[slots]
+            y = motion.y[slots]
+            block[:, 1] = (x + motion.width[slots] / 2) / WIDTH
+            block[:, 2] = (y + motion.height[slots] / 2) / HEIGHT
+            np.subtract(x, motion.prev_x[slots], out=block[:, 3], casting="same_kind")
+            np.subtract(y, motion.prev_y[slots], out=block[:, 4], casting="same_kind")
+            np.add(motion.boss[slots], ENTITY_KINDS["normal"], out=block[:, 5], casting="unsafe")
+        
+        row = 1 + self.max_enemies
+        pool = game.bullet_pool
+        h = pool.high
+        slots = np.flatnonzero(pool.alive[:h] & (pool.owner[:h] != PLAYER_OWNER))
+        if len(slots) > self.max_bullets:
+            dist = np.square(pool.x[slots] - px) + np.square(pool.y[slots] - py)
+            slots = slots[np.argpartition(dist, self.max_bullets)[:self.max_bullets]]
+        n = len(slots)
+        if n:
+            block = obs[row:row + n]
+            block[:, 0] = 1
+            np.divide(pool.x[slots], WIDTH, out=block[:, 1])
+            np.divide(pool.y[slots], HEIGHT, out=block[:, 2])
+            block[:, 3] = pool.vx[slots]
+            block[:, 4] = pool.vy[slots]
+            block[:, 5] = ENTITY_KINDS["enemy_bullet"]
+        
+        # Powerups are few and plain objects, written a row at a time
+        row = 1 + self.max_enemies + self.max_bullets
+        for p in game.powerups[:self.max_powerups]:
+            obs[row] = (1, (p.x + p.width / 2) / WIDTH, (p.y + p.height / 2) / HEIGHT, 0, p.y - p.prev_y,
+                        ENTITY_KINDS["powerup"])
+            row += 1
+            
+    def observe_grid(self, i):
+        # Downsampled ASCII view: each cell holds the code of the last thing
+        # drawn there, bullets first and the player last
+        grid = self.obs[i]
+        grid.fill(0)
+        rows, cols = grid.shape
+        game = self.games[i]
+        pool = game.bullet_pool
+        slots = pool.live()
+        if len(slots):
+            r = np.clip((pool.y[slots] / self.cell_h).astype(np.int64), 0, rows - 1)
+            c = np.clip((pool.x[slots] / self.cell_w).astype(np.int64), 0, cols - 1)
+            grid[r, c] = np.where(pool.owner[slots] == PLAYER_OWNER,
+                                  ENTITY_KINDS["player_bullet"], ENTITY_KINDS["enemy_bullet"])
+        for entities in (game.powerups, game.enemies, (game.player,)):
+            for e in entities:
+                r = int((e.y + e.height / 2) / self.cell_h)
+                c = int((e.x + e.width / 2) / self.cell_w)
+                if 0 <= r < rows and 0 <= c < cols:
+                    kind = ENTITY_KINDS[getattr(e, "enemy_type", "powerup" if e is not game.player else "player")]
+                    grid[r, c] = kind
+        
+    def grid_text(self, i=0):
+        # Grid observation of one env as lines of text, for debugging
+        return "\n".join("".join(GRID_CHARS[code] for code in line) for line in self.obs[i])
+    
+    def render(self, i=0):
+        # Draws one env to the window; training never needs to call this
+        self.games[i].draw()
+
+def env_throughput(num_envs=8, steps=2000, observation="entities", seed=0):
+    # Steps per second with random actions and no rendering
+    env = VecEnv(num_envs, observation, seed=seed)
+    env.reset()
+    actions = np.random.default_rng(seed).integers(0, env.action_count, size=(steps, num_envs))
+    start = time.perf_counter()
+    for step_actions in actions:
+        env.step(step_actions)
+    elapsed = time.perf_counter() - start
+    return {
+        "envs": num_envs,
+        "observation": observation,
+        "observation_shape": list(env.obs.shape),
+        "steps": steps,
+        "seconds": elapsed,
+        "env_steps_per_second": steps * num_envs / elapsed,
+        "episodes": env.episodes
+    }
+
+# Netcode: local co-op and spectating over UDP (asyncio). The host runs the
+# only real Game and streams snapshots; clients send their key mask and draw
+# what they are sent. A snapshot is a delta against the last state the
+# client acknowledged: players and powerups go in full, enemies as removals
+# plus moved entries, bullets as removals plus new spawns only, since bullet
+# velocities never change and clients extrapolate them. Positions are
+# quantized to 1/8 px in uint16. Every snapshot fits one datagram budget and
+# whatever does not fit stays out of the acknowledged state, so it goes into
+# a later snapshot; bandwidth per client is bounded however many bullets fly
+NET_PORT = 47010
+NET_SEND_RATE = 30  # snapshots per second
+NET_BUDGET = 1200  # bytes per snapshot, under a typical MTU
+NET_SCALE = 8  # quantization steps per pixel
+NET_OFFSET = 1024  # pixels below zero that still encode
+NET_VSCALE = 256  # bullet velocity steps per pixel per tick
+NET_HISTORY = 64  # unacknowledged snapshots kept per client
+NET_INTERP_TICKS = 3 * TICK_RATE // NET_SEND_RATE  # clients draw this far behind the newest snapshot
+NET_TIMEOUT = 5.0  # seconds of silence before a client is dropped
+NET_RESTART_MS = 5000  # the host starts a new run this long after a game over
+NET_HELLO, NET_WELCOME, NET_INPUT, NET_SNAPSHOT, NET_BYE = range(1, 6)
+NET_ROLES = ("player", "spectator")
+NET_SPECTATOR = 255  # player index sent to spectators
+NET_POWERS = ("normal", "double", "triple", "speed", "bomb")
+
+NET_PLAYER = np.dtype([("x", "<u2"), ("y", "<u2"), ("lives", "u1"), ("bombs", "u1"), ("power", "u1"),
+                       ("flags", "u1")])  # flags bit 0: invincible
+NET_POWERUP = np.dtype([("x", "<u2"), ("y", "<u2"), ("kind", "u1")])
+NET_ENEMY = np.dtype([("id", "<u4"), ("x", "<u2"), ("y", "<u2"), ("kind", "u1")])
+NET_BULLET = np.dtype([("id", "<u4"), ("x", "<u2"), ("y", "<u2"), ("vx", "<i2"), ("vy", "<i2"),
+                       ("look", "u1")])  # look: glyph << 4 | color
+NET_BULLET_KNOWN = np.dtype(NET_BULLET.descr + [("tick", "<u4")])  # plus the tick x and y were taken at
+NET_IDS = np.dtype("<u4")
+# type, seq, baseline seq, tick, state, score, your player index, players, powerups,
+# then removed enemies, moved enemies, removed bullets, new bullets
+NET_SNAPSHOT_HEADER = struct.Struct("<BIIIBqBBBHHHH")
+NET_HELLO_MSG = struct.Struct("<BB")  # type, role
+NET_WELCOME_MSG = struct.Struct("<BBH")  # type, player index, tick rate
+NET_INPUT_MSG = struct.Struct("<BIB")  # type, newest snapshot decoded, key mask
+NET_STATES = list(GameState)
+
+def net_quantize(values):
+    return np.clip(np.rint((np.asarray(values, dtype=np.float64) + NET_OFFSET) * NET_SCALE), 0, 65535).astype(np.uint16)
+
+def net_position(values):
+    return values.astype(np.float64) / NET_SCALE - NET_OFFSET
+
+class NetState:
+    # Everything one side knows after a snapshot. Enemies are kept sorted by id
+    def __init__(self):
+        self.seq = 0
+        self.tick = 0
+        self.state = GameState.TITLE
+        self.score = 0
+        self.you = NET_SPECTATOR
+        self.players = np.zeros(0, dtype=NET_PLAYER)
+        self.powerups = np.zeros(0, dtype=NET_POWERUP)
+        self.enemies = np.zeros(0, dtype=NET_ENEMY)
+        self.bullets = np.zeros(0, dtype=NET_BULLET_KNOWN)
+
+    @classmethod
+    def capture(cls, game):
+        # The host's full world, quantized
+        world = cls()
+        world.tick = game.tick
+        world.state = game.state
+        world.score = game.player.score
+        everyone = [game.player] + game.partners
+        players = np.zeros(len(everyone), dtype=NET_PLAYER)
+        players["x"] = net_quantize([player.x for player in everyone])
+        players["y"] = net_quantize([player.y for player in everyone])
+        players["lives"] = [min(max(player.lives, 0), 255) for player in everyone]
+        players["bombs"] = [min(player.bombs, 255) for player in everyone]
+        players["power"] = [NET_POWERS.index(player.power_type) for player in everyone]
+        players["flags"] = [player.invincible for player in everyone]
+        world.players = players
+        powerups = np.zeros(min(len(game.powerups), 255), dtype=NET_POWERUP)
+        shown = game.powerups[:len(powerups)]
+        powerups["x"] = net_quantize([powerup.x for powerup in shown])
+        powerups["y"] = net_quantize([powerup.y for powerup in shown])
+        powerups["kind"] = [Powerup.TYPES.index(powerup.powerup_type) for powerup in shown]
+        world.powerups = powerups
+        motion = game.motion
+        slots = np.array([enemy.slot for enemy in game.enemies], dtype=np.int64)
+        enemies = np.zeros(len(slots), dtype=NET_ENEMY)
+        enemies["id"] = motion.seq[slots]
+        enemies["x"] = net_quantize(motion.x[slots])
+        enemies["y"] = net_quantize(motion.y[slots])
+        enemies["kind"] = [enemy.enemy_type == "boss" for enemy in game.enemies]
+        world.enemies = enemies[np.argsort(enemies["id"], kind="stable")]
+        pool = game.bullet_pool
+        slots = pool.live()
+        bullets = np.zeros(len(slots), dtype=NET_BULLET_KNOWN)
+        bullets["id"] = pool.serial[slots]
+        bullets["x"] = net_quantize(pool.x[slots])
+        bullets["y"] = net_quantize(pool.y[slots])
+        bullets["vx"] = np.clip(np.rint(pool.vx[slots] * NET_VSCALE), -32768, 32767)
+        bullets["vy"] = np.clip(np.rint(pool.vy[slots] * NET_VSCALE), -32768, 32767)
+        bullets["look"] = pool.glyph[slots] << 4 | pool.color[slots]
+        bullets["tick"] = game.tick
+        world.bullets = bullets
+        return world
+
+class NetSnapshot:
+    def __init__(self, seq, base, world, you=NET_SPECTATOR):
+        self.seq = seq
+        self.base = base
+        self.tick = world.tick
+        self.state = world.state
+        self.score = world.score
+        self.you = you
+        self.players = world.players
+        self.powerups = world.powerups
+        self.enemy_removed = np.zeros(0, dtype=NET_IDS)
+        self.enemy_moved = np.zeros(0, dtype=NET_ENEMY)
+        self.bullet_removed = np.zeros(0, dtype=NET_IDS)
+        self.bullet_added = np.zeros(0, dtype=NET_BULLET)
+
+    @classmethod
+    def delta(cls, seq, base_seq, base, world, you=NET_SPECTATOR, budget=NET_BUDGET):
+        # What changed from base to world, cut down to the byte budget
+        snapshot = cls(seq, base_seq, world, you)
+        room = budget - NET_SNAPSHOT_HEADER.size - world.players.nbytes - world.powerups.nbytes
+        
+        # Removals go first, they are the cheapest and keep both sides small
+        removed = base.enemies["id"][~np.isin(base.enemies["id"], world.enemies["id"])]
+        snapshot.enemy_removed = removed[:max(room, 0) // NET_IDS.itemsize]
+        room -= snapshot.enemy_removed.nbytes
+        removed = base.bullets["id"][~np.isin(base.bullets["id"], world.bullets["id"])]
+        snapshot.bullet_removed = removed[:max(room, 0) // NET_IDS.itemsize].astype(NET_IDS)
+        room -= snapshot.bullet_removed.nbytes
+        
+        # Enemies that are new or moved, the furthest off first, so the ones
+        # left out catch up as their error grows
+        known = base.enemies
+        at = np.minimum(np.searchsorted(known["id"], world.enemies["id"]), max(len(known) - 1, 0))
+        if len(known):
+            match = known[at]
+            error = (np.abs(world.enemies["x"].astype(np.int64) - match["x"]) +
+                     np.abs(world.enemies["y"].astype(np.int64) - match["y"]))
+            error[match["id"] != world.enemies["id"]] = np.iinfo(np.int64).max
+            error[(match["id"] == world.enemies["id"]) & (match["kind"] != world.enemies["kind"])] = 1 << 40
+        else:
+            error = np.full(len(world.enemies), np.iinfo(np.int64).max)
+        moved = np.flatnonzero(error > 0)
+        moved = moved[np.argsort(-error[moved], kind="stable")]
+        
+        # Bullets the client has not heard of, nearest to its player first
+        added = np.flatnonzero(~np.isin(world.bullets["id"], base.bullets["id"]))
+        if you < len(world.players) and len(added):
+            focus = world.players[you]
+            distance = (np.abs(world.bullets["x"][added].astype(np.int64) - focus["x"]) +
+                        np.abs(world.bullets["y"][added].astype(np.int64) - focus["y"]))
+            added = added[np.argsort(distance, kind="stable")]
+        
+        # New bullets and moved enemies share what is left, half each, and
+        # either gets whatever the other does not need
+        room = max(room, 0)
+        wanted = len(moved) * NET_ENEMY.itemsize
+        count = min(len(added), max(room // 2, room - wanted) // NET_BULLET.itemsize)
+        bullets = world.bullets[added[:count]]
+        snapshot.bullet_added = np.zeros(count, dtype=NET_BULLET)
+        for name in NET_BULLET.names:
+            snapshot.bullet_added[name] = bullets[name]
+        room -= snapshot.bullet_added.nbytes
+        snapshot.enemy_moved = world.enemies[np.sort(moved[:room // NET_ENEMY.itemsize])]
+        return snapshot
+
+    def apply(self, base):
+        # The state this snapshot describes, given the one it was made against
+        state = NetState()
+        state.seq = self.seq
+        state.tick = self.tick
+        state.state = self.state
+        state.score = self.score
+        state.you = self.you
+        state.players = self.players
+        state.powerups = self.powerups
+        enemies = base.enemies
+        enemies = enemies[~np.isin(enemies["id"], np.concatenate([self.enemy_removed, self.enemy_moved["id"]]))]
+        enemies = np.concatenate([enemies, self.enemy_moved])
+        state.enemies = enemies[np.argsort(enemies["id"], kind="stable")]
+        added = np.zeros(len(self.bullet_added), dtype=NET_BULLET_KNOWN)
+        for name in NET_BULLET.names:
+            added[name] = self.bullet_added[name]
+        added["tick"] = self.tick
+        bullets = base.bullets
+        state.bullets = np.concatenate([bullets[~np.isin(bullets["id"], self.bullet_removed)], added])
+        return state
+
+    def encode(self):
+        header = NET_SNAPSHOT_HEADER.pack(NET_SNAPSHOT, self.seq, self.base, self.tick,
+                                          NET_STATES.index(self.state), self.score, self.you,
+                                          len(self.players), len(self.powerups),
+                                          len(self.enemy_removed), len(self.enemy_moved),
+                                          len(self.bullet_removed), len(self.bullet_added))
+        return b"".join((header, self.players.tobytes(), self.powerups.tobytes(), self.enemy_removed.tobytes(),
+                         self.enemy_moved.tobytes(), self.bullet_removed.tobytes(), self.bullet_added.tobytes()))
+
+    @classmethod
+    def decode(cls, data):
+        (_, seq, base, tick, state, score, you, players, powerups,
+         enemy_removed, enemy_moved, bullet_removed, bullet_added) = NET_SNAPSHOT_HEADER.unpack_from(data)
+        world = NetState()
+        world.tick = tick
+        world.state = NET_STATES[state]
+        world.score = score
+        snapshot = cls(seq, base, world, you)
+        offset = NET_SNAPSHOT_HEADER.size
+        for name, dtype, count in (("players", NET_PLAYER, players), ("powerups", NET_POWERUP, powerups),
+                                   ("enemy_removed", NET_IDS, enemy_removed), ("enemy_moved", NET_ENEMY, enemy_moved),
+                                   ("bullet_removed", NET_IDS, bullet_removed),
+                                   ("bullet_added", NET_BULLET, bullet_added)):
+            setattr(snapshot, name, np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+            offset += dtype.itemsize * count
+        return snapshot
+
+# Loopback impairment for testing: outgoing datagrams are dropped and
+# delayed (with jitter, so they can arrive out of order)
+class NetLink:
+    def __init__(self, loss=0.0, latency_ms=0.0, jitter_ms=0.0, seed=None):
+        self.loss = loss
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.rng = random.Random(seed)
+        self.sent = 0
+        self.dropped = 0
+        self.bytes = 0
+
+    def send(self, transport, data, addr=None):
+        self.sent += 1
+        self.bytes += len(data)
+        if self.loss and self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        delay = self.latency + self.rng.random() * self.jitter
+        if delay > 0:
+            import asyncio
+            asyncio.get_running_loop().call_later(delay, self.deliver, transport, data, addr)
+        else:
+            self.deliver(transport, data, addr)
+
+    def deliver(self, transport, data, addr):
+        if not transport.is_closing():
+            transport.sendto(data, addr)
+
+class NetPeer:
+    # The host's record of one client
+    def __init__(self, addr, role, player, now):
+        self.addr = addr
+        self.role = role
+        self.player = player  # None for spectators
+        self.keys = KeyState(0)
+        self.acked = 0  # newest snapshot the client decoded, 0 for none
+        self.history = {}  # seq -> NetState sent, the candidates for the next baseline
+        self.last_seen = now
+
+    def ack(self, seq):
+        if seq > self.acked and seq in self.history:
+            self.acked = seq
+            for old in [old for old in self.history if old < seq]:
+                del self.history[old]
+
+    def baseline(self):
+        return self.history[self.acked] if self.acked else NetState()
+
+    def sent(self, seq, state):
+        self.history[seq] = state
+        while len(self.history) > NET_HISTORY:
+            del self.history[next(old for old in self.history if old != self.acked)]
+
+# Authoritative host: the first player to join flies player one, later ones
+# become co-op partners, spectators only watch
+# The callbacks asyncio makes on a datagram endpoint, so netcode classes need
+# not subclass asyncio.DatagramProtocol: asyncio is only imported once
+# netcode actually runs, which keeps it out of startup
+class NetProtocol:
+    def connection_made(self, transport):
+        pass
+
+    def datagram_received(self, data, addr):
+        pass
+
+    def error_received(self, exc):
+        pass
+
+    def connection_lost(self, exc):
+        pass
+
+    def pause_writing(self):
+        pass
+
+    def resume_writing(self):
+        pass
+
+class NetServer(NetProtocol):
+    def __init__(self, game, send_rate=NET_SEND_RATE, budget=NET_BUDGET, link=None):
+        self.game = game
+        self.send_every = max(1, TICK_RATE // send_rate)
+        self.budget = budget
+        self.link = link or NetLink()
+        self.peers = {}  # addr -> NetPeer
+        self.seq = 0
+        self.transport = None
+        self.over_at = None  # when the current game over started
+        self.encode_times = []
+        self.snapshot_sizes = []
+        self.worlds = deque(maxlen=NET_HISTORY)  # recent NetStates, for measuring clients
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if not data:
+            return
+        now = time.perf_counter()
+        peer = self.peers.get(addr)
+        if data[0] == NET_HELLO and len(data) >= NET_HELLO_MSG.size:
+            if peer is None:
+                peer = self.join(addr, NET_ROLES[data[1] % len(NET_ROLES)], now)
+            index = self.player_index(peer)
+            self.link.send(self.transport, NET_WELCOME_MSG.pack(NET_WELCOME, index, TICK_RATE), addr)
+        elif peer is None:
+            return
+        elif data[0] == NET_INPUT and len(data) >= NET_INPUT_MSG.size:
+            _, seq, mask = NET_INPUT_MSG.unpack_from(data)
+            peer.ack(seq)
+            peer.keys = KeyState(mask)
+            peer.last_seen = now
+        elif data[0] == NET_BYE:
+            self.leave(peer)
+
+    def join(self, addr, role, now):
+        game = self.game
+        player = None
+        if role == "player":
+            if not any(peer.player is game.player for peer in self.peers.values()):
+                player = game.player
+            else:
+                player = game.add_partner()
+        peer = NetPeer(addr, role, player, now)
+        self.peers[addr] = peer
+        if player is not None and game.state != GameState.GAMEPLAY:
+            game.state = GameState.GAMEPLAY
+            game.reset_game()
+        return peer
+
+    def leave(self, peer):
+        del self.peers[peer.addr]
+        if peer.player is not None and peer.player is not self.game.player:
+            self.game.remove_partner(peer.player)
+        # With nobody left to fly, the host idles until someone joins
+        if not any(other.player is not None for other in self.peers.values()):
+            self.game.state = GameState.TITLE
+
+    def player_index(self, peer):
+        if peer.player is None:
+            return NET_SPECTATOR
+        return ([self.game.player] + self.game.partners).index(peer.player)
+
+    def step(self):
+        game = self.game
+        keys = {id(peer.player): peer.keys for peer in self.peers.values() if peer.player is not None}
+        game.update(keys.get(id(game.player), KeyState(0)),
+                    [keys.get(id(partner), KeyState(0)) for partner in game.partners])
+        if game.state == GameState.GAME_OVER:
+            if self.over_at is None:
+                self.over_at = game.time
+            elif game.time - self.over_at > NET_RESTART_MS:
+                self.over_at = None
+                game.state = GameState.GAMEPLAY
+                game.reset_game()
+        if game.tick % self.send_every == 0:
+            self.broadcast()
+
+    def broadcast(self):
+        if not self.peers:
+            return
+        start = time.perf_counter()
+        world = NetState.capture(self.game)
+        self.worlds.append(world)
+        self.seq += 1
+        for peer in list(self.peers.values()):
+            if start - peer.last_seen > NET_TIMEOUT:
+                self.leave(peer)
+                continue
+            base = peer.baseline()
+            snapshot = NetSnapshot.delta(self.seq, peer.acked, base, world, self.player_index(peer), self.budget)
+            peer.sent(self.seq, snapshot.apply(base))
+            data = snapshot.encode()
+            self.snapshot_sizes.append(len(data))
+            self.link.send(self.transport, data, peer.addr)
+        self.encode_times.append(time.perf_counter() - start)
+
+    async def run(self, seconds=None):
+        # Fixed ticks against the event loop clock, catching up at most 8 at a time
+        import asyncio
+        loop = asyncio.get_running_loop()
+        dt = 1.0 / TICK_RATE
+        start = next_tick = loop.time()
+        while seconds is None or loop.time() - start < seconds:
+            ticks = 0
+            while next_tick <= loop.time() and ticks < 8:
+                self.step()
+                next_tick += dt
+                ticks += 1
+            if ticks == 8:
+                next_tick = max(next_tick, loop.time())
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+# Client: keeps the snapshots later ones may be based on, and draws a short
+# way behind the newest one, interpolating enemies and players between the
+# two snapshots around that moment
+class NetClient(NetProtocol):
+    def __init__(self, role="player", link=None):
+        self.role = role
+        self.link = link or NetLink()
+        self.transport = None
+        self.you = None  # player index once welcomed
+        self.keys = 0
+        self.states = {0: NetState()}  # seq -> decoded state
+        self.latest = 0
+        self.timeline = deque(maxlen=16)  # (arrival time, NetState), oldest first
+        self.received = []  # (arrival time, bytes) per snapshot
+        self.undecodable = 0
+        self.late = 0
+        self.last_hello = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.hello()
+
+    def hello(self):
+        self.link.send(self.transport, NET_HELLO_MSG.pack(NET_HELLO, NET_ROLES.index(self.role)))
+        self.last_hello = time.perf_counter()
+
+    def keepalive(self, now):
+        # Say hello again until the host answers; spectators ack each snapshot
+        # anyway, players send their keys every frame
+        if self.you is None and time.perf_counter() - self.last_hello > 0.5:
+            self.hello()
+
+    def datagram_received(self, data, addr):
+        if not data:
+            return
+        now = time.perf_counter()
+        if data[0] == NET_WELCOME and len(data) >= NET_WELCOME_MSG.size:
+            self.you = data[1]
+        elif data[0] == NET_SNAPSHOT and len(data) >= NET_SNAPSHOT_HEADER.size:
+            self.received.append((now, len(data)))
+            snapshot = NetSnapshot.decode(data)
+            if snapshot.seq <= self.latest:
+                self.late += 1
+                return
+            base = self.states.get(snapshot.base)
+            if base is None:
+                self.undecodable += 1
+                return
+            state = snapshot.apply(base)
+            self.you = snapshot.you
+            # The host never goes back to a baseline older than the one it used
+            for old in [old for old in self.states if old < snapshot.base]:
+                del self.states[old]
+            self.states[snapshot.seq] = state
+            self.latest = snapshot.seq
+            self.timeline.append((now, state))
+            self.send_input()
+
+    def send_input(self):
+        if self.transport is not None:
+            self.link.send(self.transport, NET_INPUT_MSG.pack(NET_INPUT, self.latest, self.keys))
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.sendto(bytes([NET_BYE]))
+            self.transport.close()
+
+    def newest(self):
+        return self.timeline[-1][1] if self.timeline else None
+
+    def frame(self, now):
+        # The two states around the moment being drawn, and how far between them
+        arrival, newest = self.timeline[-1]
+        tick = newest.tick + (now - arrival) * TICK_RATE - NET_INTERP_TICKS
+        states = [state for _, state in self.timeline]
+        for a, b in zip(states, states[1:]):
+            if a.tick <= tick <= b.tick:
+                return a, b, (tick - a.tick) / max(b.tick - a.tick, 1), tick
+        if tick < states[0].tick:
+            return states[0], states[0], 0.0, tick
+        return newest, newest, 0.0, tick
+
+    def hud_values(self, state):
+        if state.you < len(state.players):
+            player = state.players[state.you]
+        elif len(state.players):
+            player = state.players[0]
+        else:
+            return [(state.score, WHITE), (0, WHITE), (0, WHITE), ("Spectating", WHITE)]
+        power = NET_POWERS[player["power"]]
+        color = Powerup.COLORS.get(power, WHITE)
+        return [(state.score, WHITE), (int(player["lives"]), WHITE), (int(player["bombs"]), WHITE),
+                (power.capitalize() if state.you != NET_SPECTATOR else "Spectating", color)]
+
+    def draw(self, renderer, starfield, alpha, now):
+        if self.timeline:
+            a, b, t, tick = self.frame(now)
+        if not self.timeline or b.state not in (GameState.GAMEPLAY, GameState.GAME_OVER):
+            text = "Connecting..." if self.you is None else "Waiting for players"
+            renderer.menu("net", text, lambda: [(text, menu_font, WHITE, (WIDTH // 2, HEIGHT // 2))], starfield, alpha)
+            return
+        if b.state == GameState.GAME_OVER:
+            renderer.menu("net_over", b.score, lambda: [
+                ("GAME OVER", big_font, RED, (WIDTH // 2, HEIGHT // 3)),
+                (f"Team Score: {b.score}", menu_font, WHITE, (WIDTH // 2, HEIGHT // 2)),
+                ("The host starts the next run shortly", menu_font, WHITE, (WIDTH // 2, HEIGHT // 2 + 50))
+            ], starfield, alpha)
+            return
+        renderer.begin_gameplay(starfield, alpha)
+        renderer.hud(self.hud_values(b))
+        
+        # Players and enemies between a and b, powerups as of b
+        blink = int(tick * TICK_MS) % 400 >= 200
+        same = len(a.players) == len(b.players)
+        xs = lerp(net_position(a.players["x"]), net_position(b.players["x"]), t) if same else net_position(b.players["x"])
+        ys = lerp(net_position(a.players["y"]), net_position(b.players["y"]), t) if same else net_position(b.players["y"])
+        for player, x, y in zip(b.players, xs.tolist(), ys.tolist()):
+            if player["lives"]:
+                renderer.art(PLAYER_ART, x, y, YELLOW if player["flags"] & 1 and blink else WHITE)
+        _, ia, ib = np.intersect1d(a.enemies["id"], b.enemies["id"], assume_unique=True, return_indices=True)
+        xs = net_position(b.enemies["x"])
+        ys = net_position(b.enemies["y"])
+        xs[ib] = lerp(net_position(a.enemies["x"][ia]), xs[ib], t)
+        ys[ib] = lerp(net_position(a.enemies["y"][ia]), ys[ib], t)
+        for boss, x, y in zip(b.enemies["kind"].tolist(), xs.tolist(), ys.tolist()):
+            if boss:
+                renderer.art(BOSS_ART, x - 10, y, RED)
+            else:
+                renderer.art(ENEMY_ART, x, y, YELLOW)
+        for x, y, kind in zip(net_position(b.powerups["x"]).tolist(), net_position(b.powerups["y"]).tolist(),
+                              b.powerups["kind"].tolist()):
+            powerup_type = Powerup.TYPES[kind]
+            renderer.badge(POWERUP_SYMBOLS[powerup_type], (x + 10, y + 10), 10, Powerup.COLORS[powerup_type])
+        renderer.flush()
+        
+        # Bullets fly straight, so they are extrapolated from where they were sent
+        bullets = b.bullets
+        age = tick - bullets["tick"].astype(np.float64)
+        xs = net_position(bullets["x"]) + bullets["vx"] / NET_VSCALE * age
+        ys = net_position(bullets["y"]) + bullets["vy"] / NET_VSCALE * age
+        shown = (xs >= 0) & (xs <= WIDTH) & (ys >= 0) & (ys <= HEIGHT)
+        renderer.bullets(bullets["look"][shown] >> 4, bullets["look"][shown] & 15, xs[shown], ys[shown])
+        renderer.flush()
+
+async def net_client_loop(client, renderer, starfield, fps=FPS):
+    # Local frames run on the event loop next to the socket; only the
+    # starfield is simulated here
+    import asyncio
+    loop = asyncio.get_running_loop()
+    next_frame = last = loop.time()
+    behind = 0.0  # starfield ticks due
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_q):
+                return
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+        if client.role == "player":
+            client.keys = KeyState.from_pressed(pygame.key.get_pressed()).mask
+            client.send_input()
+        client.keepalive(loop.time())
+        behind = min(behind + (loop.time() - last) * TICK_RATE, 8)
+        last = loop.time()
+        while behind >= 1:
+            starfield.update()
+            behind -= 1
+        with profiler.scope("draw"):
+            client.draw(renderer, starfield, behind, time.perf_counter())
+            renderer.present()
+        profiler.end_frame()
+        next_frame = max(next_frame + 1 / fps, loop.time())
+        await asyncio.sleep(max(0.0, next_frame - loop.time()))
+
+async def net_serve(address, seed=None, link=None):
+    import asyncio
+    game = Game(seed)
+    loop = asyncio.get_running_loop()
+    transport, server = await loop.create_datagram_endpoint(lambda: NetServer(game, link=link), local_addr=address)
+    print("Hosting on {}:{}".format(*transport.get_extra_info("sockname")[:2]))
+    try:
+        await server.run()
+    finally:
+        transport.close()
+
+async def net_play(address, role, renderer, starfield, link=None):
+    import asyncio
+    loop = asyncio.get_running_loop()
+    client = NetClient(role, link)
+    await loop.create_datagram_endpoint(lambda: client, remote_addr=address)
+    try:
+        await net_client_loop(client, renderer, starfield)
+    finally:
+        client.close()
+
+# Network benchmark: a host and headless clients over loopback with simulated
+# loss, latency and jitter, under a bullet storm from bosses that cannot die
+NET_NEAR = 150  # pixels around a player that count as near for bullet coverage
+
+def setup_net_storm(game):
+    setup_boss_circle(game)
+    for boss in game.enemies:
+        boss.shoot_delay = 150
+        boss.patterns = [game.emitter.library["circle"], game.emitter.library["spiral"]]
+
+async def net_benchmark_run(players, spectators, seconds, loss, latency_ms, jitter_ms, budget, seed):
+    import asyncio
+    loop = asyncio.get_running_loop()
+    game = Game(seed)
+    transport, server = await loop.create_datagram_endpoint(
+        lambda: NetServer(game, budget=budget, link=NetLink(loss, latency_ms, jitter_ms, seed)),
+        local_addr=("127.0.0.1", 0))
+    address = transport.get_extra_info("sockname")[:2]
+    clients = []
+    for i in range(players + spectators):
+        client = NetClient("player" if i < players else "spectator", NetLink(loss, latency_ms, jitter_ms, seed + i + 1))
+        await loop.create_datagram_endpoint(lambda client=client: client, remote_addr=address)
+        clients.append(client)
+    while len(server.peers) < len(clients):
+        for client in clients:
+            client.keepalive(loop.time())
+        await asyncio.sleep(0.05)
+    setup_net_storm(game)
+    
+    rng = random.Random(seed)
+    samples = [{"staleness": [], "coverage": [], "near": [], "error": []} for _ in clients]
+    peak = {"bullets": 0, "enemies": 0}
+    
+    async def drive():
+        # Bots wander and fire; nobody dies, so the storm keeps going
+        while True:
+            for player in [game.player] + game.partners:
+                player.lives = max(player.lives, 3)
+            for client in clients:
+                if client.role == "player":
+                    client.keys = rng.getrandbits(4) | KEY_BITS[pygame.K_SPACE]
+                    client.send_input()
+            peak["bullets"] = max(peak["bullets"], game.bullet_pool.count)
+            peak["enemies"] = max(peak["enemies"], len(game.enemies))
+            # How far behind each client is, and how close its view is to the host's at the same tick
+            worlds = {world.tick: world for world in server.worlds}
+            for client, sample in zip(clients, samples):
+                state = client.newest()
+                if state is None:
+                    continue
+                sample["staleness"].append((game.tick - state.tick) / TICK_RATE)
+                world = worlds.get(state.tick)
+                if world is None:
+                    continue
+                if len(world.bullets):
+                    known = np.isin(world.bullets["id"], state.bullets["id"])
+                    sample["coverage"].append(known.mean())
+                    # Bullets near its own player are the ones sent first
+                    if state.you < len(world.players):
+                        focus = world.players[state.you]
+                        near = ((np.abs(net_position(world.bullets["x"]) - net_position(focus["x"])) < NET_NEAR) &
+                                (np.abs(net_position(world.bullets["y"]) - net_position(focus["y"])) < NET_NEAR))
+                        if near.any():
+                            sample["near"].append(known[near].mean())
+                _, ia, ib = np.intersect1d(world.enemies["id"], state.enemies["id"], assume_unique=True,
+                                           return_indices=True)
+                if len(ia):
+                    dx = net_position(world.enemies["x"][ia]) - net_position(state.enemies["x"][ib])
+                    dy = net_position(world.enemies["y"][ia]) - net_position(state.enemies["y"][ib])
+                    sample["error"].append(float(np.hypot(dx, dy).mean()))
+            await asyncio.sleep(0.1)
+    
+    driver = asyncio.ensure_future(drive())
+    start_tick = game.tick
+    try:
+        await server.run(seconds)
+    finally:
+        driver.cancel()
+        for client in clients:
+            client.close()
+        transport.close()
+    
+    report = []
+    for client, sample in zip(clients, samples):
+        times = np.array([arrival for arrival, _ in client.received])
+        sizes = np.array([size for _, size in client.received])
+        span = times[-1] - times[0] if len(times) > 1 else 1.0
+        per_second = np.histogram(times, bins=np.arange(times[0], times[-1] + 1, 1.0), weights=sizes)[0] if len(times) > 1 else sizes
+        report.append({
+            "role": client.role,
+            "snapshots": len(sizes),
+            "undecodable": client.undecodable,
+            "late": client.late,
+            "bytes_per_second": float(sizes.sum() / span) if len(sizes) else 0.0,
+            "peak_bytes_per_second": float(per_second.max()) if len(per_second) else 0.0,
+            "snapshot_bytes": {"mean": float(sizes.mean()) if len(sizes) else 0.0,
+                               "max": int(sizes.max()) if len(sizes) else 0},
+            "staleness_ms": percentiles(sample["staleness"]),
+            "bullet_coverage": float(np.mean(sample["coverage"])) if sample["coverage"] else 0.0,
+            "near_bullet_coverage": float(np.mean(sample["near"])) if sample["near"] else None,
+            "enemy_error_px": float(np.mean(sample["error"])) if sample["error"] else 0.0
+        })
+    return {
+        "seconds": seconds,
+        "loss": loss,
+        "latency_ms": latency_ms,
+        "jitter_ms": jitter_ms,
+        "budget_bytes": budget,
+        "send_rate": NET_SEND_RATE,
+        "interp_delay_ms": NET_INTERP_TICKS * TICK_MS,
+        "server": {
+            "ticks": game.tick - start_tick,
+            "peak": peak,
+            "snapshots": len(server.snapshot_sizes),
+            "datagrams_dropped": server.link.dropped,
+            "encode_ms": percentiles(server.encode_times)
+        },
+        "clients": report
+    }
+
+def net_benchmark(players=2, spectators=1, seconds=10.0, loss=0.05, latency_ms=40.0, jitter_ms=10.0,
+                  budget=NET_BUDGET, seed=0):
+    import asyncio
+    return asyncio.run(net_benchmark_run(players, spectators, seconds, loss, latency_ms, jitter_ms, budget, seed))
+
+def sweep_spec(spec):
+    # "spawn_rate=0.5,1,2" -> ("spawn_rate", [0.5, 1.0, 2.0])
+    name, _, values = spec.partition("=")
+    try:
+        if name not in Balance.FIELDS:
+            raise ValueError
+        return name, [float(value) for value in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected NAME=V1,V2,... with NAME one of " + ", ".join(Balance.FIELDS))
+
+def positive_int(spec):
+    try:
+        value = int(spec)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"expected a whole number of at least 1, not {spec!r}")
+    return value
+
+def terminal_size(spec):
+    try:
+        cols, rows = (int(n) for n in spec.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected COLSxROWS, e.g. 100x50")
+    return cols, rows
+
+def net_address(spec, host="127.0.0.1"):
+    # HOST:PORT, HOST or PORT; a bare IPv6 address is a host
+    name, _, port = spec.rpartition(":") if spec.count(":") == 1 else ("", "", spec)
+    if not port.isdigit():
+        name, port = spec, NET_PORT
+    return name or host, int(port)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="TuxAscii - an ASCII bullet hell starring Tux")
+    parser.add_argument("--headless", action="store_true",
+                        help="simulate an endless session without a window and print the final state")
+    parser.add_argument("--bench", nargs="*", choices=sorted(BENCH_SCENARIOS), metavar="SCENARIO",
+                        help="run benchmark scenarios (all if none given): " + ", ".join(sorted(BENCH_SCENARIOS)))
+    parser.add_argument("--ticks", type=int, help="ticks to simulate (overrides the scenario length)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for headless runs")
+    parser.add_argument("--draw-every", type=int, default=2,
+                        help="render one frame every N ticks in headless runs, 0 skips rendering")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    parser.add_argument("--stars", type=int, default=100, help="number of background stars on screen")
+    parser.add_argument("--star-layers", type=positive_int, default=3, help="number of parallax starfield layers")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="only redraw changed screen regions (the starfield stays still)")
+    parser.add_argument("--record", metavar="FILE", help="record every run to a replay file")
+    parser.add_argument("--replay", metavar="FILE", help="play back a recorded run")
+    parser.add_argument("--verify", nargs="+", metavar="FILE",
+                        help="re-simulate replays headless and check their final score and state hashes")
+    parser.add_argument("--batch", type=int, metavar="GAMES",
+                        help="simulate GAMES headless games per parameter set and policy over a process pool")
+    parser.add_argument("--sweep", action="append", type=sweep_spec, metavar="NAME=V1,V2",
+                        help="balance values to sweep in a batch: " + ", ".join(Balance.FIELDS))
+    parser.add_argument("--policy", nargs="+", choices=sorted(POLICIES), default=["wander"],
+                        help="controller policies for batch games")
+    parser.add_argument("--workers", type=int, help="batch worker processes (default: every core)")
+    parser.add_argument("--env-bench", type=int, metavar="ENVS",
+                        help="measure VecEnv steps per second over ENVS games (--ticks sets the step count)")
+    parser.add_argument("--observation", choices=("entities", "grid"), default="entities",
+                        help="VecEnv observation type for --env-bench")
+    parser.add_argument("--startup", action="store_true",
+                        help="report startup time by phase (import, display, fonts, first frame) as JSON")
+    parser.add_argument("--memory", action="store_true",
+                        help="print the memory used per enemy, powerup and bullet as JSON")
+    parser.add_argument("--terminal", nargs="?", const=TERMINAL_SIZE, type=terminal_size, metavar="COLSxROWS",
+                        help="play in the terminal with ANSI text output (default size {}x{})".format(*TERMINAL_SIZE))
+    parser.add_argument("--scores", metavar="DIR",
+                        help="where run history and high scores are kept (default: {})".format(data_dir()))
+    parser.add_argument("--quality", choices=[tier.name for tier in QUALITY_TIERS],
+                        help="fix the quality tier instead of adapting it to the frame budget")
+    parser.add_argument("--uncapped", action="store_true",
+                        help="run without the frame rate cap and print frame pacing stats as JSON on exit")
+    parser.add_argument("--serve", nargs="?", const="", type=str, metavar="[HOST:]PORT",
+                        help="host a co-op game for --connect and --spectate clients (default 127.0.0.1:{})".format(NET_PORT))
+    parser.add_argument("--connect", type=net_address, metavar="HOST[:PORT]", help="join a hosted game as a player")
+    parser.add_argument("--spectate", type=net_address, metavar="HOST[:PORT]", help="watch a hosted game")
+    parser.add_argument("--net-bench", action="store_true",
+                        help="measure snapshot bandwidth and latency over a lossy loopback as JSON "
+                             "(--ticks sets the length, default 10 s)")
+    parser.add_argument("--players", type=int, default=2, help="player clients in --net-bench")
+    parser.add_argument("--spectators", type=int, default=1, help="spectator clients in --net-bench")
+    parser.add_argument("--loss", type=float, help="drop this share of datagrams (default 0, 0.05 for --net-bench)")
+    parser.add_argument("--latency", type=float, help="delay datagrams by MS (default 0, 40 for --net-bench)")
+    parser.add_argument("--jitter", type=float, help="add up to MS of random delay (default 0, 10 for --net-bench)")
+    parser.add_argument("--net-budget", type=int, default=NET_BUDGET, help="bytes per snapshot datagram")
+    parser.add_argument("--config", metavar="FILE",
+                        help="load gameplay tuning from a JSON or TOML file, reloaded on change while playing")
+    parser.add_argument("--dump-config", action="store_true",
+                        help="print the tuning in effect (the defaults, or --config) as JSON and exit")
+    parser.add_argument("--profile", action="store_true", help="start with the profiler overlay on (toggle with F3)")
+    parser.add_argument("--trace", metavar="FILE", help="record a Chrome trace-event JSON file (chrome://tracing)")
+    return parser.parse_args(argv)
+
+def write_report(report, path):
+    text = json.dumps(report, indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+# Menu and screen keys, from pygame KEYDOWN events or the terminal
+def handle_key(game, key):
+    if game.state == GameState.TITLE:
+        if key == pygame.K_s:
+            game.state = GameState.GAMEPLAY
+            game.reset_game()
+        elif key == pygame.K_a:
+            game.state = GameState.LORE
+        elif key == pygame.K_d:
+            game.state = GameState.CONTROLS
+    elif game.state == GameState.LORE or game.state == GameState.CONTROLS:
+        if key == pygame.K_q:
+            game.state = GameState.TITLE
+    elif game.state == GameState.GAMEPLAY:
+        if key == pygame.K_q:
+            game.state = GameState.TITLE
+    elif game.state == GameState.GAME_OVER:
+        if key == pygame.K_r:
+            game.state = GameState.GAMEPLAY
+            game.reset_game()
+        elif key == pygame.K_q:
+            game.state = GameState.TITLE
+    
+    # Profiler overlay works on every screen
+    if key == pygame.K_F3:
+        profiler.toggle()
 
 # Main game loop
 def main():
-    game = Game()
+    args = parse_args()
+    if args.config:
+        try:
+            use_tuning(load_tuning(args.config))
+        except (OSError, ValueError) as error:
+            sys.exit(f"config: {error}")
+    if args.dump_config:
+        write_report(tuning.as_dict(), args.output)
+        return
+    if (os.environ.get("TUXASCII_HEADLESS") == "1" or args.headless or args.bench is not None or args.memory or
+            args.verify or args.batch or args.env_bench or args.terminal or args.startup or
+            args.serve is not None or args.net_bench):
+        use_dummy_drivers()
+    if args.startup:
+        write_report(measure_startup(), args.output)
+        return
+    if args.memory:
+        write_report(measure_entity_memory(), args.output)
+        return
+    if args.env_bench:
+        write_report(env_throughput(args.env_bench, args.ticks or 2000, args.observation, args.seed), args.output)
+        return
+    if args.batch:
+        jobs = sweep_jobs(args.batch, dict(args.sweep or []), args.policy, args.seed,
+                          args.ticks or TICK_RATE * 300)
+        write_report(run_batch(jobs, args.output or "batch_results", args.workers, config=args.config), None)
+        return
+    if args.net_bench:
+        write_report(net_benchmark(args.players, args.spectators, (args.ticks or TICK_RATE * 10) / TICK_RATE,
+                                   0.05 if args.loss is None else args.loss,
+                                   40.0 if args.latency is None else args.latency,
+                                   10.0 if args.jitter is None else args.jitter, args.net_budget, args.seed),
+                     args.output)
+        return
+    link = NetLink(args.loss or 0.0, args.latency or 0.0, args.jitter or 0.0)
+    if args.serve is not None:
+        import asyncio
+        try:
+            asyncio.run(net_serve(net_address(args.serve) if args.serve else ("127.0.0.1", NET_PORT), args.seed, link))
+        except KeyboardInterrupt:
+            pass
+        return
+    if args.connect or args.spectate:
+        renderer = PygameRenderer(open_display(), args.dirty_rects)
+        if args.quality:
+            renderer.quality = QUALITY_NAMES[args.quality]
+        if args.profile:
+            profiler.toggle()
+        import asyncio
+        try:
+            asyncio.run(net_play(args.connect or args.spectate, "player" if args.connect else "spectator",
+                                 renderer, Starfield(args.stars, args.star_layers), link))
+        except KeyboardInterrupt:
+            pass
+        pygame.quit()
+        return
+    if args.verify:
+        report = [verify_replay(path, args.stars, args.star_layers) for path in args.verify]
+        write_report(report, args.output)
+        sys.exit(0 if all(result["ok"] for result in report) else 1)
+    if args.profile:
+        profiler.toggle()
+    if args.trace:
+        profiler.start_trace()
+    if args.bench is not None or args.headless:
+        if args.bench is not None:
+            report = run_benchmarks(args.bench or sorted(BENCH_SCENARIOS), args.ticks, args.seed, args.draw_every,
+                                    args.stars, args.star_layers, args.quality or "full")
+        else:
+            report = run_scenario(BENCH_SCENARIOS["endless"], args.ticks, args.seed, args.draw_every,
+                                  args.stars, args.star_layers, args.quality or "full")
+        write_report(report, args.output)
+        if args.trace:
+            profiler.dump_trace(args.trace)
+        return
+    
+    renderer = terminal_input = None
+    if args.terminal:
+        if termios is None or not sys.stdin.isatty():
+            sys.exit("--terminal needs an interactive POSIX terminal")
+        renderer = TerminalRenderer(size=args.terminal)
+        terminal_input = TerminalInput()
+        terminal_input.start()
+        renderer.start()
+    open_display()
+    clock = pygame.time.Clock()
+    game = Game(star_count=args.stars, star_layers=args.star_layers, dirty_rects=args.dirty_rects,
+                renderer=renderer)
+    # Put the title screen up before warming the glyphs gameplay needs
+    game.draw()
+    if terminal_input is None:
+        glyph_atlas.prerender(game_glyphs())
+    loop = FixedStepLoop(game)
+    pacer = FramePacer()
+    if args.quality:
+        game.renderer.quality = QUALITY_NAMES[args.quality]
+    if args.record:
+        game.recorder = ReplayRecorder(args.record)
+    replay = None
+    if args.replay:
+        replay = ReplayPlayer(Replay.load(args.replay))
+        replay.start(game)
+    else:
+        game.scores = ScoreStore(args.scores)
+    # A replay only verifies under the tuning it was recorded with, so the
+    # config stays fixed while recording or playing one back
+    watcher = None
+    if args.config and not (args.record or args.replay):
+        watcher = ConfigWatcher(args.config)
     running = True
     
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-                
-            if event.type == pygame.KEYDOWN:
-                if game.state == GameState.TITLE:
-                    if event.key == pygame.K_s:
-                        game.state = GameState.GAMEPLAY
-                        game.reset_game()
-                    elif event.key == pygame.K_a:
-                        game.state = GameState.LORE
-                    elif event.key == pygame.K_d:
-                        game.state = GameState.CONTROLS
-                elif game.state == GameState.LORE or game.state == GameState.CONTROLS:
-                    if event.key == pygame.K_q:
-                        game.state = GameState.TITLE
-                elif game.state == GameState.GAMEPLAY:
-                    if event.key == pygame.K_q:
-                        game.state = GameState.TITLE
-                elif game.state == GameState.GAME_OVER:
-                    if event.key == pygame.K_r:
-                        game.state = GameState.GAMEPLAY
-                        game.reset_game()
-                    elif event.key == pygame.K_q:
-                        game.state = GameState.TITLE
-        
-        game.update()
-        game.draw()
-        clock.tick(FPS)
+    try:
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                if event.type == pygame.KEYDOWN:
+                    handle_key(game, event.key)
+            
+            if terminal_input is not None:
+                for key in terminal_input.poll():
+                    handle_key(game, key)
+                keys = terminal_input.key_state()
+            else:
+                keys = KeyState.from_pressed(pygame.key.get_pressed())
+            if replay is not None:
+                # Playback drives gameplay until it runs out or the player leaves it
+                if game.state == GameState.GAMEPLAY and not replay.done():
+                    keys = replay
+                else:
+                    replay = None
+            if watcher is not None and watcher.poll():
+                game.retune()
+            frame_start = time.perf_counter()
+            with profiler.scope("update"):
+                alpha = loop.advance(keys)
+            if game.state != GameState.GAMEPLAY:
+                game.finish_run()
+                if game.recorder is not None:
+                    game.recorder.end(game)
+            draw_start = time.perf_counter()
+            with profiler.scope("draw"):
+                game.draw(alpha)
+            frame_end = time.perf_counter()
+            # Spawning backs off while frames cost more than the budget, and
+            # rendering sheds quality tiers. A replay carries its own caps
+            if replay is None:
+                game.spawner.report_frame((frame_end - frame_start) * 1000)
+            if game.state == GameState.GAMEPLAY:
+                game.stats.frame((frame_end - frame_start) * 1000)
+            quality = pacer.report((draw_start - frame_start) * 1000, (frame_end - draw_start) * 1000)
+            if not args.quality:
+                game.renderer.quality = quality
+            profiler.end_frame()
+            clock.tick(0 if args.uncapped else FPS)
+    finally:
+        if terminal_input is not None:
+            renderer.close()
+            terminal_input.close()
+        # A run still going counts as finished
+        game.finish_run()
+        if game.scores is not None:
+            game.scores.close()
     
+    if game.recorder is not None:
+        game.recorder.end(game)
+    if args.trace:
+        profiler.dump_trace(args.trace)
+    if args.uncapped:
+        write_report(pacer.stats(), args.output)
     pygame.quit()
     sys.exit()
 
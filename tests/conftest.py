@@ -0,0 +1,25 @@
+import importlib.util
+import os
+
+import pytest
+
+# The game module's file name is not importable, so load it by path with
+# SDL's dummy drivers: no window opens during tests
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+GAME_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TuxAscii1.0.py")
+
+@pytest.fixture(scope="session")
+def tux():
+    spec = importlib.util.spec_from_file_location("tuxascii", GAME_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def game(tux):
+    game = tux.Game(seed=1)
+    game.state = tux.GameState.GAMEPLAY
+    game.reset_game()
+    return game
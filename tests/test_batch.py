@@ -0,0 +1,52 @@
+import json
+import os
+
+import numpy as np
+
+def write_batch(tux, path, close=True):
+    # The rows run_batch would collect from its workers, simulated in-process
+    jobs = tux.sweep_jobs(2, {"spawn_rate": [1.0, 2.0]}, ("wander", "idle"), seed=5, max_ticks=120)
+    rows = [tux.simulate_job(job) for job in jobs]
+    writer = tux.BatchWriter(str(path), ["wander", "idle"])
+    writer.write(rows[:5])
+    writer.write(rows[5:])
+    writer.write([])
+    if close:
+        writer.close()
+    else:
+        for f in writer.files:
+            f.flush()
+    return jobs, rows
+
+def test_rows_round_trip(tux, tmp_path):
+    _, rows = write_batch(tux, tmp_path)
+    columns = tux.load_batch(str(tmp_path))
+    assert [name for name, _ in tux.BATCH_COLUMNS] == list(columns)
+    for i, (name, dtype) in enumerate(tux.BATCH_COLUMNS):
+        assert columns[name].dtype == np.dtype(dtype)
+        assert np.array_equal(columns[name], np.array([row[i] for row in rows], dtype=dtype))
+    assert columns["job"].tolist() == list(range(8))
+    assert columns["spawn_rate"].tolist() == [1.0] * 4 + [2.0] * 4
+    assert columns["policy"].tolist() == [0, 0, 1, 1] * 2
+    assert np.all(columns["ticks"] == 120)
+    with open(tmp_path / "schema.json") as f:
+        schema = json.load(f)
+    assert schema["rows"] == 8 and schema["policies"] == ["wander", "idle"]
+
+def test_truncated_columns_load_the_complete_rows(tux, tmp_path):
+    _, rows = write_batch(tux, tmp_path)
+    # A crash mid-flush: one column lost a row and a half, another half a row
+    score = tmp_path / "score.bin"
+    os.truncate(score, os.path.getsize(score) - 12)
+    seed = tmp_path / "seed.bin"
+    os.truncate(seed, os.path.getsize(seed) - 3)
+    columns = tux.load_batch(str(tmp_path))
+    assert {len(column) for column in columns.values()} == {6}
+    index = [name for name, _ in tux.BATCH_COLUMNS].index("score")
+    assert columns["score"].tolist() == [row[index] for row in rows[:6]]
+    assert columns["job"].tolist() == list(range(6))
+
+def test_unclosed_batch_loads(tux, tmp_path):
+    write_batch(tux, tmp_path, close=False)
+    columns = tux.load_batch(str(tmp_path))
+    assert columns["job"].tolist() == list(range(8))
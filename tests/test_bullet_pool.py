@@ -0,0 +1,75 @@
+import numpy as np
+
+def fill(tux, pool, n, owner=None):
+    owner = pool.new_owner() if owner is None else owner
+    x = np.arange(n, dtype=np.float32) + 10
+    return pool.spawn(owner, x, np.full(n, 100.0), np.zeros(n), np.ones(n), glyph=1, color=2)
+
+def test_compact_packs_live_bullets_in_order(tux):
+    pool = tux.BulletPool(capacity=256)
+    slots = fill(tux, pool, 200)
+    pool.release(slots[::3])
+    before = {name: getattr(pool, name)[pool.live()].copy() for name in ("x", "y", "vy", "owner", "serial")}
+    pool.compact()
+    assert pool.high == pool.count == len(before["x"])
+    assert np.all(pool.alive[:pool.high]) and not np.any(pool.alive[pool.high:])
+    for name, values in before.items():
+        assert np.array_equal(getattr(pool, name)[pool.live()], values)
+
+def test_compact_keeps_serials_findable_and_the_free_stack_sound(tux):
+    pool = tux.BulletPool(capacity=128)
+    slots = fill(tux, pool, 100)
+    serials = pool.serial[slots[50:60]].copy()
+    pool.release(slots[:50])
+    pool.compact()
+    assert sorted(pool.serial[pool.find(serials)].tolist()) == sorted(serials.tolist())
+    # Every slot is either live or free, exactly once
+    free = pool.free[:pool.free_top]
+    assert len(np.unique(free)) == len(free)
+    assert set(free.tolist()).isdisjoint(pool.live().tolist())
+    assert len(free) + pool.count == pool.capacity
+    # New bullets fill from the lowest free slot up
+    assert sorted(fill(tux, pool, 3).tolist()) == [50, 51, 52]
+
+def test_update_compacts_a_sparse_pool(tux):
+    pool = tux.BulletPool(capacity=1024)
+    owner = pool.new_owner()
+    n = 600
+    x = np.full(n, 100.0)
+    # Three bullets in four fly off the bottom of the screen at once
+    vy = np.where(np.arange(n) % 4 == 0, 0.0, tux.HEIGHT)
+    pool.spawn(owner, x, np.full(n, 10.0), np.zeros(n), vy)
+    pool.update()
+    assert pool.count == n // 4
+    assert pool.high == pool.count
+
+def test_release_owners_matches_releasing_one_owner_at_a_time(tux):
+    def run(batched):
+        pool = tux.BulletPool(capacity=64)
+        owners = [pool.new_owner() for _ in range(4)]
+        for i in range(12):
+            fill(tux, pool, 2, owners[i % 4])
+        if batched:
+            pool.release_owners([owners[2], owners[0]])
+        else:
+            pool.release_owner(owners[2])
+            pool.release_owner(owners[0])
+        return pool.free[:pool.free_top].tolist()
+    assert run(True) == run(False)
+
+def test_slots_do_not_depend_on_how_often_the_pool_grew(tux):
+    def run(capacity):
+        pool = tux.BulletPool(capacity=capacity)
+        owner = pool.new_owner()
+        slots = []
+        for i in range(40):
+            # Release a few of the oldest bullets every tick, then outgrow the
+            # small pool partway through while some released slots are free
+            live = pool.live()
+            pool.release(live[i % 3:i % 3 + 5])
+            slots.append(fill(tux, pool, 7 + i, owner).tolist())
+        return pool.capacity, slots
+    small, grown = run(64)
+    large, fresh = run(4096)
+    assert small > 64 and large == 4096
+    assert grown == fresh
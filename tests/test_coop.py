@@ -0,0 +1,18 @@
+def test_update_survives_partner_leaving_when_everyone_is_out(tux, game):
+    # A partner leaving after the others are out must not crash the tick;
+    # the run ends instead
+    first = game.add_partner()
+    game.add_partner()
+    for _ in range(200):
+        game.update(tux.KeyState())
+    game.player.lives = 0
+    first.lives = 0
+    game.remove_partner(game.partners[1])
+    game.update(tux.KeyState())
+    assert game.state == tux.GameState.GAME_OVER
+
+def test_partners_start_beside_player_one(game):
+    left = game.add_partner()
+    right = game.add_partner()
+    assert left.x > game.player.x > right.x
+    assert game.players() == [game.player, left, right]
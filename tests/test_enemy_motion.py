@@ -0,0 +1,102 @@
+import math
+
+import numpy as np
+import pytest
+
+def spawn(motion, x=100.0, y=50.0, speed=2.0, path="straight", now=0.0):
+    return motion.spawn(object(), x, y, 30, 20, speed, path, 1000, now)
+
+def bezier_point(points, u):
+    # The scalar cubic bezier
+    v = 1 - u
+    return tuple(v ** 3 * p0 + 3 * v * v * u * p1 + 3 * v * u * u * p2 + u ** 3 * p3
+                 for p0, p1, p2, p3 in zip(*points))
+
+def test_bezier_follows_the_curve_then_flies_straight_down(tux):
+    motion = tux.EnemyMotion()
+    points = ((0.0, 0.0), (100.0, 300.0), (400.0, -100.0), (500.0, 200.0))
+    slot = spawn(motion, speed=3.0)
+    motion.bezier(slot, points, duration=1000, start=500)
+    motion.update(200)  # before start it waits at the first point
+    assert (motion.x[slot], motion.y[slot]) == points[0]
+    for now in (500, 750, 900, 1250):
+        motion.update(now)
+        expected = bezier_point(points, min(1.0, (now - 500) / 1000))
+        assert motion.x[slot] == pytest.approx(expected[0])
+        assert motion.y[slot] == pytest.approx(expected[1])
+    # Once the curve is done it carries on straight down from where it was
+    x, y = motion.x[slot], motion.y[slot]
+    motion.update(1500)
+    motion.update(1510)
+    assert motion.x[slot] == x
+    assert motion.y[slot] == pytest.approx(y + 2 * 3.0 * tux.TICK_SCALE)
+
+def test_sine_swings_around_its_origin(tux):
+    motion = tux.EnemyMotion()
+    slot = spawn(motion, y=10.0, speed=1.5, now=100)
+    motion.sine(slot, origin_x=300, amplitude=80, frequency=0.004, phase=0.5)
+    for i, now in enumerate((100, 400, 1000, 2600), 1):
+        motion.update(now)
+        assert motion.x[slot] == pytest.approx(300 + 80 * math.sin(0.004 * (now - 100) + 0.5))
+        assert motion.y[slot] == pytest.approx(10.0 + i * 1.5 * tux.TICK_SCALE)
+
+def test_formation_members_keep_their_offsets_from_the_anchor(tux):
+    motion = tux.EnemyMotion()
+    formation = motion.add_formation(400, 30, speed=2.0, amplitude=50, frequency=0.002, phase=1.0, now=0)
+    offsets = [(-40.0, 0.0), (0.0, -20.0), (40.0, 0.0)]
+    slots = []
+    for dx, dy in offsets:
+        slot = spawn(motion)
+        motion.follow(slot, formation, dx, dy)
+        slots.append(slot)
+    for i, now in enumerate((0, 300, 1700), 1):
+        motion.update(now)
+        anchor_x = 400 + 50 * math.sin(0.002 * now + 1.0)
+        anchor_y = 30 + i * 2.0 * tux.TICK_SCALE
+        for slot, (dx, dy) in zip(slots, offsets):
+            assert motion.x[slot] == pytest.approx(anchor_x + dx)
+            assert motion.y[slot] == pytest.approx(anchor_y + dy)
+
+def test_each_path_kind_only_moves_its_own_enemies(tux):
+    motion = tux.EnemyMotion()
+    straight = spawn(motion, x=10.0, y=10.0, speed=4.0)
+    circular = spawn(motion, x=200.0, y=10.0, speed=1.0, path="circular")
+    sine = spawn(motion, now=0)
+    motion.sine(sine, 500, 20, 0.01)
+    motion.update(16)
+    assert (motion.x[straight], motion.y[straight]) == (10.0, pytest.approx(10.0 + 4.0 * tux.TICK_SCALE))
+    angle = 0.05 * tux.TICK_SCALE
+    assert motion.angle[circular] == pytest.approx(angle)
+    assert motion.x[circular] == pytest.approx(200.0 + math.sin(angle) * 2 * tux.TICK_SCALE)
+    assert motion.x[sine] == pytest.approx(500 + 20 * math.sin(0.01 * 16))
+
+def test_grow_keeps_existing_enemies_and_hands_out_the_lowest_slots(tux):
+    motion = tux.EnemyMotion(capacity=4)
+    slots = [spawn(motion, x=float(i)) for i in range(4)]
+    assert slots == [0, 1, 2, 3]
+    motion.release(1)
+    extra = [spawn(motion, x=float(10 + i)) for i in range(3)]
+    assert motion.capacity == 8
+    assert extra == [1, 4, 5]
+    assert motion.x[[0, 2, 3]].tolist() == [0.0, 2.0, 3.0]
+    assert motion.x[extra].tolist() == [10.0, 11.0, 12.0]
+    assert len(motion.enemies) == 8 and motion.control.shape == (8, 4, 2)
+    assert motion.order().tolist() == [0, 2, 3, 1, 4, 5]
+    motion.update(16)
+    assert np.allclose(motion.y[motion.order()], 50.0 + 2.0 * tux.TICK_SCALE)
+
+def test_grow_formations_keeps_the_formations_in_use(tux):
+    motion = tux.EnemyMotion(formations=2)
+    anchors = [motion.add_formation(100.0 * (i + 1), 0, 1.0, 0, 0, 0, now=0) for i in range(5)]
+    assert motion.formation_capacity >= 5
+    assert anchors == [0, 1, 2, 3, 4]
+    members = []
+    for formation in anchors:
+        slot = spawn(motion)
+        motion.follow(slot, formation, 5.0, 0.0)
+        members.append(slot)
+    motion.update(16)
+    assert motion.x[members].tolist() == [105.0, 205.0, 305.0, 405.0, 505.0]
+    # A formation whose last member goes is reused first
+    motion.release(members[2])
+    assert motion.add_formation(0, 0, 1.0, 0, 0, 0, now=0) == 2
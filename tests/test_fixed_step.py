@@ -0,0 +1,63 @@
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def played(tux, seed, ticks=600):
+    game = tux.Game(seed=1)
+    game.state = tux.GameState.GAMEPLAY
+    game.reset_game(seed)
+    tux.FixedStepLoop(game).run(ticks, tux.scripted_controller(9))
+    return game, game.state_hash()
+
+def test_same_inputs_give_the_same_state(tux):
+    a, first = played(tux, 21)
+    b, second = played(tux, 21)
+    assert first == second
+    assert a.tick == b.tick and a.player.score == b.player.score
+    _, other = played(tux, 22)
+    assert other != first
+
+def test_state_does_not_depend_on_frame_timing(tux):
+    # Real frames of any length drain the same ticks as a headless run
+    game, expected = played(tux, 21, ticks=240)
+    paced = tux.Game(seed=1)
+    paced.state = tux.GameState.GAMEPLAY
+    paced.reset_game(21)
+    clock = FakeClock()
+    loop = tux.FixedStepLoop(paced, clock=clock)
+    controller = tux.scripted_controller(9)
+    loop.advance(controller)
+    frames = [0.004, 0.021, 0.0167, 0.05, 0.001]
+    while paced.tick < game.tick:
+        clock.now += frames[paced.tick % len(frames)]
+        loop.advance(controller)
+    assert paced.tick == game.tick
+    assert paced.state_hash() == expected
+
+def test_large_frame_is_capped_and_keeps_at_most_one_tick(tux, game):
+    clock = FakeClock()
+    loop = tux.FixedStepLoop(game, clock=clock, max_ticks=8)
+    assert loop.advance(tux.KeyState()) == 0.0  # the first call only starts the clock
+    start = game.tick
+    clock.now += 2.0  # a two second stall
+    alpha = loop.advance(tux.KeyState())
+    assert game.tick - start == 8
+    assert alpha == 1.0
+    # The backlog is dropped instead of spiralling into later frames
+    clock.now += loop.dt / 2
+    loop.advance(tux.KeyState())
+    assert game.tick - start == 9
+    assert abs(loop.accumulator - loop.dt / 2) < 1e-9
+
+def test_partial_tick_becomes_the_interpolation_factor(tux, game):
+    clock = FakeClock()
+    loop = tux.FixedStepLoop(game, clock=clock)
+    loop.advance(tux.KeyState())
+    start = game.tick
+    clock.now += 2.25 * loop.dt
+    alpha = loop.advance(tux.KeyState())
+    assert game.tick - start == 2
+    assert abs(alpha - 0.25) < 1e-9
@@ -0,0 +1,46 @@
+def report(pacer, frames, update_ms, draw_ms=0.0):
+    tiers = []
+    for _ in range(frames):
+        pacer.report(update_ms, draw_ms)
+        tiers.append(pacer.tier)
+    return tiers
+
+def test_sustained_slow_frames_shed_one_tier_at_a_time(tux):
+    pacer = tux.FramePacer(fps=60, shed_after=20)
+    tiers = report(pacer, 19, 15.0, 10.0)
+    assert tiers[-1] == 0
+    report(pacer, 1, 15.0, 10.0)
+    assert pacer.tier == 1
+    assert pacer.quality is tux.QUALITY_TIERS[1]
+    # The window restarts after a shed, so the next tier takes as long again
+    tiers = report(pacer, 20, 15.0, 10.0)
+    assert tiers.count(1) == 19 and tiers[-1] == 2
+
+def test_one_fast_frame_does_not_restore_a_tier(tux):
+    pacer = tux.FramePacer(fps=60, shed_after=20, restore_after=180)
+    report(pacer, 20, 30.0)
+    assert pacer.tier == 1
+    report(pacer, 1, 1.0)
+    assert pacer.tier == 1
+    # A short slow stretch is not enough to shed another tier
+    report(pacer, 5, 30.0)
+    assert pacer.tier == 1
+    # Restoring takes restore_after frames with headroom, once the slow
+    # frames have left the rolling window
+    tiers = report(pacer, 240, 1.0)
+    restored = tiers.index(0) + 1
+    assert 180 <= restored <= 180 + 30
+    assert set(tiers[restored - 1:]) == {0}
+
+def test_a_single_spike_does_not_shed(tux):
+    pacer = tux.FramePacer(fps=60, window=30, shed_after=20)
+    report(pacer, 30, 5.0)
+    tiers = report(pacer, 1, 200.0) + report(pacer, 60, 5.0)
+    assert set(tiers) == {0}
+
+def test_frames_near_the_budget_keep_the_tier(tux):
+    pacer = tux.FramePacer(fps=60, shed_after=20, restore_after=180, headroom=0.6)
+    report(pacer, 20, 30.0)
+    tiers = report(pacer, 1000, 14.0)  # under budget, not enough headroom
+    assert set(tiers) == {1}
+    assert pacer.tier_frames[0] == 20 and pacer.tier_frames[1] == 1000
@@ -0,0 +1,23 @@
+import pygame
+
+def test_glyphs_cached_before_the_display_opens_get_converted(tux, monkeypatch):
+    # Close any display an earlier test opened, so the warmup runs without one
+    pygame.display.quit()
+    tux.screen = None
+    atlas = tux.GlyphAtlas()
+    monkeypatch.setattr(tux, "glyph_atlas", atlas)
+    atlas.prerender(tux.game_glyphs())
+    before = dict(atlas.surfaces)
+    tux.open_display()
+    assert list(atlas.surfaces) == list(before)
+    assert all(atlas.surfaces[key] is not surface for key, surface in before.items())
+    assert atlas.stats()["misses"] == len(before)
+
+def test_lru_evicts_the_least_recently_used(tux):
+    atlas = tux.GlyphAtlas(capacity=2)
+    atlas.get("a", tux.game_font, tux.WHITE)
+    atlas.get("b", tux.game_font, tux.WHITE)
+    atlas.get("a", tux.game_font, tux.WHITE)
+    atlas.get("c", tux.game_font, tux.WHITE)
+    assert [key[0] for key in atlas.surfaces] == ["a", "c"]
+    assert atlas.stats()["hits"] == 1 and atlas.stats()["misses"] == 3
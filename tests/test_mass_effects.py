@@ -0,0 +1,54 @@
+def enemy_bullets(tux, game):
+    pool = game.bullet_pool
+    return int((pool.alive[:pool.high] & (pool.owner[:pool.high] != tux.PLAYER_OWNER)).sum())
+
+def test_damage_area_hurts_only_enemies_in_range(game):
+    near = game.spawn_enemy(100, 100, game.time)
+    far = game.spawn_enemy(600, 100, game.time)
+    near.health = far.health = 5
+    assert game.damage_area(115, 115, 50, 2) == 1
+    assert near.health == 3
+    assert far.health == 5
+
+def test_damage_area_kills_what_it_finishes(game):
+    weak = game.spawn_enemy(100, 100, game.time)
+    tough = game.spawn_enemy(110, 100, game.time)
+    weak.health, tough.health = 1, 10
+    score = game.player.score
+    game.damage_area(115, 115, 50, 2)
+    assert game.enemies == [tough]
+    assert game.player.score == score + 100
+    assert game.stats.kills == 1
+
+def test_convert_bullets_scores_enemy_bullets_only(tux, game):
+    enemy = game.spawn_enemy(100, 100, game.time)
+    for i in range(5):
+        enemy.bullets.spawn(100 + i, 200, 1)
+    game.player.bullets.spawn(300, 300, -1)
+    score = game.player.score
+    assert game.convert_bullets(points=7) == 5
+    assert game.player.score == score + 35
+    assert enemy_bullets(tux, game) == 0
+    assert game.bullet_pool.count == 1
+
+def test_boss_kill_leaves_other_enemies_and_bullets_alone(tux, game):
+    boss = game.spawn_enemy(300, 100, game.time, "boss")
+    near = game.spawn_enemy(330, 140, game.time)
+    near.health = 1
+    near.bullets.spawn(330, 160, 1)
+    near.bullets.spawn(340, 160, 1)
+    score = game.player.score
+    game.kill_enemies([boss])
+    assert game.enemies == [near]
+    assert near.health == 1
+    assert game.player.score == score + tux.tuning.enemy_boss_points
+    assert enemy_bullets(tux, game) == 2
+
+def test_bomb_clears_enemies_and_their_bullets(tux, game):
+    for i in range(20):
+        enemy = game.spawn_enemy(20 * i, 100, game.time)
+        enemy.bullets.spawn(20 * i, 150, 1)
+    game.clear_screen(points=10)
+    assert game.enemies == []
+    assert enemy_bullets(tux, game) == 0
+    assert game.player.score == 200
@@ -0,0 +1,58 @@
+import numpy as np
+
+def busy_world(tux, ticks=900):
+    game = tux.Game(seed=4)
+    game.add_partner()
+    game.state = tux.GameState.GAMEPLAY
+    game.reset_game()
+    for _ in range(ticks):
+        game.player.lives = 3
+        game.update(tux.KeyState(16))
+    return game, tux.NetState.capture(game)
+
+def by_id(array):
+    return array[np.argsort(array["id"], kind="stable")]
+
+def roundtrip(tux, base, world, budget, you=0):
+    snapshot = tux.NetSnapshot.delta(1, 0, base, world, you, budget)
+    data = snapshot.encode()
+    return data, tux.NetSnapshot.decode(data).apply(base)
+
+def test_full_snapshot_round_trips(tux):
+    game, world = busy_world(tux)
+    assert len(world.enemies) and len(world.bullets)
+    _, state = roundtrip(tux, tux.NetState(), world, budget=1 << 20)
+    assert state.tick == world.tick and state.score == world.score and state.state == world.state
+    assert np.array_equal(state.players, world.players)
+    assert np.array_equal(state.powerups, world.powerups)
+    assert np.array_equal(state.enemies, world.enemies)
+    assert np.array_equal(by_id(state.bullets), by_id(world.bullets))
+
+def test_snapshots_fit_the_budget_and_converge(tux):
+    game, world = busy_world(tux)
+    base = tux.NetState()
+    for _ in range(200):
+        data, base = roundtrip(tux, base, world, budget=tux.NET_BUDGET)
+        assert len(data) <= tux.NET_BUDGET
+        if len(base.bullets) == len(world.bullets) and np.array_equal(base.enemies, world.enemies):
+            break
+    assert np.array_equal(by_id(base.bullets)["id"], by_id(world.bullets)["id"])
+    assert np.array_equal(base.enemies, world.enemies)
+
+def test_delta_removes_what_is_gone_and_skips_what_is_unchanged(tux):
+    game, old = busy_world(tux)
+    _, known = roundtrip(tux, tux.NetState(), old, budget=1 << 20)
+    for _ in range(30):
+        game.update(tux.KeyState(0))
+    new = tux.NetState.capture(game)
+    snapshot = tux.NetSnapshot.delta(2, 1, known, new, 0, 1 << 20)
+    gone = set(old.bullets["id"].tolist()) - set(new.bullets["id"].tolist())
+    assert set(snapshot.bullet_removed.tolist()) == gone
+    assert not set(snapshot.bullet_added["id"].tolist()) & set(old.bullets["id"].tolist())
+    state = tux.NetSnapshot.decode(snapshot.encode()).apply(known)
+    assert np.array_equal(by_id(state.bullets)["id"], by_id(new.bullets)["id"])
+    assert np.array_equal(state.enemies, new.enemies)
+    # An unchanged world needs no enemy or bullet records at all
+    again = tux.NetSnapshot.delta(3, 2, state, new, 0, 1 << 20)
+    assert len(again.enemy_moved) == len(again.bullet_added) == 0
+    assert len(again.enemy_removed) == len(again.bullet_removed) == 0
@@ -0,0 +1,28 @@
+import numpy as np
+
+def test_single_explosions_wrap_around_the_ring(tux):
+    # sparks() leaves the head off a multiple of the explosion size, so
+    # single explosions soon straddle the end of the buffer
+    particles = tux.ParticleSystem(capacity=64, seed=1)
+    particles.sparks(10.0, 10.0)
+    for i in range(64):
+        particles.explosion(np.array([float(i)]), np.array([20.0]), 1)
+        particles.explosion(float(i), 30.0, 2)
+    assert particles.head == (8 + 64 * 2 * 16) % 64
+    assert np.all(particles.life > 0)
+
+def test_explosion_straddling_the_end_fills_both_parts(tux):
+    particles = tux.ParticleSystem(capacity=64, seed=1)
+    particles.head = 56
+    particles.explosion(np.array([5.0]), np.array([7.0]), 3)
+    written = np.r_[56:64, 0:8]
+    assert np.all(particles.x[written] == 5.0)
+    assert np.all(particles.y[written] == 7.0)
+    assert np.all(particles.color[written] == 3)
+    assert particles.head == 8
+
+def test_explosions_share_the_buffer(tux):
+    particles = tux.ParticleSystem(capacity=64, seed=1)
+    particles.explosion(np.arange(8, dtype=np.float32), np.zeros(8, dtype=np.float32), 0)
+    assert particles.head == 0  # 8 explosions of 8 particles fill it exactly
+    assert sorted(set(particles.x.tolist())) == list(range(8))
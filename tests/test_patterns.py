@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+def library(tux, **spec):
+    return tux.PatternLibrary({"patterns": {"test": dict({"type": "ring", "count": 4}, **spec)},
+                               "enemies": {"normal": ["test"]}})
+
+def test_shipped_patterns_compile(tux):
+    patterns = tux.load_patterns()
+    assert patterns.for_enemy("normal")
+    assert patterns["fireworks"].sub is patterns["spark"]
+
+@pytest.mark.parametrize("spec, message", [
+    ({"count": 0}, "count"),
+    ({"speed": 0}, "speed"),
+    ({"speed": -3}, "speed"),
+    ({"repeat": 0}, "repeat"),
+    ({"repeat": 3, "interval": 0}, "interval"),
+    ({"interval": -5}, "interval"),
+    ({"delay": -1}, "delay"),
+])
+def test_bad_values_are_rejected_at_load(tux, spec, message):
+    with pytest.raises(ValueError, match=f"pattern 'test': {message}"):
+        library(tux, **spec)
+
+def test_sub_pattern_needs_a_delay(tux):
+    data = {"patterns": {"test": {"type": "ring", "count": 4, "sub": "test"}},
+            "enemies": {"normal": ["test"]}}
+    with pytest.raises(ValueError, match="delay"):
+        tux.PatternLibrary(data)
+
+def test_ring_velocities_have_the_pattern_speed(tux):
+    pattern = library(tux, speed=6)["test"]
+    speeds = np.hypot(pattern.vx, pattern.vy)
+    assert np.allclose(speeds, 6 * tux.TICK_SCALE)
+
+def test_spawn_of_nothing_is_a_no_op(tux):
+    pool = tux.BulletPool(capacity=8)
+    slots = pool.spawn(pool.new_owner(), np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0))
+    assert len(slots) == 0
+    assert pool.count == 0 and pool.high == 0
+
+def test_spawned_slots_survive_a_later_release(tux):
+    pool = tux.BulletPool(capacity=8)
+    owner = pool.new_owner()
+    first = pool.spawn(owner, np.zeros(3), np.zeros(3), np.zeros(3), np.ones(3))
+    kept = first.tolist()
+    pool.release(pool.spawn(owner, np.zeros(2), np.zeros(2), np.zeros(2), np.ones(2)))
+    pool.release(np.array(kept[-1:]))
+    assert first.tolist() == kept
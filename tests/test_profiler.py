@@ -0,0 +1,15 @@
+def test_overlay_leaves_the_glyph_atlas_alone(tux, game):
+    screen = tux.open_display()
+    tux.profiler.toggle()
+    try:
+        for _ in range(5):
+            with tux.profiler.scope("update"):
+                game.update(tux.KeyState(16))
+            game.draw(0.5)
+            tux.profiler.end_frame()
+        before = tux.glyph_atlas.stats()
+        for _ in range(5):
+            tux.profiler.draw_overlay(screen)
+        assert tux.glyph_atlas.stats() == before
+    finally:
+        tux.profiler.toggle()
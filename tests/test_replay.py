@@ -0,0 +1,77 @@
+import pytest
+
+TICKS = 3 * 120 + 37
+
+@pytest.fixture
+def busy(tux):
+    # Enemies outnumber the spawn cap and bosses fill the bullet pool past
+    # its starting capacity, so both the cap and pool growth matter
+    saved = tux.tuning
+    tux.use_tuning(tux.Tuning({
+        "player": {"lives": 99},
+        "enemy": {"min_shoot_delay": 50, "max_shoot_delay": 60, "health": 50, "boss_health": 10000},
+        "waves": {"scouts": {"start": 0, "every": 100, "count": 3}, "boss": {"start": 0, "every": 500, "count": 3}}
+    }))
+    yield
+    tux.use_tuning(saved)
+
+def record_run(tux, path, grown=False, squeeze=True):
+    # A scripted run whose spawn cap is squeezed by slow frames and later
+    # recovers, the way the interactive loop's frame budget feedback moves it
+    game = tux.Game(seed=3)
+    if grown:
+        # As after a busy earlier run in the same session
+        game.bullet_pool.grow(4 * game.bullet_pool.capacity)
+    game.recorder = tux.ReplayRecorder(str(path))
+    game.state = tux.GameState.GAMEPLAY
+    game.reset_game(11)
+    controller = tux.scripted_controller(5)
+    for i in range(TICKS):
+        if squeeze:
+            game.spawner.report_frame(100.0 if 100 <= i < 200 else 1.0)
+        game.update(controller(game))
+    game.state = tux.GameState.TITLE
+    return game, game.recorder.end(game)
+
+def test_recorded_run_verifies(tux, tmp_path, busy):
+    game, path = record_run(tux, tmp_path / "run.tuxr")
+    replay = tux.Replay.load(path)
+    assert len(replay.masks) == TICKS
+    assert len(replay.checkpoints) == 4
+    assert len(replay.caps) > 2  # the starting cap, then changes both ways
+    assert min(cap for _, cap in replay.caps) < replay.caps[0][1]
+    result = tux.verify_replay(path)
+    assert result["ok"], result
+    assert result["score"]["replayed"] == game.player.score
+
+def test_replay_verifies_after_the_pool_grew_in_an_earlier_run(tux, tmp_path, busy):
+    # Recorded in a session whose bullet pool had already grown, verified in
+    # a fresh one whose pool has to grow partway through
+    game, path = record_run(tux, tmp_path / "run.tuxr", grown=True, squeeze=False)
+    assert game.bullet_pool.count > 4096
+    assert tux.verify_replay(path)["ok"]
+
+def test_frame_times_during_playback_do_not_move_the_cap(tux, tmp_path, busy):
+    _, path = record_run(tux, tmp_path / "run.tuxr")
+    replay = tux.Replay.load(path)
+    game = tux.Game(seed=3)
+    player = tux.ReplayPlayer(replay)
+    player.start(game)
+
+    def slow_machine(game):
+        # The frame budget feedback keeps reporting while the replay plays
+        game.spawner.report_frame(100.0)
+        return player(game)
+    tux.FixedStepLoop(game).run(len(replay.masks), slow_machine)
+    assert player.diverged is None
+    assert game.state_hash() == replay.final_hash
+
+def test_changed_input_is_caught_at_the_next_checkpoint(tux, tmp_path, busy):
+    _, path = record_run(tux, tmp_path / "run.tuxr")
+    replay = tux.Replay.load(path)
+    for i in range(130, 150):
+        replay.masks[i] ^= 0b0001  # left flipped for a few ticks
+    replay.save(path)
+    result = tux.verify_replay(path)
+    assert not result["ok"]
+    assert result["first_divergence_tick"] == 240
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+
+def run(tux, score, when=0.0):
+    record = np.zeros((), dtype=tux.RUN_DTYPE)
+    record["score"] = score
+    record["time"] = when
+    return record
+
+def store_with(tux, path, scores, top=100):
+    store = tux.ScoreStore(str(path), top=top)
+    for i, score in enumerate(scores):
+        store.submit(run(tux, score, when=i))
+    store.close()
+    return store
+
+def reopen(tux, path, top=100):
+    # close() waits for the background thread, which loads before anything else
+    store = tux.ScoreStore(str(path), top=top)
+    store.close()
+    assert store.error is None
+    return store
+
+def test_appended_runs_survive_a_reload(tux, tmp_path):
+    written = store_with(tux, tmp_path, [300, 100, 200])
+    assert written.error is None and written.runs == 3
+    store = reopen(tux, tmp_path)
+    assert store.runs == 3
+    assert store.top["score"].tolist() == [300, 200, 100]
+    log = np.fromfile(str(tmp_path / "runs.log"), dtype=tux.RUN_DTYPE, offset=tux.RUN_LOG_HEADER.size)
+    assert log["score"].tolist() == [300, 100, 200]
+
+def test_index_is_rebuilt_from_the_log(tux, tmp_path):
+    store_with(tux, tmp_path, [5, 50, 20], top=2)
+    os.remove(tmp_path / "scores.idx")
+    store = reopen(tux, tmp_path, top=2)
+    assert store.top["score"].tolist() == [50, 20]
+    assert os.path.exists(tmp_path / "scores.idx")
+    # An index that covers fewer runs than the log is stale and rebuilt too
+    with open(tmp_path / "runs.log", "ab") as f:
+        f.write(run(tux, 70).tobytes())
+    store = reopen(tux, tmp_path, top=2)
+    assert store.runs == 4
+    assert store.top["score"].tolist() == [70, 50]
+
+def test_partial_trailing_record_is_truncated(tux, tmp_path):
+    store_with(tux, tmp_path, [10, 30])
+    log = tmp_path / "runs.log"
+    with open(log, "ab") as f:
+        f.write(b"\xff" * (tux.RUN_DTYPE.itemsize // 2))  # a crash mid-write
+    store = store_with(tux, tmp_path, [20])
+    assert store.error is None and store.runs == 3
+    assert (os.path.getsize(log) - tux.RUN_LOG_HEADER.size) % tux.RUN_DTYPE.itemsize == 0
+    store = reopen(tux, tmp_path)
+    assert store.top["score"].tolist() == [30, 20, 10]
+
+def test_high_scores_are_best_first_and_capped(tux, tmp_path):
+    store = store_with(tux, tmp_path, [40, 90, 40, 10, 90, 60], top=4)
+    assert store.top["score"].tolist() == [90, 90, 60, 40]
+    # Equal scores keep the order they were played in
+    assert store.top["time"].tolist() == [1.0, 4.0, 5.0, 0.0]
+    assert store.version == 7  # the load, then one publish per run
+
+def test_run_stats_frame_percentiles(tux):
+    stats = tux.RunStats()
+    assert stats.frame_percentile(0.5) == 0.0
+    for _ in range(98):
+        stats.frame(4.1)
+    stats.frame(30.0)
+    stats.frame(500.0)
+    assert stats.frame_percentile(0.5) == 4.25
+    assert stats.frame_percentile(0.99) == 30.25
+    assert stats.frame_max == 500.0
+    assert stats.frames[-1] == 1
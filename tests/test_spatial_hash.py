@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+def boxes(rng, n, size):
+    x = rng.uniform(-50, 850, n).astype(np.float32)
+    y = rng.uniform(-50, 650, n).astype(np.float32)
+    w = rng.uniform(1, size, n).astype(np.float32)
+    h = rng.uniform(1, size, n).astype(np.float32)
+    return x, y, w, h
+
+def brute_force(tux, a, b):
+    ax, ay, aw, ah = (value[:, None] for value in a)
+    hit = tux.aabb_overlap(ax, ay, aw, ah, *b)
+    return sorted(zip(*(ids.tolist() for ids in np.nonzero(hit))))
+
+@pytest.mark.parametrize("seed, size", [(0, 8), (1, 40), (2, 200)])
+def test_pairs_match_brute_force(tux, seed, size):
+    # Large boxes span many cells, which must not report a pair twice
+    rng = np.random.default_rng(seed)
+    a = boxes(rng, 150, size)
+    b = boxes(rng, 300, size)
+    grid = tux.SpatialHash()
+    grid.insert("a", *a)
+    grid.insert("b", *b)
+    ids_a, ids_b = grid.pairs("a", "b")
+    assert sorted(zip(ids_a.tolist(), ids_b.tolist())) == brute_force(tux, a, b)
+
+def test_pairs_report_the_given_ids(tux):
+    grid = tux.SpatialHash()
+    grid.insert("a", [10], [10], 20, 20, ids=[7])
+    grid.insert("b", [500, 15], [500, 15], 5, 5, ids=[40, 41])
+    ids_a, ids_b = grid.pairs("a", "b")
+    assert ids_a.tolist() == [7] and ids_b.tolist() == [41]
+
+def test_empty_or_missing_layers_have_no_pairs(tux):
+    grid = tux.SpatialHash()
+    grid.insert("a", [10], [10], 20, 20)
+    grid.insert("b", [], [], 5, 5)
+    for other in ("b", "missing"):
+        ids_a, ids_b = grid.pairs("a", other)
+        assert len(ids_a) == len(ids_b) == 0
+
+def test_query_and_near(tux):
+    grid = tux.SpatialHash()
+    grid.insert("enemies", [100, 300, 700], [100, 100, 500], 30, 30)
+    assert grid.query("enemies", 90, 90, 20, 20).tolist() == [0]
+    assert sorted(grid.near(150, 100, 10, 10, 200, ["enemies"])["enemies"].tolist()) == [0, 1]
@@ -0,0 +1,98 @@
+import pytest
+
+def flat_curve(tux):
+    # Difficulty stays at 1, so intervals and counts are the wave's own
+    return tux.DifficultyCurve(per_minute=0, per_score=0)
+
+def scheduler(tux, waves, **kwargs):
+    kwargs.setdefault("curve", flat_curve(tux))
+    spawner = tux.SpawnScheduler(waves, **kwargs)
+    spawner.reset(0.0)
+    return spawner
+
+def names(due):
+    return [wave.name for wave, _ in due]
+
+def test_waves_are_released_in_time_order(tux):
+    waves = [tux.Wave("late", start=500, every=10000), tux.Wave("early", start=100, every=10000),
+             tux.Wave("middle", start=300, every=10000)]
+    spawner = scheduler(tux, waves, base_cap=100)
+    assert names(spawner.poll(50, 0, 0)) == []
+    assert names(spawner.poll(200, 0, 0)) == ["early"]
+    assert names(spawner.poll(1000, 0, 0)) == ["middle", "late"]
+
+def test_a_wave_repeats_every_interval(tux):
+    spawner = scheduler(tux, [tux.Wave("scouts", start=100, every=400)], base_cap=100)
+    released = [now for now in range(0, 2000, 50) if spawner.poll(now, 0, 0)]
+    assert released == [100, 500, 900, 1300, 1700]
+
+def test_equal_due_times_keep_wave_order(tux):
+    waves = [tux.Wave(name, start=100, every=10000) for name in ("a", "b", "c")]
+    assert names(scheduler(tux, waves, base_cap=100).poll(100, 0, 0)) == ["a", "b", "c"]
+
+def test_difficulty_ramps_with_time_and_score_up_to_the_maximum(tux):
+    curve = tux.DifficultyCurve(per_minute=0.5, per_score=1 / 1000, maximum=3.0)
+    assert curve.level(0, 0) == 1.0
+    assert curve.level(60000, 0) == pytest.approx(1.5)
+    assert curve.level(0, 500) == pytest.approx(1.5)
+    assert curve.level(60000 * 100, 0) == 3.0
+
+def test_higher_difficulty_shortens_intervals_and_grows_waves(tux):
+    wave = tux.Wave("squad", start=0, every=1000, count=4, scale_count=True)
+    curve = tux.DifficultyCurve(per_minute=0, per_score=1 / 1000, maximum=4.0)
+    spawner = scheduler(tux, [wave], curve=curve, base_cap=100)
+    assert spawner.poll(0, 1000, 0) == [(wave, 8)]  # level 2: twice the enemies...
+    assert spawner.events[0][0] == 500  # ...twice as often
+
+def test_cap_holds_waves_back_and_retries(tux):
+    spawner = scheduler(tux, [tux.Wave("scouts", start=0, every=1000, count=5)], base_cap=10, retry=250)
+    assert spawner.poll(0, 0, 10) == []
+    assert spawner.events[0][0] == 250
+    assert [count for _, count in spawner.poll(250, 0, 7)] == [3]  # trimmed to the room left
+
+def test_bosses_ignore_the_cap(tux):
+    boss = tux.Wave("boss", enemy_type="boss", start=0, every=1000, ignore_cap=True)
+    assert names(scheduler(tux, [boss], base_cap=10).poll(0, 0, 50)) == ["boss"]
+
+def test_cap_shrinks_over_budget_and_recovers_under_it(tux):
+    spawner = scheduler(tux, [], base_cap=60, min_cap=8, budget_ms=10)
+    for _ in range(5):
+        spawner.report_frame(30)
+    shrunk = spawner.cap
+    assert shrunk < 60
+    for _ in range(100):
+        spawner.report_frame(30)
+    assert spawner.cap == 8  # never below min_cap
+    caps = []
+    for _ in range(200):
+        spawner.report_frame(1)
+        caps.append(spawner.cap)
+    assert caps == sorted(caps)  # grows back one step at a time...
+    assert all(b - a <= 1 for a, b in zip(caps, caps[1:]))
+    assert caps[-1] == 60  # ...up to the base cap and no further
+
+def test_cap_holds_inside_the_budget_band(tux):
+    spawner = scheduler(tux, [], base_cap=60, budget_ms=10)
+    spawner.cap = 30
+    for _ in range(50):
+        spawner.report_frame(8)  # between 60% and 100% of the budget
+    assert spawner.cap == 30
+
+def test_poll_is_deterministic_for_a_seed(tux):
+    def spawns(seed):
+        game = tux.Game(seed=seed)
+        game.state = tux.GameState.GAMEPLAY
+        game.reset_game()
+        log = []
+        poll = game.spawner.poll
+        def logged(now, score, live):
+            due = poll(now, score, live)
+            log.extend((game.tick, wave.name, count) for wave, count in due)
+            return due
+        game.spawner.poll = logged
+        for _ in range(tux.TICK_RATE * 15):
+            game.update(tux.KeyState(16))
+        return log, [(enemy.x, enemy.y) for enemy in game.enemies]
+    first = spawns(3)
+    assert first[0]
+    assert spawns(3) == first
@@ -0,0 +1,20 @@
+import pytest
+
+def test_starfield_needs_a_layer(tux):
+    with pytest.raises(ValueError, match="at least one layer"):
+        tux.Starfield(100, 0)
+
+@pytest.mark.parametrize("layers", [1, 2, 5])
+def test_stars_are_split_across_layers(tux, layers):
+    starfield = tux.Starfield(100, layers, seed=1)
+    stars = starfield.star_layers()
+    assert len(stars) == layers == len(starfield.speeds)
+    assert all(len(chars) == len(stars[0][0]) > 0 for chars, _, _ in stars)
+
+@pytest.mark.parametrize("value", ["0", "-2", "three"])
+def test_star_layers_flag_rejects_non_positive_values(tux, value):
+    with pytest.raises(SystemExit):
+        tux.parse_args(["--star-layers", value])
+
+def test_star_layers_flag(tux):
+    assert tux.parse_args(["--star-layers", "4"]).star_layers == 4
@@ -0,0 +1,57 @@
+import io
+import re
+
+CURSOR = re.compile(r"\x1b\[(\d+);(\d+)H")
+
+def renderer(tux):
+    stream = io.StringIO()
+    terminal = tux.TerminalRenderer(stream, size=(20, 5))
+    terminal.start()
+    stream.seek(0)
+    stream.truncate()
+    return terminal, stream
+
+def frame(terminal, texts):
+    terminal.chars.fill(ord(" "))
+    terminal.colors.fill(0)
+    for text, col, row, color in texts:
+        terminal.put(text, col, row, terminal.color(color))
+    terminal.present()
+
+def written(stream):
+    data = stream.getvalue()
+    stream.seek(0)
+    stream.truncate()
+    return data
+
+def test_only_changed_cells_are_written(tux):
+    terminal, stream = renderer(tux)
+    frame(terminal, [("abc", 2, 1, tux.WHITE)])
+    first = written(stream)
+    assert CURSOR.findall(first) == [("2", "3")]  # one run, one cursor move
+    assert first.endswith("abc")
+    frame(terminal, [("abc", 2, 1, tux.WHITE)])
+    assert written(stream) == ""
+    frame(terminal, [("abd", 2, 1, tux.WHITE), ("z", 10, 3, tux.WHITE)])
+    second = written(stream)
+    assert CURSOR.findall(second) == [("2", "5"), ("4", "11")]
+    # What went away is blanked
+    frame(terminal, [("abd", 2, 1, tux.WHITE)])
+    assert written(stream) == "\x1b[4;11H "
+
+def test_colour_changes_under_blanks_write_nothing(tux):
+    terminal, stream = renderer(tux)
+    frame(terminal, [("ab", 0, 0, tux.WHITE)])
+    written(stream)
+    terminal.colors[2:4, :] = terminal.color(tux.RED)  # only spaces there
+    terminal.present()
+    assert written(stream) == ""
+    terminal.colors[0, 1] = terminal.color(tux.RED)
+    terminal.present()
+    assert written(stream) == "\x1b[1;2H" + terminal.codes[terminal.color(tux.RED)] + "b"
+
+def test_bytes_written_counts_encoded_bytes(tux):
+    terminal, stream = renderer(tux)
+    frame(terminal, [("██", 0, 0, tux.WHITE)])
+    data = written(stream)
+    assert terminal.bytes_written == len(data.encode()) == len(data) + 4
@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+@pytest.fixture
+def restore_tuning(tux):
+    # The watcher swaps the module-level tuning, put the defaults back after
+    saved = tux.tuning
+    yield
+    tux.use_tuning(saved)
+
+def write_config(path, data, mtime_ns):
+    path.write_text(json.dumps(data))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_defaults_match_the_schema(tux):
+    defaults = tux.Tuning()
+    assert defaults.player_lives == 3
+    assert defaults.spawn_cap == 60
+    assert tux.Tuning(defaults.as_dict()).as_dict() == defaults.as_dict()
+
+def test_partial_config_keeps_the_other_defaults(tux):
+    custom = tux.Tuning({"player": {"lives": 5}, "spawn": {"rate": 2}})
+    assert custom.player_lives == 5
+    assert custom.spawn_rate == 2.0 and isinstance(custom.spawn_rate, float)
+    assert custom.player_bombs == tux.Tuning().player_bombs
+
+@pytest.mark.parametrize("data, message", [
+    ({"player": {"livez": 5}}, "unknown settings"),
+    ({"playr": {}}, "unknown settings"),
+    ({"player": {"lives": 0}}, "outside"),
+    ({"powerup": {"chance": 1.5}}, "outside"),
+    ({"player": {"lives": 2.5}}, "whole number"),
+    ({"player": {"lives": True}}, "must be a number"),
+    ({"player": 3}, "must be a table"),
+    ({"enemy": {"min_speed": 5, "max_speed": 2}}, "is above")
+])
+def test_bad_configs_are_rejected_with_the_key(tux, data, message):
+    with pytest.raises(ValueError, match=message):
+        tux.Tuning(data, "test.json")
+
+def test_tuning_is_read_only(tux):
+    with pytest.raises(AttributeError):
+        tux.tuning.player_lives = 99
+    with pytest.raises(AttributeError):
+        tux.tuning.anything_else = 1
+    assert tux.tuning.player_lives == 3
+
+def test_watcher_picks_up_a_changed_file(tux, tmp_path, restore_tuning):
+    path = tmp_path / "tuning.json"
+    write_config(path, {"player": {"lives": 4}}, 1_000_000_000)
+    watcher = tux.ConfigWatcher(str(path), interval=0.5)
+    assert not watcher.poll(now=10.0)  # nothing changed since it started
+    write_config(path, {"player": {"lives": 7}}, 2_000_000_000)
+    assert not watcher.poll(now=10.1)  # checks at most every interval
+    assert watcher.poll(now=11.0)
+    assert tux.tuning.player_lives == 7
+    assert tux.tuning.source == str(path)
+
+def test_watcher_keeps_the_tuning_when_the_file_is_invalid(tux, tmp_path, restore_tuning, capsys):
+    path = tmp_path / "tuning.json"
+    write_config(path, {"player": {"lives": 4}}, 1_000_000_000)
+    watcher = tux.ConfigWatcher(str(path), interval=0)
+    write_config(path, {"player": {"lives": 6}}, 2_000_000_000)
+    assert watcher.poll(now=1.0)
+    current = tux.tuning
+    write_config(path, {"player": {"lives": 500}}, 3_000_000_000)
+    assert not watcher.poll(now=2.0)
+    path.write_text('{"player": {"lives": ')
+    os.utime(path, ns=(4_000_000_000, 4_000_000_000))
+    assert not watcher.poll(now=3.0)
+    assert tux.tuning is current and tux.tuning.player_lives == 6
+    assert watcher.errors == 2
+    assert "config not reloaded" in capsys.readouterr().err
@@ -0,0 +1,39 @@
+import numpy as np
+
+def test_step_reuses_its_buffers(tux):
+    env = tux.VecEnv(3, max_steps=5, seed=2)
+    obs = env.reset()
+    first = env.step(np.zeros(3, dtype=np.int64))
+    assert first[0] is obs
+    for _ in range(7):
+        again = env.step(np.full(3, 16))
+        assert all(a is b for a, b in zip(first, again))
+        assert all(again[4][key] is first[4][key] for key in ("score", "lives", "steps"))
+    assert first[1].dtype == np.float32 and first[2].dtype == first[3].dtype == bool
+
+def test_rewards_flags_and_truncation(tux):
+    env = tux.VecEnv(2, max_steps=3, seed=4, score_scale=0.5, death_penalty=10.0)
+    env.reset()
+    game = env.games[1]
+    game.player.score += 40  # scored since the last step
+    game.player.lives -= 1
+    _, rewards, terminated, truncated, infos = env.step([0, 0])
+    assert rewards[0] == 0.0
+    assert rewards[1] == 0.5 * 40 - 10.0
+    assert infos["steps"].tolist() == [1, 1]
+    env.step([0, 0])
+    _, rewards, terminated, truncated, infos = env.step([0, 0])
+    assert truncated.tolist() == [True, True] and not terminated.any()
+    assert env.episodes == 2
+    assert infos["steps"].tolist() == [0, 0]  # both were reset for the next episode
+
+def test_game_over_terminates_and_resets(tux):
+    env = tux.VecEnv(2, seed=6)
+    env.reset()
+    env.games[0].state = tux.GameState.GAME_OVER  # as the last life was lost
+    _, rewards, terminated, truncated, infos = env.step([0, 0])
+    assert terminated.tolist() == [True, False]
+    assert not truncated.any()
+    assert env.episodes == 1
+    assert env.games[0].state == tux.GameState.GAMEPLAY
+    assert infos["lives"][0] == env.games[0].player.lives